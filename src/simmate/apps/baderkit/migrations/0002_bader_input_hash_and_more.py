@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baderkit", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bader",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="badelfcalculation",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="elfanalysiscalculation",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="spinbadelfcalculation",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="spinelfanalysiscalculation",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
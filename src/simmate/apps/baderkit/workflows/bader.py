@@ -12,6 +12,7 @@ class Bader__Baderkit__Bader(Workflow):
     use_database = True
     database_table = BaderModel
     use_previous_directory = ["AECCAR0", "AECCAR2", "CHGCAR", "POTCAR"]
+    link_previous_directory = True  # these files are only ever read
     # parent_workflows = [
     #     "population-analysis.vasp-baderkit.bader-warren-lab",
     #     ]
@@ -99,7 +99,7 @@ class DeepmdDataset:
         # we need to iterate through the dataframe rows.
         # See https://github.com/chrisdev/django-pandas/issues/138 for issue
         structures_dataframe["structure"] = [
-            Structure.from_str(s.structure, fmt="POSCAR")
+            Structure.from_database_string(s.structure)
             for _, s in structures_dataframe.iterrows()
         ]
 
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:44
+
+from django.db import migrations, models
+from pymatgen.core.periodic_table import Element
+
+# The element bit logic is copied here (rather than imported from
+# `simmate.database.mixins.structure`) so that later changes to the models
+# can't change what this migration does.
+ELEMENT_BITS_COLUMNS = ["element_bits_1", "element_bits_2"]
+ELEMENT_BITS_PER_COLUMN = 59
+
+
+def get_element_bits(elements: list[str]) -> tuple[int, int]:
+    bits = [0] * len(ELEMENT_BITS_COLUMNS)
+    for element in elements:
+        column, bit = divmod(Element(element).Z - 1, ELEMENT_BITS_PER_COLUMN)
+        bits[column] |= 1 << bit
+    return tuple(bits)
+
+
+def backfill_element_bits(apps, schema_editor, app_label: str = "materials_project"):
+    """
+    Fills in the element bits of existing rows in every structure table of
+    this app, so that older rows are found by subsystem searches.
+    """
+    columns = {"chemical_system", *ELEMENT_BITS_COLUMNS}
+    for model in apps.get_app_config(app_label).get_models():
+        if not columns.issubset(f.name for f in model._meta.concrete_fields):
+            continue
+        # rows with the same chemical system are updated together
+        query = model._default_manager.filter(
+            element_bits_1__isnull=True,
+            chemical_system__isnull=False,
+        )
+        systems = query.values_list("chemical_system", flat=True).distinct()
+        for system in list(systems.order_by()):
+            bits = get_element_bits(system.split("-"))
+            query.filter(chemical_system=system).update(
+                **dict(zip(ELEMENT_BITS_COLUMNS, bits))
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials_project", "0003_matprojstructure_is_invalid_structure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="matprojstructure",
+            name="element_bits_1",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="matprojstructure",
+            name="element_bits_2",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(
+            backfill_element_bits,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -123,6 +123,8 @@ class Molecule(DatabaseTable):
         "--functional_groups",
     ]
 
+    toolkit_columns = ["molecule"]
+
     # -------------------------------- MANAGER --------------------------------
 
     objects = MoleculeSearchResults.as_manager()
@@ -415,6 +417,13 @@ class Molecule(DatabaseTable):
         """
         return ToolkitMolecule.from_sdf(self.molecule)
 
+    @classmethod
+    def toolkit_from_values(cls, molecule: str) -> ToolkitMolecule:
+        """
+        Converts the values of `toolkit_columns` to a toolkit Molecule object.
+        """
+        return ToolkitMolecule.from_sdf(molecule)
+
     @property
     def sdf_str(self) -> str:
         """
@@ -2,8 +2,9 @@
 
 from pathlib import Path
 
+from simmate.database.workflow_results import DistinctPathSearch
 from simmate.toolkit import Structure
-from simmate.toolkit.diffusion import DistinctPathFinder
+from simmate.toolkit.diffusion import write_migration_hops
 from simmate.workflows import Workflow
 
 
@@ -15,7 +16,8 @@ class NebAllPathsWorkflow(Workflow):
     `simmate.toolkit.diffusion.DistinctPathFinder` is used to find all
     symmetrically unique migration hops in the structure up until the hops
     become percolating (>0-D). For each unique hop, the workflow
-    diffusion/single_path is submitted.
+    diffusion/single_path is submitted. Path searches are saved to the
+    `DistinctPathSearch` table, so reruns on the same structure skip them.
 
     This is therefore a "Nested Workflow" made of the following smaller workflows:
 
@@ -97,16 +99,15 @@ class NebAllPathsWorkflow(Workflow):
             structure = bulk_static_energy_result.to_toolkit()
 
         # Using the relaxed structure, detect all symmetrically unique paths
-        pathfinder = DistinctPathFinder(
+        migration_hops = DistinctPathSearch.get_paths(
             structure=structure,
             migrating_specie=migrating_specie,
             max_path_length=max_path_length,
-            perc_mode=percolation_mode,
+            percolation_mode=percolation_mode,
         )
-        migration_hops = pathfinder.get_paths()
 
         # Write the paths found so user can preview what's analyzed below
-        pathfinder.write_all_migration_hops(directory)
+        write_migration_hops(migration_hops, directory)
 
         # load the current database entry so we can link the other runs
         # to it up front
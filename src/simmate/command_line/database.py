@@ -134,3 +134,108 @@ def download(
     from simmate.database.utils import download_app_data
 
     download_app_data(app_name, source=source)
+
+
+@database_app.command()
+def convert_structures(
+    table_name: str = typer.Option(
+        None,
+        help="The table to convert (e.g. 'MatprojStructure'). Defaults to all "
+        "tables with structures.",
+    ),
+):
+    """
+    Converts structures that are stored as POSCAR or CIF strings (the format
+    used by older versions of Simmate) to the compact binary format, which is
+    smaller and faster to load.
+
+    This can safely be stopped and restarted.
+    """
+
+    from simmate.database import connect
+    from simmate.database.utils import convert_structure_formats
+
+    results = convert_structure_formats(table_name=table_name)
+    for name, nrows in results.items():
+        if nrows:
+            print(f"{name}: converted {nrows} structures")
+    print(f"Converted {sum(results.values())} structures in total.")
+
+
+@database_app.command()
+def update_spacegroups(
+    table_name: str = typer.Option(
+        None,
+        help="The table to update (e.g. 'MatprojStructure'). Defaults to all "
+        "tables with structures.",
+    ),
+    parallel: bool = typer.Option(
+        False,
+        help="Whether to split the symmetry analysis across multiple processes.",
+    ),
+):
+    """
+    Determines the spacegroup of structures that were loaded without one
+    (i.e. with `defer_spacegroup=True`).
+
+    This can safely be stopped and restarted.
+    """
+
+    from simmate.database import connect
+    from simmate.database.utils import update_spacegroups
+
+    results = update_spacegroups(table_name=table_name, parallel=parallel)
+    for name, nrows in results.items():
+        if nrows:
+            print(f"{name}: updated {nrows} structures")
+    print(f"Updated {sum(results.values())} structures in total.")
+
+
+@database_app.command()
+def update_element_bits(
+    table_name: str = typer.Option(
+        None,
+        help="The table to update (e.g. 'MatprojStructure'). Defaults to all "
+        "tables with structures.",
+    ),
+):
+    """
+    Fills in the element bit columns used for chemical subsystem and
+    supersystem searches, for structures saved before these columns existed.
+
+    This can safely be stopped and restarted.
+    """
+
+    from simmate.database import connect
+    from simmate.database.utils import update_element_bits
+
+    results = update_element_bits(table_name=table_name)
+    for name, nrows in results.items():
+        if nrows:
+            print(f"{name}: updated {nrows} structures")
+    print(f"Updated {sum(results.values())} structures in total.")
+
+
+@database_app.command()
+def slow_queries(
+    limit: int = typer.Option(
+        25,
+        help="The maximum number of filter signatures to show.",
+    ),
+):
+    """
+    Lists the slowest searches recorded by query profiling, grouped by table
+    and filter signature.
+
+    Profiling must first be enabled with the `website.query_profiling.enabled`
+    setting.
+    """
+
+    from simmate.database import connect
+    from simmate.website.core.models import SlowQuery
+
+    summary = SlowQuery.get_summary(limit=limit)
+    if summary.empty:
+        print("No slow queries have been recorded.")
+    else:
+        print(summary.to_string(index=False))
@@ -56,14 +56,22 @@ def test(
         "--parallel",
         help="Runs tests in parallel using pytest-xdist.",
     ),
+    benchmark: bool = typer.Option(
+        False,
+        "--benchmark",
+        help="Runs only the performance benchmarks and prints their timings.",
+    ),
 ):
     """
     Runs the test suite using pytest.
     """
     command = "pytest"
-    if full:
+    if benchmark:
+        # benchmarks print their timings, so we disable output capturing
+        command += ' -m "benchmark" -s'
+    elif full:
         # As defined in maintainer_notes.md, full tests exclude blender but include vasp
-        command += ' -m "not blender"'
+        command += ' -m "not blender and not benchmark"'
     if parallel:
         command += " -n auto"
 
@@ -30,3 +30,45 @@ def test_database_reset(django_db_blocker, command_line_runner):
         #     database, ["reset", "--confirm-delete", "--use_prebuilt=True"]
         # )
         # assert result.exit_code == 0
+
+
+@pytest.mark.django_db
+def test_database_slow_queries(command_line_runner):
+    from simmate.website.core.models import SlowQuery
+
+    result = command_line_runner.invoke(database_app, ["slow-queries"])
+    assert result.exit_code == 0
+    assert "No slow queries" in result.stdout
+
+    with SlowQuery.profile(table_name="SlowQuery", filters={"id": 1}, threshold=0):
+        list(SlowQuery.objects.filter(id=1))
+    result = command_line_runner.invoke(database_app, ["slow-queries"])
+    assert result.exit_code == 0
+    assert "SlowQuery" in result.stdout
+
+
+@pytest.mark.django_db
+def test_database_convert_structures(command_line_runner):
+    result = command_line_runner.invoke(
+        database_app, ["convert-structures", "--table-name", "TestStructure"]
+    )
+    assert result.exit_code == 0
+    assert "in total" in result.stdout
+
+
+@pytest.mark.django_db
+def test_database_update_spacegroups(command_line_runner):
+    result = command_line_runner.invoke(
+        database_app, ["update-spacegroups", "--table-name", "TestStructure"]
+    )
+    assert result.exit_code == 0
+    assert "in total" in result.stdout
+
+
+@pytest.mark.django_db
+def test_database_update_element_bits(command_line_runner):
+    result = command_line_runner.invoke(
+        database_app, ["update-element-bits", "--table-name", "TestStructure"]
+    )
+    assert result.exit_code == 0
+    assert "in total" in result.stdout
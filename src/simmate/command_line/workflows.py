@@ -361,9 +361,21 @@ def archive_old_runs(
         3 * 7 * 24 * 60 * 60,  # equal to 3 weeks
         help="The minimum age (in seconds) of a folder before it is considered 'old' and archived. Defaults to 3 weeks.",
     ),
+    format: str = typer.Option(
+        "zip",
+        help="The archive format to use. Options are 'zip' or 'zstd' (a zstandard-compressed tar, which is much faster).",
+    ),
+    parallel: bool = typer.Option(
+        False,
+        help="Whether to compress many folders at once, using one process per folder.",
+    ),
+    max_workers: int = typer.Option(
+        None,
+        help="The number of processes to use with --parallel. Defaults to the number of cores.",
+    ),
 ):
     """
-    Compresses old simulation folders (matching `simmate-task-*`) into ZIP archives.
+    Compresses old simulation folders (matching `simmate-task-*`) into archives.
 
     This helps keep your project directory clean while preserving data from
     older runs.
@@ -371,4 +383,10 @@ def archive_old_runs(
 
     from simmate.workflows.utils import archive_old_runs as archive_utility
 
-    archive_utility(directory, time_cutoff)
+    archive_utility(
+        directory,
+        time_cutoff,
+        format=format,
+        parallel=parallel,
+        max_workers=max_workers,
+    )
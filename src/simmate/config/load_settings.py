@@ -168,6 +168,7 @@ class SimmateSettings:
             "extra_django_apps": [],
             "database": self._default_database,
             "postgres_rdkit_extension": False,
+            "postgres_pgvector_extension": False,
             "scratch_dir": Path.cwd(),
             "client": {
                 "host": "http://127.0.0.1:8000",
@@ -316,6 +317,21 @@ class SimmateSettings:
                 # Example: `user__first_name__isnull` has 2 double-underscores.
                 # `a__b__c__d` has 3. A value of None means no limit.
                 "max_filter_joins": None,
+                # Counting rows of large tables is slow, so exact counts are
+                # cached for this many seconds. Queries that are estimated to
+                # have more rows than the threshold (PostgreSQL only) report the
+                # estimate instead. A threshold of None always counts exactly.
+                "count_cache_timeout": 300,
+                "count_estimate_threshold": 100_000,
+                # Opt-in recording of slow database queries from data explorer
+                # and REST API searches (see `SlowQuery`). Queries that take
+                # longer than the threshold (in seconds) are saved, along with
+                # their query plan if `explain` is set.
+                "query_profiling": {
+                    "enabled": False,
+                    "threshold": 0.5,
+                    "explain": True,
+                },
                 # Whether to allow API workers to pickup and carry out jobs
                 # options: False, 'superuser-only', 'staff-only', 'all-users'
                 "enable_api_workers": False,
@@ -14,6 +14,8 @@ This file helps share fixtures accross files as described
 """
 
 import shutil
+import time
+import tracemalloc
 from pathlib import Path
 
 import pytest
@@ -22,6 +24,7 @@ from typer.testing import CliRunner
 
 from simmate.apps.vasp.inputs import Potcar
 from simmate.config import settings
+from simmate.database.core.search_results import SearchResults
 from simmate.database.mixins import Spacegroup
 from simmate.toolkit import Composition, Structure, base_data_types
 from simmate.utils import get_directory
@@ -42,6 +45,15 @@ def setup_scratch_directory(tmp_path_factory):
     yield scratch_dir
 
 
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    """
+    Each test starts with a fresh database, so counts cached by
+    `SearchResults.count_cached` in earlier tests would be wrong.
+    """
+    SearchResults._count_cache.clear()
+
+
 COMPOSITIONS_STRS = [
     "Fe1",
     "Si2",
@@ -293,6 +305,58 @@ def make_dummy_files(*filenames: str):
             file.write("This is a dummy file for testing.")
 
 
+def run_benchmark(
+    name: str,
+    function: callable,
+    nrepeats: int = 5,
+    nitems: int = 1,
+    track_memory: bool = False,
+    **kwargs,
+) -> float:
+    """
+    This is a utility for benchmark tests (marked with `pytest.mark.benchmark`).
+    It calls the function `nrepeats` times and prints the best time, which is
+    the one least affected by other processes on the machine.
+
+    If a single call handles several items (e.g. 100 workflow runs or 1000
+    database rows), give `nitems` so that the time per item and the throughput
+    are reported too. The best time per item (in seconds) is returned, so
+    benchmarks can also assert a loose upper bound to catch major regressions.
+
+    With `track_memory=True`, the peak memory allocated by python during one
+    extra call is reported as well (via `tracemalloc`). Unlike the process's
+    max RSS, this can be measured separately for each benchmark in a session.
+
+    Benchmarks are skipped by default. To run them and see their output:
+    ``` bash
+    simmate dev test --benchmark
+    ```
+    """
+    times = []
+    for _ in range(nrepeats):
+        start = time.perf_counter()
+        function(**kwargs)
+        times.append(time.perf_counter() - start)
+
+    best_time = min(times) / nitems
+    message = (
+        f"\nBENCHMARK {name}: {best_time * 1000:.3f} ms per item, "
+        f"{1 / best_time:,.0f} items/s "
+        f"(best of {nrepeats}, {nitems} items per repeat)"
+    )
+
+    # tracemalloc slows down python, so it is kept out of the timed calls
+    if track_memory:
+        tracemalloc.start()
+        function(**kwargs)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        message += f", peak memory {peak_memory / 1e6:.1f} MB"
+
+    print(message)
+    return best_time
+
+
 class SimmateMockHelper:
     @staticmethod
     def get_mocked_potcar(mocker, directory: Path):
@@ -2,14 +2,17 @@
 
 import json
 import logging
+import os
 import shutil
 import urllib
 import warnings
 from pathlib import Path
 
 import polars
+from django.core.exceptions import FieldDoesNotExist
 
 from simmate.config import settings
+from simmate.database.utils import cache_table_metadata
 from simmate.utils import dispatch
 
 
@@ -39,7 +42,8 @@ class ArchiveMixin:
         filename: Path | str = None,
         format: str = "csv",
         columns: str | list[str] = "minimal",
-    ):
+        **kwargs,
+    ) -> Path:
         """
         Writes the entire database table to an archive file. If you prefer
         a subset of entries for the archive, use the to_archive method
@@ -54,11 +58,20 @@ class ArchiveMixin:
         - `columns`:
             Which columns to include. Options are "minimal" (archive_fieldset),
             "full" (all columns), or a custom list of column names.
+        - `**kwargs`:
+            Extra options (batch size, compression level, chunking) passed to
+            `SearchResults.to_archive`
         """
-        cls.objects.all().to_archive(filename, format=format, columns=columns)
+        return cls.objects.all().to_archive(
+            filename,
+            format=format,
+            columns=columns,
+            **kwargs,
+        )
 
     @classmethod
     @property
+    @cache_table_metadata
     def archive_exclude_fieldset(cls) -> list[str]:
         exclude_fields = []
         for mixin in cls.get_mixins():
@@ -72,6 +85,7 @@ class ArchiveMixin:
 
     @classmethod
     @property
+    @cache_table_metadata
     def archive_fieldset(cls) -> list[str]:
         all_fields = ["id", "updated_at", "created_at", "source"]
 
@@ -120,24 +134,130 @@ class ArchiveMixin:
     """
 
     @classmethod
-    def _load_single_entry(cls, entry):
+    @property
+    @cache_table_metadata
+    def _json_columns(cls) -> list[str]:
+        return [
+            field.name
+            for field in cls._meta.concrete_fields
+            if field.get_internal_type() == "JSONField"
+        ]
+
+    @classmethod
+    def _load_single_entry(cls, entry, as_dict: bool = False):
         """
         Quick utility function that loads a single entry to the database.
         """
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
 
-            # BUG: some columns don't properly convert to python objects, but
-            # it seems inconsistent when this is done... For now I just manually
-            # convert JSON columns
-            json_parsing_columns = ["site_forces", "lattice_stress"]
-            for column in json_parsing_columns:
-                if column in entry:
-                    if entry[column]:  # sometimes it has a value of None
-                        entry[column] = json.loads(entry[column])
-            # OPTIMIZE: consider applying this to the df column for faster loading
+            entry = cls._decode_json_columns(entry)
+            return cls.from_toolkit(as_dict=as_dict, **entry)
 
-            return cls.from_toolkit(**entry)
+    @classmethod
+    def _load_archive_entries(cls, entries: list[dict], parallel: bool = False):
+        """
+        Converts a batch of archive rows with `from_toolkit_many` and saves
+        them to the database. This is used by `load_archive` for tables where
+        `_has_batched_from_toolkit` is true.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+
+            db_objects = cls.from_toolkit_many(
+                [cls._decode_json_columns(entry) for entry in entries],
+                parallel=parallel,
+            )
+        cls.objects.bulk_create(db_objects, ignore_conflicts=True)
+
+    @classmethod
+    def _has_batched_from_toolkit(cls) -> bool:
+        """
+        Whether `from_toolkit_many` gives the same results as `from_toolkit`.
+        This is false for tables that override `from_toolkit` (e.g. to accept
+        different kwargs), which must load archives one row at a time.
+        """
+        for parent in cls.__mro__:
+            if "from_toolkit" in vars(parent):
+                return "from_toolkit_many" in vars(parent)
+        return False
+
+    @classmethod
+    def _decode_json_columns(cls, entry: dict) -> dict:
+        """
+        JSON columns are written to archives as JSON strings, so we need to
+        decode them. Older archives may have python reprs instead, which we
+        leave as-is.
+        """
+        for column in cls._json_columns:
+            value = entry.get(column, None)
+            if isinstance(value, str):
+                try:
+                    entry[column] = json.loads(value)
+                except json.JSONDecodeError:
+                    pass
+        return entry
+
+    @classmethod
+    def _can_load_archive_directly(cls, df: polars.DataFrame) -> bool:
+        """
+        Checks whether the archive's columns can be inserted directly, which is
+        true when every column is a field of this table and `from_toolkit`
+        does not add any extra columns. We test this with the first row.
+
+        Archives can also be mixed, where only some rows have the columns
+        that `from_toolkit` derives (e.g. nsites). So for every column with
+        null values, we check whether `from_toolkit` would fill it in for the
+        first row. If it would, those rows must go through `from_toolkit`.
+        """
+        if df.is_empty():
+            return False
+
+        # compare by attname, as foreign keys can be given as "x" or "x_id"
+        def get_attnames(columns: list[str]) -> set[str]:
+            attnames = set()
+            for column in columns:
+                field = cls._meta.get_field(column)
+                if not field.concrete:
+                    raise FieldDoesNotExist()
+                attnames.add(field.attname)
+            return attnames
+
+        try:
+            first_row = df.row(0, named=True)
+            first_entry = cls._load_single_entry(dict(first_row), as_dict=True)
+            if not get_attnames(first_entry.keys()).issubset(get_attnames(df.columns)):
+                return False
+        except FieldDoesNotExist:
+            return False
+
+        null_columns = [
+            column
+            for column, null_count in df.null_count().row(0, named=True).items()
+            if null_count
+        ]
+        if not null_columns:
+            return True
+        try:
+            nulled_entry = cls._load_single_entry(
+                {**first_row, **{column: None for column in null_columns}},
+                as_dict=True,
+            )
+        except Exception:
+            # a null column is needed to build the toolkit object
+            return False
+        return not any(
+            nulled_entry.get(column, None) is not None for column in null_columns
+        )
+
+    @classmethod
+    def _load_archive_batch(cls, df: polars.DataFrame):
+        """
+        Inserts a batch of archive rows that map directly to this table's
+        columns (see `_can_load_archive_directly`). On PostgreSQL, the batch
+        is sent with `COPY` (see `SearchResults.bulk_copy`).
+        """
+        cls.objects.bulk_copy(df.to_arrow(), ignore_conflicts=True)
 
     # @transaction.atomic  # We can't have an atomic transaction if we use Dask
     @classmethod
@@ -146,6 +266,7 @@ class ArchiveMixin:
         filename: str | Path = None,
         delete_on_completion: bool = False,
         parallel: bool | str = False,
+        batch_size: int = 15_000,
     ):
         """
         Reads a compressed zip file made by `objects.to_archive` and loads the data
@@ -169,7 +290,14 @@ class ArchiveMixin:
 
         - `parallel`:
             How to dispatch the data loading. False will load one by one.
-            True or "core" will start a ProcessPoolExecutor.
+            True or "core" will split the expensive steps of `from_toolkit_many`
+            (e.g. symmetry analysis) across a ProcessPoolExecutor. "job" will
+            submit each batch to workers, which convert and save the rows.
+            This only applies to archives that need `from_toolkit` to fill in
+            extra columns.
+
+        - `batch_size`:
+            The number of rows to convert and insert at a time
         """
 
         # We disable warnings while loading archives because pymatgen prints
@@ -188,7 +316,7 @@ class ArchiveMixin:
                     file
                     for file in Path.cwd().iterdir()
                     if file.name.startswith(cls.table_name)
-                    and file.suffix in (".zip", ".parquet")
+                    and (file.suffix in (".zip", ".parquet") or file.is_dir())
                 ]
                 # make sure there is at least one file
                 if not matching_files:
@@ -203,7 +331,13 @@ class ArchiveMixin:
             # manipulations easier below.
             filename = Path(filename).absolute()
 
-            if filename.suffix == ".parquet":
+            if filename.is_dir():
+                # Chunked parquet archives (hive-partitioned by chunk_key)
+                df = polars.read_parquet(
+                    filename / "**" / "*.parquet",
+                    hive_partitioning=True,
+                ).drop("chunk_key", strict=False)
+            elif filename.suffix == ".parquet":
                 # Parquet files are read directly (no zip wrapper)
                 df = polars.read_parquet(filename)
             else:
@@ -217,33 +351,66 @@ class ArchiveMixin:
                 df = polars.read_csv(inner_filename)
                 inner_filename.unlink()
 
-            # convert the dataframe to a list of dictionaries that we will iterate
-            # through. Polars natively converts nulls to None when calling to_dicts.
-            entries = df.to_dicts()
-
-            # now iterate through all entries to save them to the database
-            db_objects = dispatch(
-                entries,
-                cls._load_single_entry,
-                parallel=parallel,
-                batch_size=15000,
-            )
-
-            cls.objects.bulk_create(
-                db_objects,
-                batch_size=15000,
-                ignore_conflicts=True,
-            )
+            # When the archive already has every column that `from_toolkit`
+            # would populate, rows can be inserted as-is. This skips building
+            # toolkit objects for every row, which dominates load times.
+            if cls._can_load_archive_directly(df):
+                for df_batch in df.iter_slices(batch_size):
+                    cls._load_archive_batch(df_batch)
+            else:
+                # Otherwise, rows go through `from_toolkit_many` so that
+                # derived columns (e.g. nsites from a structure) are filled.
+                # We go one batch at a time to limit memory use, and the
+                # expensive steps of each batch are split across processes.
+                # Polars natively converts nulls to None when calling to_dicts.
+                # With parallel="job", each batch is submitted as a WorkItem
+                # that converts and saves its rows on a worker.
+                states = []
+                for df_batch in df.iter_slices(batch_size):
+                    entries = df_batch.to_dicts()
+                    if cls._has_batched_from_toolkit() and parallel == "job":
+                        states += dispatch(
+                            [entries],
+                            cls._load_archive_entries,
+                            parallel=parallel,
+                        )
+                    elif cls._has_batched_from_toolkit():
+                        cls._load_archive_entries(
+                            entries,
+                            parallel=parallel is True or parallel == "core",
+                        )
+                    else:
+                        # split each batch evenly across the workers
+                        db_objects = dispatch(
+                            entries,
+                            cls._load_single_entry,
+                            parallel=parallel,
+                            batch_size=max(1, batch_size // (os.cpu_count() or 1)),
+                        )
+                        if parallel == "job":
+                            db_objects = [state.result() for state in db_objects]
+                        cls.objects.bulk_create(
+                            db_objects,
+                            batch_size=batch_size,
+                            ignore_conflicts=True,
+                        )
+                # wait for all workers to finish (and raise any of their errors)
+                for state in states:
+                    state.result()
 
             # Delete the archive file if requested
             if delete_on_completion:
-                filename.unlink()
+                if filename.is_dir():
+                    shutil.rmtree(filename)
+                else:
+                    filename.unlink()
 
     @classmethod
     def load_remote_archive(
         cls,
         remote_archive_link: str = None,
         parallel: bool | str = False,
+        batch_size: int = 15_000,
     ):
         """
         Downloads a compressed zip file made by `objects.to_archive` and loads
@@ -261,7 +428,14 @@ class ArchiveMixin:
 
         - `parallel`:
             How to dispatch the data loading. False will load one by one.
-            True or "core" will start a ProcessPoolExecutor.
+            True or "core" will split the expensive steps of `from_toolkit_many`
+            (e.g. symmetry analysis) across a ProcessPoolExecutor. "job" will
+            submit each batch to workers, which convert and save the rows.
+            This only applies to archives that need `from_toolkit` to fill in
+            extra columns.
+
+        - `batch_size`:
+            The number of rows to convert and insert at a time
         """
 
         # confirm that we have a link to download from
@@ -311,6 +485,7 @@ class ArchiveMixin:
             archive_path,
             delete_on_completion=False,
             parallel=parallel,
+            batch_size=batch_size,
         )
         logging.info("Done.")
 
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a compressed format for storing several numpy arrays (plus
+some JSON metadata) in a single text column. It is used for large results such
+as band structures and densities of states, where we often only need one of
+the arrays (e.g. a single spin channel) rather than the full object.
+
+Each array is compressed separately, so reading one array never requires
+decompressing the others:
+
+``` python
+import numpy
+from simmate.database.core.arrays import CompressedArrays
+
+string = CompressedArrays.to_str(
+    arrays={"energies": numpy.linspace(-5, 5, 1000)},
+    metadata={"efermi": 0.5},
+)
+
+arrays = CompressedArrays.from_str(string)  # nothing is decompressed yet
+arrays.metadata  # {"efermi": 0.5}
+arrays["energies"]  # only this array is decompressed
+```
+
+The binary layout is (all little-endian):
+
+- header: magic `b"SMA"`, version (uint8), and the length of the index (uint32)
+- index: utf-8 JSON with the metadata plus the dtype, shape, and byte range of
+  each array within the data section
+- data: each array is byte-shuffled (i.e. the first byte of every value, then
+  the second byte of every value, ...) and then compressed with zlib. Shuffling
+  groups the sign/exponent bytes of floats, which compress far better together.
+
+Outputs from calculators are typically printed with only a few decimals (e.g.
+"-3.2541"), so float arrays where every value has at most 8 decimals are stored
+as integers (e.g. -32541) along with the number of decimals. This is lossless:
+dividing by the power of ten gives back the exact same floats.
+"""
+
+import base64
+import json
+import struct
+import zlib
+
+import numpy
+
+MAGIC = b"SMA"
+VERSION = 1
+TEXT_PREFIX = "@"
+
+_HEADER = struct.Struct("<3sBI")
+_MAX_DECIMALS = 8
+
+
+class CompressedArrays:
+    """
+    A lazily-decompressed set of named arrays. Use `to_bytes`/`to_str` to
+    encode arrays and `from_bytes`/`from_str` to load them back.
+    """
+
+    def __init__(self, index: dict, data: memoryview):
+        self.metadata = index["metadata"]
+        self._index = index["arrays"]
+        self._data = data
+        self._cache = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        if name not in self._cache:
+            info = self._index[name]
+            start, end = info["range"]
+            dtype = numpy.dtype(info["dtype"])
+            raw = zlib.decompress(self._data[start:end])
+            array = _unshuffle(raw, dtype.itemsize).view(dtype)
+            if "decimals" in info:
+                array = array / 10 ** info["decimals"]
+            array.flags.writeable = False  # shared by later lookups
+            self._cache[name] = array.reshape(info["shape"])
+        return self._cache[name]
+
+    @property
+    def names(self) -> list[str]:
+        """
+        The names of all arrays stored
+        """
+        return list(self._index)
+
+    def get(self, name: str, default=None) -> numpy.ndarray:
+        return self[name] if name in self else default
+
+    @staticmethod
+    def to_bytes(arrays: dict, metadata: dict = None, level: int = 6) -> bytes:
+        """
+        Encodes a dictionary of arrays (plus any JSON-serializable metadata)
+        into the binary format
+        """
+        index = {}
+        chunks = []
+        offset = 0
+        for name, array in arrays.items():
+            array = numpy.ascontiguousarray(array)
+            info = dict(shape=list(array.shape))
+            if array.dtype == numpy.float64:
+                decimals, integers = _to_integers(array)
+                if integers is not None:
+                    info["decimals"] = decimals
+                    array = integers
+            dtype = array.dtype.newbyteorder("<")
+            array = array.astype(dtype, copy=False)
+            chunk = zlib.compress(_shuffle(array), level)
+            info.update(dtype=dtype.str, range=[offset, offset + len(chunk)])
+            index[name] = info
+            chunks.append(chunk)
+            offset += len(chunk)
+
+        index = json.dumps({"metadata": metadata or {}, "arrays": index}).encode()
+        return b"".join([_HEADER.pack(MAGIC, VERSION, len(index)), index, *chunks])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompressedArrays":
+        """
+        Loads the index of the binary format. Arrays are only decompressed
+        once they are accessed.
+        """
+        magic, version, index_length = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("This is not a compressed array string")
+        if version > VERSION:
+            raise ValueError(
+                f"This data uses version {version} of the compressed array "
+                f"format, but only up to version {VERSION} is supported. "
+                "Try updating Simmate."
+            )
+        start = _HEADER.size
+        index = json.loads(bytes(data[start : start + index_length]))
+        return cls(index=index, data=memoryview(data)[start + index_length :])
+
+    @classmethod
+    def to_str(cls, arrays: dict, metadata: dict = None, level: int = 6) -> str:
+        """
+        Encodes arrays into the binary format, and then into a base64 string
+        that can be stored in a text column
+        """
+        data = cls.to_bytes(arrays, metadata, level)
+        return TEXT_PREFIX + base64.b64encode(data).decode()
+
+    @classmethod
+    def from_str(cls, string: str) -> "CompressedArrays":
+        """
+        Loads arrays from a string made by `to_str`
+        """
+        if not string.startswith(TEXT_PREFIX):
+            raise ValueError("This is not a compressed array string")
+        return cls.from_bytes(base64.b64decode(string[len(TEXT_PREFIX) :]))
+
+
+def _to_integers(array: numpy.ndarray) -> tuple[int, numpy.ndarray]:
+    # Finds the fewest decimals that exactly reproduce every value, and gives
+    # the values as integers (e.g. 2 decimals and 0.25 --> 25)
+    if not numpy.isfinite(array).all():
+        return None, None
+    for decimals in range(_MAX_DECIMALS + 1):
+        scale = 10**decimals
+        integers = numpy.round(array * scale)
+        if numpy.abs(integers).max(initial=0) >= 2**53:
+            return None, None  # not exactly representable anymore
+        if numpy.array_equal(integers / scale, array):
+            is_small = numpy.abs(integers).max(initial=0) < 2**31
+            return decimals, integers.astype("i4" if is_small else "i8")
+    return None, None
+
+
+def _shuffle(array: numpy.ndarray) -> bytes:
+    raw = numpy.frombuffer(array.tobytes(), dtype="u1")
+    return raw.reshape(-1, array.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, itemsize: int) -> numpy.ndarray:
+    raw = numpy.frombuffer(data, dtype="u1")
+    return raw.reshape(itemsize, -1).T.copy()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for loading rows into PostgreSQL with `COPY ... FROM STDIN` using
+the binary format. This is used by `SearchResults.bulk_copy`, and typically
+you won't call these functions directly.
+
+The binary format is described in the PostgreSQL docs:
+https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+"""
+
+import io
+import json
+import struct
+import uuid
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db.models import Field, JSONField
+from django.utils import timezone
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+POSTGRES_EPOCH_DATE = date(2000, 1, 1)
+
+# {postgres type: (oid, encoder)} for the column types that we support.
+# Each encoder takes a python value (never None) and returns its bytes.
+_TYPE_ENCODERS = {
+    "boolean": (16, lambda v: b"\x01" if v else b"\x00"),
+    "smallint": (21, lambda v: struct.pack(">h", v)),
+    "integer": (23, lambda v: struct.pack(">i", v)),
+    "bigint": (20, lambda v: struct.pack(">q", v)),
+    "real": (700, lambda v: struct.pack(">f", v)),
+    "double precision": (701, lambda v: struct.pack(">d", v)),
+    "text": (25, lambda v: str(v).encode()),
+    "varchar": (1043, lambda v: str(v).encode()),
+    "bytea": (17, bytes),
+    "uuid": (2950, lambda v: uuid.UUID(str(v)).bytes),
+    "date": (1082, lambda v: struct.pack(">i", (v - POSTGRES_EPOCH_DATE).days)),
+    "timestamp with time zone": (
+        1184,
+        lambda v: struct.pack(">q", (v - POSTGRES_EPOCH) // timedelta(microseconds=1)),
+    ),
+    "numeric": (1700, lambda v: _encode_numeric(Decimal(v))),
+}
+# Aliases that Django (or custom fields) may use for the same types
+_TYPE_ALIASES = {
+    "serial": "integer",
+    "bigserial": "bigint",
+    "smallserial": "smallint",
+    "character varying": "varchar",
+    "timestamptz": "timestamp with time zone",
+}
+
+
+def _encode_numeric(value: Decimal) -> bytes:
+    # numeric values are sent as base-10000 digits, along with the weight
+    # (exponent) of the first digit and the number of decimal places shown
+    if value.is_nan():
+        return struct.pack(">hhHh", 0, 0, 0xC000, 0)
+
+    sign, digits, exponent = value.as_tuple()
+    dscale = max(-exponent, 0)
+
+    # pad the decimal digits so that they split evenly into groups of 4 on
+    # both sides of the decimal point
+    digits = list(digits)
+    if exponent > 0:
+        digits += [0] * exponent
+        exponent = 0
+    nfraction = -exponent
+    digits += [0] * ((4 - nfraction % 4) % 4)
+    nfraction += (4 - nfraction % 4) % 4
+    digits = [0] * max(nfraction - len(digits), 0) + digits
+    ninteger = len(digits) - nfraction
+    digits = [0] * ((4 - ninteger % 4) % 4) + digits
+    ninteger += (4 - ninteger % 4) % 4
+
+    groups = [
+        int("".join(str(d) for d in digits[i : i + 4]))
+        for i in range(0, len(digits), 4)
+    ]
+    weight = ninteger // 4 - 1
+
+    # strip zero groups, which postgres doesn't need
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+
+    return struct.pack(
+        f">hhHh{len(groups)}h",
+        len(groups),
+        weight,
+        0x4000 if sign else 0x0000,
+        dscale,
+        *groups,
+    )
+
+
+def _encode_array(values: list, oid: int, encoder: callable) -> bytes:
+    # find the size of each dimension (arrays must be rectangular)
+    dimensions = []
+    level = values
+    while isinstance(level, (list, tuple)):
+        dimensions.append(len(level))
+        level = level[0] if level else None
+
+    elements = values
+    for _ in range(len(dimensions) - 1):
+        elements = [e for sub in elements for e in sub]
+
+    has_null = any(e is None for e in elements)
+    parts = [struct.pack(">iii", len(dimensions), int(has_null), oid)]
+    parts += [struct.pack(">ii", size, 1) for size in dimensions]
+    for element in elements:
+        if element is None:
+            parts.append(struct.pack(">i", -1))
+        else:
+            data = encoder(element)
+            parts.append(struct.pack(">i", len(data)) + data)
+    return b"".join(parts)
+
+
+def get_field_encoder(
+    field: Field,
+    connection,
+    json_as_text: bool = False,
+) -> callable:
+    """
+    Gives a function that converts a python value of this field to its binary
+    COPY representation (excluding the length prefix). None is returned if
+    the column type isn't supported, in which case COPY can't be used.
+
+    JSON values are always encoded with `json.dumps`, so a python string is
+    stored as a JSON string. When `json_as_text` is True, strings are instead
+    treated as JSON that was already encoded (e.g. a column from Arrow).
+    """
+
+    if isinstance(field, JSONField):
+        # jsonb is sent as a version number and then the JSON text
+        def encode_json(value):
+            if not (json_as_text and isinstance(value, str)):
+                value = json.dumps(value, cls=field.encoder)
+            return b"\x01" + value.encode()
+
+        return encode_json
+
+    db_type = (field.db_type(connection) or "").lower()
+
+    # arrays (e.g. "integer[]" or "varchar(50)[]")
+    array_depth = db_type.count("[]")
+    db_type = db_type.replace("[]", "").split("(")[0].strip()
+    db_type = _TYPE_ALIASES.get(db_type, db_type)
+    if db_type not in _TYPE_ENCODERS:
+        return None
+    oid, encoder = _TYPE_ENCODERS[db_type]
+
+    if db_type == "timestamp with time zone":
+        encoder = _make_aware(encoder)
+
+    if array_depth:
+        # array oids aren't needed here because the element oid is given
+        return lambda values: _encode_array(values, oid, encoder)
+    return encoder
+
+
+def _make_aware(encoder: callable) -> callable:
+    def encode_datetime(value: datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, dt_timezone.utc)
+        return encoder(value)
+
+    return encode_datetime
+
+
+def write_copy_data(rows: list[tuple], encoders: list[callable]) -> io.BytesIO:
+    """
+    Writes rows (tuples of python values) to a buffer in the binary COPY
+    format, ready to be passed to `cursor.copy_expert`.
+    """
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    row_header = struct.pack(">h", len(encoders))
+    null = struct.pack(">i", -1)
+    for row in rows:
+        buffer.write(row_header)
+        for value, encoder in zip(row, encoders):
+            if value is None:
+                buffer.write(null)
+            else:
+                data = encoder(value)
+                buffer.write(struct.pack(">i", len(data)))
+                buffer.write(data)
+    buffer.write(COPY_TRAILER)
+    buffer.seek(0)
+    return buffer
@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
 
-import shutil
+import base64
+import json
+import time
+import zipfile
+from itertools import islice
+from math import ceil
 from pathlib import Path
+from typing import Iterator
 
 import pandas
-from django.db import models
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.management.color import no_style
+from django.core.paginator import Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction
+from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
+from django.utils.functional import cached_property
 from django.utils.timezone import datetime, now, timedelta
 
 from simmate.config import settings
 from simmate.database.utils import check_db_conn
+from simmate.utils import dispatch, get_chunk_key
 
 
 class SearchResults(models.QuerySet):
@@ -41,6 +54,9 @@ class SearchResults(models.QuerySet):
         limit: int = None,
         use_cache: bool = True,
         engine: str = "pandas",
+        stream: bool = False,
+        batch_size: int = 10_000,
+        export_values: bool = False,
     ):
         """
         Returns a Pandas DataFrame of the search results
@@ -65,6 +81,19 @@ class SearchResults(models.QuerySet):
             The DataFrame engine to use. Options are "pandas" (default) or
             "polars". When "polars", a polars.DataFrame is returned instead
             of a pandas.DataFrame.
+        - `stream`:
+            whether to read rows in batches of `batch_size` and build the
+            DataFrame from Arrow record batches (see `to_arrow_batches`). This
+            avoids holding every row as a python tuple, so it is much faster
+            and uses far less memory for large tables. The query cache is not
+            used in this mode, and JSON columns are given as JSON strings.
+        - `batch_size`:
+            the number of rows per batch when `stream=True`
+        - `export_values`:
+            whether to convert columns that are stored in an internal format
+            into the value shown to users (see `DatabaseTable.export_converters`),
+            such as binary structures into POSCAR or CIF text. This is used for
+            CSV downloads, but is slow for large tables.
         """
 
         # This method originally used `django_pandas` but we since decided to
@@ -73,13 +102,32 @@ class SearchResults(models.QuerySet):
         # https://github.com/chrisdev/django-pandas/blob/master/django_pandas/
         # https://github.com/chrisdev/django-pandas/issues/138
 
+        if stream:
+            import pyarrow
+
+            columns = columns or self._get_default_columns(exclude_columns)
+            table = pyarrow.Table.from_batches(
+                self.to_arrow_batches(
+                    columns=columns,
+                    limit=limit,
+                    batch_size=batch_size,
+                    export_values=export_values,
+                ),
+                schema=self._get_arrow_schema(columns)[0],
+            )
+            if engine == "pandas":
+                return table.to_pandas()
+            elif engine == "polars":
+                import polars
+
+                return polars.from_arrow(table)
+            raise ValueError(
+                f"Unknown engine '{engine}'. Supported: 'pandas', 'polars'"
+            )
+
         if not columns:
             has_user_cols = False
-            columns = [
-                c
-                for c in self.model.get_column_names(id_mode=True)
-                if c not in exclude_columns
-            ]
+            columns = self._get_default_columns(exclude_columns)
         else:
             has_user_cols = True
 
@@ -146,6 +194,17 @@ class SearchResults(models.QuerySet):
             )
             values_list = list(query)
 
+        # e.g. binary structures are given as text (see `export_converters`)
+        converters = self._get_export_converters(columns) if export_values else []
+        if any(converters):
+            values_list = [
+                tuple(
+                    converter(v) if converter and v is not None else v
+                    for v, converter in zip(row, converters)
+                )
+                for row in values_list
+            ]
+
         if engine == "pandas":
             df = pandas.DataFrame.from_records(
                 data=values_list,
@@ -170,6 +229,166 @@ class SearchResults(models.QuerySet):
 
         return df
 
+    def to_arrow_batches(
+        self,
+        columns: list[str] = (),
+        exclude_columns: list[str] = (),
+        limit: int = None,
+        batch_size: int = 10_000,
+        export_values: bool = False,
+    ) -> Iterator:  # Iterator[pyarrow.RecordBatch]
+        """
+        Yields the search results as Arrow record batches of up to `batch_size`
+        rows. Only one batch is held in memory at a time, so this can be used
+        to export tables that are far larger than the available RAM:
+
+        ``` python
+        import polars
+
+        for batch in MyTable.objects.to_arrow_batches(batch_size=50_000):
+            df = polars.from_arrow(batch)
+            ...  # do something with this chunk of rows
+        ```
+
+        Rows are read with a server-side cursor on PostgreSQL and with chunked
+        fetches on SQLite (see django's `QuerySet.iterator`). The Arrow schema
+        is taken from the model fields, so every batch has the same schema.
+        JSON columns are given as JSON strings and UUIDs as strings.
+
+        #### Parameters
+
+        - `columns`:
+            The model field names (columns) to include. Relations can be
+            spanned with double underscores, as in `to_dataframe`.
+        - `exclude_columns`:
+            If columns is left empty (meaning use all cols), this is the
+            list of cols that will be ignored from the full default list.
+        - `limit`:
+            whether to limit the total number of rows
+        - `batch_size`:
+            the number of rows to load from the database and convert at once
+        - `export_values`:
+            whether to convert columns that are stored in an internal format
+            into the value shown to users (see `to_dataframe`)
+        """
+        import pyarrow
+
+        columns = columns or self._get_default_columns(exclude_columns)
+        schema, converters = self._get_arrow_schema(columns, export_values)
+
+        query = self.values_list(*columns)
+        if limit:
+            query = query[:limit]
+        rows = query.iterator(chunk_size=batch_size)
+
+        while batch := list(islice(rows, batch_size)):
+            arrays = []
+            for values, field, converter in zip(zip(*batch), schema, converters):
+                if converter:
+                    values = [converter(v) if v is not None else None for v in values]
+                arrays.append(pyarrow.array(values, type=field.type))
+            yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _get_default_columns(self, exclude_columns: list[str] = ()) -> list[str]:
+        return [
+            c
+            for c in self.model.get_column_names(id_mode=True)
+            if c not in exclude_columns
+        ]
+
+    def _get_arrow_schema(
+        self,
+        columns: list[str],
+        export_values: bool = False,
+    ) -> tuple:
+        """
+        Gives the Arrow schema for the requested columns, along with a list of
+        functions (or None) that convert each python value into a form that
+        Arrow accepts for that type (or into the value shown to users, when
+        `export_values` is set).
+        """
+        import pyarrow
+
+        # Each entry is (arrow type, converter). Fields that aren't listed here
+        # (or columns that aren't plain fields, such as annotations) are
+        # converted to strings.
+        field_types = {
+            "AutoField": (pyarrow.int64(), None),
+            "BigAutoField": (pyarrow.int64(), None),
+            "SmallAutoField": (pyarrow.int64(), None),
+            "IntegerField": (pyarrow.int64(), None),
+            "BigIntegerField": (pyarrow.int64(), None),
+            "SmallIntegerField": (pyarrow.int64(), None),
+            "PositiveIntegerField": (pyarrow.int64(), None),
+            "PositiveBigIntegerField": (pyarrow.int64(), None),
+            "PositiveSmallIntegerField": (pyarrow.int64(), None),
+            "FloatField": (pyarrow.float64(), None),
+            "DecimalField": (pyarrow.float64(), float),
+            "BooleanField": (pyarrow.bool_(), None),
+            "CharField": (pyarrow.string(), None),
+            "TextField": (pyarrow.string(), None),
+            "SlugField": (pyarrow.string(), None),
+            "EmailField": (pyarrow.string(), None),
+            "URLField": (pyarrow.string(), None),
+            # simmate always stores timezone-aware datetimes (USE_TZ=True)
+            "DateTimeField": (pyarrow.timestamp("us", tz="UTC"), None),
+            "DateField": (pyarrow.date32(), None),
+            "BinaryField": (pyarrow.binary(), bytes),
+            "UUIDField": (pyarrow.string(), str),
+            "JSONField": (pyarrow.string(), json.dumps),
+        }
+
+        fields = []
+        converters = []
+        for column in columns:
+            try:
+                # walk through any relations (e.g. "structure__energy")
+                model = self.model
+                *relations, field_name = column.split("__")
+                for relation in relations:
+                    model = model._meta.get_field(relation).related_model
+                field = model._meta.get_field(field_name)
+                # foreign keys give the value of the related table's key
+                while field.many_to_one or field.one_to_one:
+                    field = field.target_field
+                field_type = field.get_internal_type()
+            except (FieldDoesNotExist, AttributeError):
+                field_type = None
+            arrow_type, converter = field_types.get(field_type, (pyarrow.string(), str))
+            fields.append(pyarrow.field(column, arrow_type))
+            converters.append(converter)
+
+        # values that are stored in an internal format are exported as the
+        # value shown to users instead (see `DatabaseTable.export_converters`)
+        if export_values:
+            converters = [
+                export_converter or converter
+                for converter, export_converter in zip(
+                    converters, self._get_export_converters(columns)
+                )
+            ]
+
+        return pyarrow.schema(fields), converters
+
+    def _get_export_converters(self, columns: list[str]) -> list:
+        """
+        Gives the function (or None) from `DatabaseTable.get_export_converters`
+        for each column, including columns of related tables (e.g.
+        "structure__structure").
+        """
+        converters = []
+        for column in columns:
+            model = self.model
+            *relations, field_name = column.split("__")
+            try:
+                for relation in relations:
+                    model = model._meta.get_field(relation).related_model
+            except (FieldDoesNotExist, AttributeError):
+                model = None
+            get_converters = getattr(model, "get_export_converters", dict)
+            converters.append(get_converters().get(field_name))
+        return converters
+
     def to_curated_dataframe(self) -> pandas.DataFrame:
         """
         Converts your SearchResults to a list of pymatgen objects
@@ -178,9 +397,34 @@ class SearchResults(models.QuerySet):
 
     def to_toolkit(
         self,
+        batch_size: int = None,
+        parallel: bool = False,
+        max_workers: int = None,
+        lazy: bool = False,
     ) -> list:  # type of object varies (e.g. Structure, BandStructure, etc.)
         """
         Converts your SearchResults to a list of pymatgen objects
+
+        By default, every row is loaded as a database object and converted with
+        its `to_toolkit` method, so objects such as structures keep a link to
+        their `database_object`.
+
+        For large queries, set `batch_size` to instead read rows from the
+        database in batches. When the table defines `toolkit_columns` (e.g.
+        structures and molecules), only those columns are loaded and the
+        objects are not linked to a database object. Each batch can be
+        converted across `max_workers` processes with `parallel=True`, and
+        `lazy=True` gives a generator so that only one batch is held in memory
+        at a time:
+
+        ``` python
+        for structure in MatprojStructure.objects.to_toolkit(
+            batch_size=10_000,
+            parallel=True,
+            lazy=True,
+        ):
+            ...
+        ```
         """
 
         # This method will only be for structures and other classes that
@@ -190,22 +434,50 @@ class SearchResults(models.QuerySet):
                 "This database table does not have a to_toolkit method implemented"
             )
 
-        # now we can iterate through the queryset and return the converted
-        # pymatgen objects as a list
-        return [obj.to_toolkit() for obj in self]
+        if not batch_size and not parallel and not lazy:
+            # now we can iterate through the queryset and return the converted
+            # pymatgen objects as a list
+            return [obj.to_toolkit() for obj in self]
+
+        batch_size = batch_size or 10_000
+        if self.model.toolkit_columns and hasattr(self.model, "toolkit_from_values"):
+            rows = self.values_list(*self.model.toolkit_columns).iterator(
+                chunk_size=batch_size
+            )
+            function = self.model.toolkit_from_values
+        else:
+            rows = ((obj,) for obj in self.iterator(chunk_size=batch_size))
+            function = _object_to_toolkit
+
+        results = convert_in_batches(
+            function,
+            rows,
+            batch_size=batch_size,
+            parallel=parallel,
+            max_workers=max_workers,
+        )
+        return results if lazy else list(results)
 
     def to_archive(
         self,
         filename: Path | str = None,
         format: str = "csv",
         columns: str | list[str] = "minimal",
-    ):
+        batch_size: int = 100_000,
+        compression_level: int = None,
+        num_chunks: int = None,
+        parallel: bool | str = False,
+    ) -> Path:
         """
         Writes a compressed zip file of the queryset data.
 
         Supports both CSV and Parquet formats, and flexible column selection
         (minimal archive fields, all columns, or a custom list).
 
+        Rows are streamed from the database in batches (see `to_arrow_batches`)
+        and written as they come in, so even tables with tens of millions of
+        rows can be archived with bounded memory.
+
         This method is attached to the table manager to allow queryset
         filtering before dumping data.
 
@@ -218,7 +490,8 @@ class SearchResults(models.QuerySet):
             The filename to write the zip file to. By default, None will make
             a filename named MyExampleTableName-2022-01-25.zip (for CSV) or
             MyExampleTableName-2022-01-25.parquet (for Parquet), where the
-            date will be the current day (for versioning).
+            date will be the current day (for versioning). When `num_chunks`
+            is set, this is a directory instead.
 
         - `format`:
             The file format to export. Options are "csv" (default) or "parquet".
@@ -228,6 +501,30 @@ class SearchResults(models.QuerySet):
             - "minimal": Only the archive_fieldset columns (default)
             - "full": All columns in the table
             - A custom list of column names (e.g. ["id", "structure", "energy"])
+
+        - `batch_size`:
+            The number of rows loaded from the database at a time. For parquet,
+            this is also the row group size.
+
+        - `compression_level`:
+            The zstd level for parquet files or the deflate level for csv zip
+            files. Defaults to the library's default.
+
+        - `num_chunks`:
+            (parquet only) Splits rows into this many chunks using the row id
+            (`chunk_key = get_chunk_key(str(id), num_chunks)`) and writes a
+            hive-partitioned directory with one `chunk_key=<n>/data.parquet`
+            file per chunk (chunks without any rows are skipped). This matches
+            the layout and id mapping of the toolkit's `Datastore` class, so
+            the directory can be used as the `live` directory of a datastore.
+
+        - `parallel`:
+            (with `num_chunks` only) How to dispatch writing the chunks, which
+            each run their own query. See `simmate.utils.dispatch` for options.
+
+        #### Returns
+
+        - the path to the archive file (or directory)
         """
 
         # Resolve which columns to export
@@ -244,6 +541,13 @@ class SearchResults(models.QuerySet):
             column_list = columns
             columns_label = "custom"
 
+        if format not in ["csv", "parquet"]:
+            raise ValueError(
+                f"Unsupported archive format: {format}. Use 'csv' or 'parquet'."
+            )
+        if num_chunks and format != "parquet":
+            raise ValueError("Chunked archives are only supported for parquet.")
+
         # Generate the file name if one wasn't given.
         if not filename:
             today = datetime.today()
@@ -256,7 +560,9 @@ class SearchResults(models.QuerySet):
                     str(today.day).zfill(2),
                 ]
             )
-            if format == "parquet":
+            if num_chunks:
+                filename = filename_base
+            elif format == "parquet":
                 filename = filename_base + ".parquet"
             else:
                 filename = filename_base + f".{format}.zip"
@@ -264,46 +570,100 @@ class SearchResults(models.QuerySet):
         filename = Path(filename)
 
         if format == "csv":
-            # Convert to pandas and write CSV, then zip compress
-            df = self.to_dataframe(columns=column_list, engine="pandas")
+            import pyarrow.csv
+
+            # We write the csv straight into the zip file rather than writing
+            # a temporary csv and compressing it afterwards.
             inner_filename = filename.with_suffix("").with_suffix(".csv")
-            df.to_csv(inner_filename, index=False)
-            shutil.make_archive(
-                base_name=str(filename.with_suffix("")),
-                format="zip",
-                root_dir=inner_filename.parent,
-                base_dir=inner_filename.name,
+            with zipfile.ZipFile(
+                filename,
+                "w",
+                compression=zipfile.ZIP_DEFLATED,
+                compresslevel=compression_level,
+            ) as archive:
+                with archive.open(inner_filename.name, "w", force_zip64=True) as file:
+                    schema, _ = self._get_arrow_schema(column_list)
+                    with pyarrow.csv.CSVWriter(file, schema) as writer:
+                        for batch in self.to_arrow_batches(
+                            columns=column_list,
+                            batch_size=batch_size,
+                        ):
+                            writer.write_batch(batch)
+
+        elif not num_chunks:
+            self._write_parquet(
+                filename=filename,
+                columns=column_list,
+                batch_size=batch_size,
+                compression_level=compression_level,
             )
-            inner_filename.unlink()
-
-        elif format == "parquet":
-            # Write parquet directly — no zip wrapper since parquet has
-            # built-in compression.
-            df = self.to_dataframe(columns=column_list, engine="polars")
-            df.write_parquet(filename)
 
         else:
-            raise ValueError(
-                f"Unsupported archive format: {format}. Use 'csv' or 'parquet'."
+            filename.mkdir(parents=True, exist_ok=True)
+            # child processes must open their own database connections, so we
+            # make sure this process isn't holding one when they are started
+            if parallel is True or parallel == "core":
+                connections.close_all()
+            dispatch(
+                list(range(num_chunks)),
+                _write_archive_chunk,
+                parallel=parallel,
+                batch_size=1,
+                queryset=self.all(),
+                num_chunks=num_chunks,
+                directory=filename,
+                columns=column_list,
+                batch_size_rows=batch_size,
+                compression_level=compression_level,
             )
 
+        return filename
+
+    def _write_parquet(
+        self,
+        filename: Path,
+        columns: list[str],
+        batch_size: int = 100_000,
+        compression_level: int = None,
+    ):
+        import pyarrow.parquet
+
+        schema, _ = self._get_arrow_schema(columns)
+        with pyarrow.parquet.ParquetWriter(
+            filename,
+            schema,
+            compression="zstd",
+            compression_level=compression_level,
+        ) as writer:
+            for batch in self.to_arrow_batches(columns=columns, batch_size=batch_size):
+                writer.write_batch(batch, row_group_size=batch_size)
+
     def to_api_dict(
-        self, next_url: str = None, previous_url: str = None, **kwargs
+        self,
+        next_url: str = None,
+        previous_url: str = None,
+        count: int = None,
+        count_is_exact: bool = True,
+        **kwargs,
     ) -> dict:
         """
         Converts the search results to a API dictionary. This is used to generate
         the default API response and can be overwritten.
 
         Note, this is typically called on the *page* object list, and not the
-        full query results.
+        full query results. In that case, the total `count` (and whether it is
+        exact) should be given from the paginator.
         """
+        # counting can take ~20 sec for ~10 mil rows, which is terrible for a
+        # web UI, so we use cached counts or estimates (see `count_cached`)
+        if count is None:
+            count, count_is_exact = self.count_cached()
+
         # We follow the list api format that django rest_framework uses. The
         # next/previous is for pagination
         return {
-            # OPTIMIZE: counting can take ~20 sec for ~10 mil rows, which is
-            # terrible for a web UI. I tried a series of fixes but no luck:
-            #   https://stackoverflow.com/questions/55018986/
-            "count": self.count(),
+            "count": count,
+            "count_is_exact": count_is_exact,
             "next": next_url,
             "previous": previous_url,
             "results": [entry.to_api_dict(**kwargs) for entry in self.all()],
@@ -320,7 +680,7 @@ class SearchResults(models.QuerySet):
         if mode == "curated":
             df = self.model.get_curated_df(self)
         elif mode == "api":
-            df = self.to_dataframe()
+            df = self.to_dataframe(export_values=True)
         else:
             raise Exception(f"Unknown `mode` for `to_csv_response`: {mode}")
 
@@ -363,13 +723,217 @@ class SearchResults(models.QuerySet):
     # and retries with a new connection.
 
     @check_db_conn
-    def bulk_create(self, *args, **kwargs):
-        return super().bulk_create(*args, **kwargs)
+    def bulk_create(self, objs, *args, method: str = "insert", **kwargs):
+        """
+        Same as Django's `bulk_create`, but with an extra `method` option. Use
+        `method="copy"` to load rows with PostgreSQL's `COPY` command instead
+        of `INSERT` (see `bulk_copy`).
+        """
+        if method == "copy":
+            return self.bulk_copy(objs, *args, **kwargs)
+        elif method != "insert":
+            raise ValueError(f"Unknown bulk_create method: {method}")
+        return super().bulk_create(objs, *args, **kwargs)
 
     @check_db_conn
     def bulk_update(self, *args, **kwargs):
         return super().bulk_update(*args, **kwargs)
 
+    @check_db_conn
+    def bulk_copy(
+        self,
+        objs,  # list[DatabaseTable] | pyarrow.Table | Iterator[pyarrow.RecordBatch]
+        batch_size: int = None,
+        ignore_conflicts: bool = False,
+    ) -> int:
+        """
+        Loads many rows into this table using PostgreSQL's `COPY ... FROM STDIN`
+        with the binary format. For large datasets, this is several times
+        faster than `bulk_create`, which sends `INSERT` statements.
+
+        `objs` can be a list of (unsaved) database objects, a `pyarrow.Table`,
+        or an iterable of `pyarrow.RecordBatch` (such as the output of
+        `to_arrow_batches`). For Arrow input, columns must be field names of
+        this table and JSON columns can be given as JSON strings.
+
+        Unlike `bulk_create`, the objects do not have their ids set afterwards,
+        and the number of rows sent is returned instead.
+
+        When the database is not PostgreSQL (or a column type can't be sent
+        in the binary format), this falls back to `bulk_create`.
+        """
+        import pyarrow
+
+        if isinstance(objs, pyarrow.Table):
+            objs = objs.to_batches(max_chunksize=batch_size)
+        elif isinstance(objs, pyarrow.RecordBatch):
+            objs = [objs]
+
+        objs = iter(objs)
+        first = next(objs, None)
+        if first is None:
+            return 0
+
+        total = 0
+        if isinstance(first, pyarrow.RecordBatch):
+            for batch in [first, *objs]:
+                fields, rows = self._get_copy_rows_from_arrow(batch)
+                if not self._copy_rows(
+                    fields, rows, ignore_conflicts, json_as_text=True
+                ):
+                    self._bulk_create_rows(fields, rows, ignore_conflicts)
+                total += len(rows)
+        else:
+            objs = [first, *objs]
+            if connections[self.db].vendor != "postgresql":
+                super().bulk_create(
+                    objs,
+                    batch_size=batch_size,
+                    ignore_conflicts=ignore_conflicts,
+                )
+                return len(objs)
+            for i in range(0, len(objs), batch_size or len(objs)):
+                batch = objs[i : i + (batch_size or len(objs))]
+                fields, rows = self._get_copy_rows_from_objects(batch)
+                if not self._copy_rows(fields, rows, ignore_conflicts):
+                    super().bulk_create(batch, ignore_conflicts=ignore_conflicts)
+                total += len(rows)
+        return total
+
+    def _get_copy_rows_from_objects(self, objs: list) -> tuple:
+        # ids are sent only when every object has one
+        has_pk = [obj.pk is not None for obj in objs]
+        if any(has_pk) and not all(has_pk):
+            raise ValueError(
+                "bulk_copy requires either all or none of the objects to have "
+                "an id set."
+            )
+        fields = [
+            field
+            for field in self.model._meta.concrete_fields
+            if all(has_pk) or not field.primary_key
+        ]
+        rows = [
+            tuple(
+                field.get_prep_value(field.pre_save(obj, add=True)) for field in fields
+            )
+            for obj in objs
+        ]
+        return fields, rows
+
+    def _get_copy_rows_from_arrow(self, batch) -> tuple:
+        # pyarrow.RecordBatch
+        fields = [self.model._meta.get_field(name) for name in batch.schema.names]
+        columns = []
+        for field, column in zip(fields, batch.columns):
+            values = column.to_pylist()
+            # strings in non-text columns (e.g. from csv files) need converting
+            if field.get_internal_type() not in ("CharField", "TextField", "JSONField"):
+                values = [
+                    field.to_python(v) if isinstance(v, str) else v for v in values
+                ]
+            columns.append(values)
+
+        # Django fills in defaults and timestamps itself rather than the
+        # database, so we need to add any columns that are missing
+        present = {field.attname for field in fields}
+        for field in self.model._meta.concrete_fields:
+            if field.attname in present or field.primary_key:
+                continue
+            if getattr(field, "auto_now", False) or getattr(
+                field, "auto_now_add", False
+            ):
+                value = now()
+            elif field.has_default():
+                value = field.get_default()
+            else:
+                continue
+            fields.append(field)
+            columns.append([value] * batch.num_rows)
+
+        return fields, list(zip(*columns))
+
+    def _copy_rows(
+        self,
+        fields: list,
+        rows: list[tuple],
+        ignore_conflicts: bool,
+        json_as_text: bool = False,
+    ) -> bool:
+        # returns False if COPY can't be used for this database or these fields.
+        # Arrow rows give JSON columns as (already encoded) JSON text, whereas
+        # rows from objects give the python values.
+        from simmate.database.core.postgres_copy import (
+            get_field_encoder,
+            write_copy_data,
+        )
+
+        connection = connections[self.db]
+        encoders = (
+            [get_field_encoder(field, connection, json_as_text) for field in fields]
+            if connection.vendor == "postgresql"
+            else [None]
+        )
+        if None in encoders:
+            return False
+
+        buffer = write_copy_data(rows, encoders)
+
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            if ignore_conflicts:
+                # COPY can't skip conflicts, so we copy into a temporary table
+                # and then insert from there. The table may still exist if we
+                # are inside an outer transaction.
+                cursor.execute("DROP TABLE IF EXISTS _bulk_copy")
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE _bulk_copy ON COMMIT DROP AS "
+                    f"SELECT {columns} FROM {table} WITH NO DATA"
+                )
+                cursor.copy_expert(
+                    f"COPY _bulk_copy ({columns}) FROM STDIN WITH (FORMAT binary)",
+                    buffer,
+                )
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"SELECT {columns} FROM _bulk_copy ON CONFLICT DO NOTHING"
+                )
+            else:
+                cursor.copy_expert(
+                    f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)",
+                    buffer,
+                )
+            # ids were given explicitly, so the id sequence must be moved past them
+            if any(field.primary_key for field in fields):
+                for sql in connection.ops.sequence_reset_sql(no_style(), [self.model]):
+                    cursor.execute(sql)
+        return True
+
+    def _bulk_create_rows(
+        self, fields: list, rows: list[tuple], ignore_conflicts: bool
+    ):
+        # JSON columns given as strings (e.g. from Arrow) are decoded. Strings
+        # that aren't valid JSON (such as older archives) are left as-is.
+        json_columns = [
+            i
+            for i, field in enumerate(fields)
+            if field.get_internal_type() == "JSONField"
+        ]
+        attnames = [field.attname for field in fields]
+        db_objects = []
+        for row in rows:
+            row = list(row)
+            for i in json_columns:
+                if isinstance(row[i], str):
+                    try:
+                        row[i] = json.loads(row[i])
+                    except json.JSONDecodeError:
+                        pass
+            db_objects.append(self.model(**dict(zip(attnames, row))))
+        super().bulk_create(db_objects, ignore_conflicts=ignore_conflicts)
+
     # -------------------------------------------------------------------------
 
     # Misc utilities for common tasks
@@ -398,6 +962,199 @@ class SearchResults(models.QuerySet):
 
         return self.filter(**{f"{age_column}__gte": cutoff_date})
 
+    def estimate_count(self) -> int:
+        """
+        Gives a fast estimate of the number of rows in these search results.
+
+        On PostgreSQL, unfiltered queries use the table statistics
+        (`pg_class.reltuples`) and filtered ones use the query planner's row
+        estimate (from `EXPLAIN`). These are only as accurate as the table's
+        last `ANALYZE`, which PostgreSQL runs automatically as rows change.
+
+        Other databases give the exact count.
+        """
+        connection = connections[self.db]
+        if connection.vendor != "postgresql":
+            return self.count()
+
+        # the estimate is made without any slicing, which we apply afterwards
+        query = self.query.chain()
+        low_mark, high_mark = query.low_mark, query.high_mark
+        query.clear_limits()
+        query.clear_ordering(force=True)
+
+        with connection.cursor() as cursor:
+            estimate = -1  # postgres gives -1 when the table was never analyzed
+            if not query.where and not query.distinct and not query.combinator:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [connection.ops.quote_name(self.model._meta.db_table)],
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate < 0:
+                try:
+                    sql, params = query.get_compiler(self.db).as_sql()
+                except EmptyResultSet:
+                    return 0
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = plan[0]["Plan"]["Plan Rows"]
+
+        if high_mark is not None:
+            estimate = min(estimate, high_mark)
+        return max(estimate - low_mark, 0)
+
+    # cache of exact counts as {(database, table, sql): (count, time)}
+    _count_cache: dict = {}
+
+    def count_cached(
+        self,
+        timeout: float = None,
+        estimate_threshold: int = None,
+    ) -> tuple[int, bool]:
+        """
+        Gives the number of rows in these search results along with whether
+        that number is exact, as `(count, is_exact)`.
+
+        Queries estimated to have more rows than `estimate_threshold` give the
+        estimate (see `estimate_count`) rather than counting every row. Exact
+        counts are cached for `timeout` seconds, keyed by the query's SQL, so
+        repeated searches (e.g. each page of the same filters) count only once.
+
+        The defaults come from the `website.count_cache_timeout` and
+        `website.count_estimate_threshold` settings.
+        """
+        if timeout is None:
+            timeout = settings.website.count_cache_timeout
+        if estimate_threshold is None:
+            estimate_threshold = settings.website.count_estimate_threshold
+
+        try:
+            sql, params = self.query.sql_with_params()
+        except EmptyResultSet:
+            return 0, True
+        key = (self.db, self.model._meta.db_table, sql, str(params))
+
+        cached = self._count_cache.get(key, None)
+        if cached and time.time() - cached[1] < timeout:
+            return cached[0], True
+
+        # sliced queries that can't give more rows than the threshold are
+        # always counted exactly, so there is no need to estimate them
+        high_mark = self.query.high_mark
+        if (
+            estimate_threshold
+            and (high_mark is None or high_mark > estimate_threshold)
+            and connections[self.db].vendor == "postgresql"
+        ):
+            estimate = self.estimate_count()
+            if estimate > estimate_threshold:
+                return estimate, False
+
+        count = self.count()
+        if timeout:
+            # drop expired entries so the cache doesn't grow indefinitely
+            if len(self._count_cache) > 1_000:
+                for old_key, (_, cached_at) in list(self._count_cache.items()):
+                    if time.time() - cached_at >= timeout:
+                        self._count_cache.pop(old_key, None)
+            self._count_cache[key] = (count, time.time())
+        return count, True
+
+    def get_cursor_page(
+        self,
+        cursor: str = None,
+        order_by: str | list[str] = None,
+        page_size: int = 25,
+    ):  # -> CursorPage
+        """
+        Gives a single page of results using keyset (cursor) pagination.
+
+        Rather than skipping rows with OFFSET (which must scan every row before
+        the page), each page starts where the last one ended by filtering on the
+        `order_by` columns. This makes every page as fast as the first, so
+        there is no need to limit how many results can be reached.
+
+        The `next_cursor` and `previous_cursor` of the returned page can be
+        passed back as `cursor` to get the neighboring pages. When no cursor is
+        given, the first page is returned.
+
+        Ordering defaults to the ordering already on the query, or "-id" if
+        there is none. "id" is always added as a tie-breaker. Null values are
+        always placed last, for both ascending and descending columns.
+
+        An `InvalidCursorError` (a `ValueError`) is raised for cursors that
+        can't be decoded or were made for a different ordering.
+        """
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        ordering = list(order_by or self.query.order_by or ["-id"])
+        if any(not isinstance(o, str) for o in ordering):
+            raise ValueError("Cursor pagination only supports ordering by column names")
+        ordering = ["-id" if o == "-pk" else "id" if o == "pk" else o for o in ordering]
+        if "id" not in ordering and "-id" not in ordering:
+            ordering.append("id")
+        columns = [o.removeprefix("-") for o in ordering]
+
+        # the default placement of nulls differs between databases, so we set
+        # it explicitly for the keyset filter to match
+        order_expressions = [
+            (
+                models.F(o[1:]).desc(nulls_last=True)
+                if o.startswith("-")
+                else models.F(o).asc(nulls_last=True)
+            )
+            for o in ordering
+        ]
+        queryset = self.order_by(*order_expressions)
+        direction = "next"
+        if cursor:
+            cursor_data = _decode_cursor(cursor)
+            if cursor_data["order_by"] != ordering:
+                raise InvalidCursorError(
+                    "This cursor was made for a different ordering"
+                )
+            direction = cursor_data["direction"]
+            queryset = queryset.filter(
+                _get_keyset_filter(ordering, cursor_data["values"], direction)
+            )
+            if direction == "previous":
+                queryset = queryset.reverse()
+
+        # we grab one extra row to see whether there are more results. Only the
+        # ordering columns are loaded here, and then the full page by id.
+        rows = list(queryset.values_list(*columns)[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "previous":
+            rows.reverse()
+
+        id_index = columns.index("id")
+        object_list = self.filter(id__in=[row[id_index] for row in rows]).order_by(
+            *order_expressions
+        )
+
+        # pages in the "next" direction always have a previous page (except
+        # the first page) and vice versa
+        has_next = has_more if direction == "next" else True
+        has_previous = bool(cursor) if direction == "next" else has_more
+        return CursorPage(
+            object_list=object_list,
+            next_cursor=(
+                _encode_cursor(ordering, rows[-1], "next")
+                if has_next and rows
+                else None
+            ),
+            previous_cursor=(
+                _encode_cursor(ordering, rows[0], "previous")
+                if has_previous and rows
+                else None
+            ),
+            all_results=self,
+        )
+
     def count_by_column(self, column: str) -> dict:
         """
         Util to count the rows per column. Meant for ChoiceField columns such
@@ -407,6 +1164,296 @@ class SearchResults(models.QuerySet):
         return {entry[column]: entry["count"] for entry in result}
 
 
+def _object_to_toolkit(obj):
+    return obj.to_toolkit()
+
+
+def convert_in_batches(
+    function: callable,
+    rows: Iterator[tuple],
+    batch_size: int = 10_000,
+    parallel: bool = False,
+    max_workers: int = None,
+) -> Iterator:
+    """
+    Yields `function(*row)` for every row, reading `rows` in batches so that
+    only one batch is held in memory. With `parallel=True`, each batch is
+    split across a pool of processes.
+
+    This is used by `SearchResults.to_toolkit`, but works with any iterator of
+    rows (such as from `values_list`).
+    """
+    if not parallel:
+        for row in rows:
+            yield function(*row)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # the pool is reused for every batch to avoid the cost of starting workers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        nworkers = executor._max_workers
+        while batch := list(islice(rows, batch_size)):
+            yield from executor.map(
+                function,
+                *zip(*batch),
+                chunksize=max(len(batch) // (nworkers * 4), 1),
+            )
+
+
+class SearchResultsPaginator(Paginator):
+    """
+    A Django `Paginator` that counts rows with `SearchResults.count_cached`, so
+    that each page of a large table doesn't need to count every row.
+
+    Check `count_is_exact` to see whether `count` is an estimate.
+
+    When `limit` is given, only pages within the first `limit` results can be
+    requested, while `count` still gives the total number of results.
+    """
+
+    def __init__(self, *args, limit: int = None, **kwargs):
+        self.limit = limit
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def _page_count(self) -> int:
+        # the number of results that can be reached through the pages
+        return min(self.count, self.limit) if self.limit else self.count
+
+    @cached_property
+    def num_pages(self) -> int:
+        if self._page_count == 0 and not self.allow_empty_first_page:
+            return 0
+        hits = max(1, self._page_count - self.orphans)
+        return ceil(hits / self.per_page)
+
+    def page(self, number) -> Page:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self._page_count:
+            top = self._page_count
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    @cached_property
+    def _count_info(self) -> tuple[int, bool]:
+        if isinstance(self.object_list, SearchResults):
+            return self.object_list.count_cached()
+        return super().count, True
+
+    @cached_property
+    def count(self) -> int:
+        return self._count_info[0]
+
+    @cached_property
+    def count_is_exact(self) -> bool:
+        return self._count_info[1]
+
+
+class CursorPage:
+    """
+    A single page of results from keyset pagination. See
+    `SearchResults.get_cursor_page` for more info.
+    """
+
+    def __init__(
+        self,
+        object_list: SearchResults,
+        next_cursor: str = None,
+        previous_cursor: str = None,
+        all_results: SearchResults = None,
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.all_results = all_results
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @cached_property
+    def _count_info(self) -> tuple[int, bool]:
+        return self.all_results.count_cached()
+
+    @property
+    def count(self) -> int:
+        """
+        The total number of results across all pages (see `count_is_exact`)
+        """
+        return self._count_info[0]
+
+    @property
+    def count_is_exact(self) -> bool:
+        return self._count_info[1]
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # django rounds times to milliseconds, but cursors need the exact value
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _encode_cursor(ordering: list[str], values: tuple, direction: str) -> str:
+    data = {"order_by": ordering, "values": values, "direction": direction}
+    data = json.dumps(data, cls=_CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        cursor_data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        is_valid = cursor_data["direction"] in ("next", "previous") and len(
+            cursor_data["values"]
+        ) == len(cursor_data["order_by"])
+    except (ValueError, TypeError, KeyError):
+        is_valid = False
+    if not is_valid:
+        raise InvalidCursorError("Invalid pagination cursor")
+    return cursor_data
+
+
+def _get_keyset_filter(ordering: list[str], values: list, direction: str) -> Q:
+    # For an ordering of (a, b, c), rows after (x, y, z) are those where...
+    #   a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    # ...where ">" becomes "<" for descending columns or the previous page.
+    # Nulls are always last (see `get_cursor_page`), so the rows after a
+    # value also include nulls, and no rows come after a null (only ties).
+    after = direction == "next"
+    keyset_filter = Q()
+    for i, column in enumerate(ordering):
+        name = column.removeprefix("-")
+        if values[i] is None:
+            if after:
+                continue
+            condition = Q(**{f"{name}__isnull": False})
+        else:
+            lookup = "lt" if column.startswith("-") == after else "gt"
+            condition = Q(**{f"{name}__{lookup}": values[i]})
+            if after:
+                condition |= Q(**{f"{name}__isnull": True})
+        # "a = x" is "a IS NULL" when x is null
+        for previous_column, value in zip(ordering[:i], values[:i]):
+            condition &= Q(**{previous_column.removeprefix("-"): value})
+        keyset_filter |= condition
+    return keyset_filter
+
+
+def _write_archive_chunk(
+    chunk_key: int,
+    queryset: SearchResults,
+    num_chunks: int,
+    directory: Path,
+    columns: list[str],
+    batch_size_rows: int,
+    compression_level: int = None,
+):
+    """
+    Writes a single `chunk_key=<n>/data.parquet` file of a chunked archive.
+    This is a module-level function so it can be sent to other processes or
+    workers by `dispatch` (see `SearchResults.to_archive`).
+
+    The chunk keys are md5-based (to match the Datastore), so they can't be
+    computed in SQL. Instead, each writer scans the ids of the queryset in
+    order, keeps the ones that belong to its chunk, and loads those rows by
+    id. Only one batch of ids and rows is held in memory at a time. No file
+    is written if the chunk has no rows.
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    # keep each `id__in` query under the database's limit of query parameters
+    max_query_params = connections[queryset.db].features.max_query_params
+    ids_per_query = min(batch_size_rows, max_query_params or batch_size_rows)
+
+    schema, _ = queryset._get_arrow_schema(columns)
+    writer = None
+
+    def write_row_group(batches: list):
+        # the file is only created once there are rows to write
+        nonlocal writer
+        if not writer:
+            chunk_directory = directory / f"chunk_key={chunk_key}"
+            chunk_directory.mkdir(parents=True, exist_ok=True)
+            writer = pyarrow.parquet.ParquetWriter(
+                chunk_directory / "data.parquet",
+                schema,
+                compression="zstd",
+                compression_level=compression_level,
+            )
+        writer.write_table(
+            pyarrow.Table.from_batches(batches, schema=schema),
+            row_group_size=batch_size_rows,
+        )
+
+    try:
+        # queries can be smaller than a row group, so we buffer batches
+        # until a full row group is ready
+        buffer = []
+        nrows = 0
+        for ids in _iter_chunk_ids(queryset, chunk_key, num_chunks, ids_per_query):
+            for batch in queryset.model.objects.filter(id__in=ids).to_arrow_batches(
+                columns=columns,
+                batch_size=ids_per_query,
+            ):
+                buffer.append(batch)
+                nrows += batch.num_rows
+            if nrows >= batch_size_rows:
+                write_row_group(buffer)
+                buffer = []
+                nrows = 0
+        if buffer:
+            write_row_group(buffer)
+    finally:
+        if writer:
+            writer.close()
+
+
+def _iter_chunk_ids(
+    queryset: SearchResults,
+    chunk_key: int,
+    num_chunks: int,
+    batch_size: int,
+) -> Iterator[list]:
+    """
+    Scans the ids of a queryset in ascending order (using `id > last_id`
+    ranges) and gives lists of up to `batch_size` ids that belong to the
+    given chunk.
+    """
+    ids_queryset = queryset.order_by("id").values_list("id", flat=True)
+    matching_ids = []
+    last_id = None
+    while True:
+        page = ids_queryset if last_id is None else ids_queryset.filter(id__gt=last_id)
+        ids = list(page[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        matching_ids += [
+            i for i in ids if get_chunk_key(str(i), num_chunks) == chunk_key
+        ]
+        if len(matching_ids) >= batch_size:
+            yield matching_ids[:batch_size]
+            matching_ids = matching_ids[batch_size:]
+    if matching_ids:
+        yield matching_ids
+
+
 # Copied this line from...
 # https://github.com/chrisdev/django-pandas/blob/master/django_pandas/managers.py
 # It simply converts this queryset class to a manager.
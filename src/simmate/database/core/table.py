@@ -3,12 +3,11 @@
 import inspect
 import textwrap
 import urllib
-from functools import cache
 from pathlib import Path
 
 import yaml
 from django.apps import apps
-from django.core.paginator import Page, Paginator
+from django.core.paginator import Page
 from django.db import models  # see comment below
 from django.db import models as table_column
 from django.forms.models import model_to_dict
@@ -18,11 +17,17 @@ from django.urls import resolve, reverse
 from django.utils.module_loading import import_string
 
 from simmate.config import settings
-from simmate.database.utils import check_db_conn
-from simmate.utils import get_attributes_doc
+from simmate.database.utils import cache_table_metadata, check_db_conn
+from simmate.utils import get_attributes_doc, write_yaml
 
 from .archive import ArchiveMixin
-from .search_results import DatabaseTableManager, SearchResults
+from .search_results import (
+    CursorPage,
+    DatabaseTableManager,
+    SearchResults,
+    SearchResultsPaginator,
+    convert_in_batches,
+)
 
 # The "as table_column" line does NOTHING but rename a module.
 # I have this because I want to use "table_column.CharField(...)" instead
@@ -92,6 +97,24 @@ class DatabaseTable(models.Model, ArchiveMixin):
     exclude because its not very readable and is available elsewhere.
     """
 
+    toolkit_columns: list[str] = []
+    """
+    The columns needed to build this table's toolkit object (e.g. "structure").
+    When set along with `toolkit_from_values`, `SearchResults.to_toolkit` can
+    convert rows in batches without loading full database objects.
+    """
+
+    export_converters: dict = {}
+    """
+    Functions that convert a column's stored value into the value that is shown
+    to users, as `{column: function}`. These are applied in API responses and
+    CSV downloads (see `SearchResults.to_dataframe(export_values=True)`), but
+    not in archives, which keep the stored values so they load back quickly.
+    For example, structures are stored in a compact binary format but shown
+    as POSCAR or CIF text. Converters from mix-ins are combined (see
+    `get_export_converters`).
+    """
+
     # -------------------------------------------------------------------------
     # The primary save methods used to add entries to the database
     # -------------------------------------------------------------------------
@@ -127,6 +150,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
         return cls._meta.get_fields()
 
     @classmethod
+    @cache_table_metadata
     def get_column_names(
         cls,
         include_parents: bool = True,
@@ -212,16 +236,15 @@ class DatabaseTable(models.Model, ArchiveMixin):
         print(yaml.dump(column_names))
 
     @classmethod
+    @cache_table_metadata
     def get_column_docs(cls) -> dict:
         """
         Gives all column names as well as their docstring descriptions
         """
 
-        # OPTIMIZE: this is slow and should be cached. Or even use a more
-        # standard method approach like django's `help_text`.
         # We opted for using attribute docstrings, which actually aren't
         # officially supported by python and involve inspecting the source
-        # code file.
+        # code file. This is slow, so results are cached per table.
 
         all_attr_docs = get_attributes_doc(cls)
 
@@ -234,6 +257,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
         return column_docs
 
     @classmethod
+    @cache_table_metadata
     def get_table_docs(cls) -> dict:
         """
         Grabs table metadata and column descriptions into a single dictionary
@@ -286,6 +310,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
             return final_str
 
     @classmethod
+    @cache_table_metadata
     def get_mixins(cls) -> list:  # -> List[DatabaseTable]
         """
         Grabs the mix-in Tables that were used to make this class. This will
@@ -301,6 +326,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
         ]
 
     @classmethod
+    @cache_table_metadata
     def get_mixin_names(cls) -> list[str]:
         """
         Grabs the mix-in Tables that were used to make this class and returns
@@ -309,6 +335,20 @@ class DatabaseTable(models.Model, ArchiveMixin):
         return [mixin.table_name for mixin in cls.get_mixins()]
 
     @classmethod
+    @cache_table_metadata
+    def get_export_converters(cls) -> dict:
+        """
+        Gives the `export_converters` of this table combined with those of
+        its mix-ins (e.g. both "structure" and "band_structure_arrays").
+        """
+        converters = {}
+        for mixin in cls.get_mixins():
+            converters.update(mixin.get_export_converters())
+        converters.update(cls.export_converters)
+        return converters
+
+    @classmethod
+    @cache_table_metadata
     def get_extra_columns(cls) -> list[str]:
         """
         Finds all columns that aren't covered by the supported Table mix-ins.
@@ -390,10 +430,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
         except:
             pass
 
-        summary_filename = directory / "simmate_summary.yaml"
-        with summary_filename.open("w") as file:
-            content = yaml.dump(all_data)
-            file.write(content)
+        write_yaml(all_data, directory / "simmate_summary.yaml")
 
     def to_dict(self):
         return {
@@ -453,19 +490,21 @@ class DatabaseTable(models.Model, ArchiveMixin):
 
             query_info[table_name].append(table_id)
 
-        results = []
+        all_data_dict = {}  # (database table, id) --> database object
         for table_name, table_ids in query_info.items():
             datatable = cls.get_table(table_name)
             query = datatable.objects.filter(id__in=table_ids).all()
-            results += list(query)
+            all_data_dict.update({(table_name, entry.id): entry for entry in query})
 
-        # the query does not return the ids in the same order that table_ids
-        # was given. Order is important in some cases, so we fix this here.
-        all_data_dict = {entry.id: entry for entry in results}
+        # the query does not return the ids in the same order that they were
+        # given. Order is important in some cases, so we fix this here.
         all_data_ordered = [
-            all_data_dict[id]
-            for id in table_ids
-            if id in all_data_dict.keys()  # BUG: should I warn if the id isn't found?
+            all_data_dict[key]
+            for key in (
+                (source["database_table"], source["database_id"])
+                for source in source_dicts
+            )
+            if key in all_data_dict  # BUG: should I warn if the id isn't found?
         ]
 
         return all_data_ordered
@@ -592,7 +631,9 @@ class DatabaseTable(models.Model, ArchiveMixin):
         # This is for simple tables. If there are related table entries that
         # need to be created/updated, then this method should be overwritten.
         data_from_dir = self.from_directory(directory, as_dict=True)
-        self.update_from_toolkit(**data_from_dir)
+        # skip the extra save when there was nothing to load
+        if data_from_dir:
+            self.update_from_toolkit(**data_from_dir)
 
     def update_from_results(self, results: dict, directory: Path):
         """
@@ -640,28 +681,140 @@ class DatabaseTable(models.Model, ArchiveMixin):
         a dictionary if as_dict is True; and a database object if as_dict is False
         """
 
-        # Grab a list of all parent classes
-        parents = inspect.getmro(cls)
+        # As we go through the mixins below, we populate data using those
+        # classes. All of this is fed in to our main class at the end of the
+        # function. We keep this running dictionary as we go.
+        all_data = cls._remove_toolkit_kwargs(kwargs)
+
+        for mixin, inputs in cls._get_toolkit_mixins().items():
+            # Go through our kwargs and see if we have any of the keys that
+            # this mixin needs, and if so, grab them.
+            matching_inputs = {key: kwargs[key] for key in inputs if key in kwargs}
+
+            # We now pass these inputs to the _from_toolkit. If we're missing
+            # a required input, this will raise an error here. We only
+            # want the expanded input, so we request a dictionary, not object.
+            data = mixin._from_toolkit(**matching_inputs, as_dict=True)
+
+            # Now add this mixin's data to our collective dictionary
+            all_data.update(data)
 
-        # As we go through the parent classes below, we will identify the mixins
-        # and populate data using those classes. All of this is fed in to our
-        # main class at the end of the function. We keep this running dictionary
-        # as we go.
-        all_data = kwargs.copy()
+        # If as_dict is false, we build this into an Object. Otherwise, just
+        # return the dictionary
+        return all_data if as_dict else cls(**all_data)
+
+    @classmethod
+    def from_toolkit_many(
+        cls,
+        entries: list[dict],
+        as_dict: bool = False,
+        parallel: bool = False,
+        max_workers: int = None,
+        **kwargs,
+    ) -> list:
+        """
+        The batched version of `from_toolkit`, where each entry is a dictionary
+        of the kwargs that you would normally give to `from_toolkit`. The
+        results are in the same order as `entries` and can be passed directly
+        to `bulk_create`:
+
+        ``` python
+        entries = [dict(structure=s, energy=e) for s, e in zip(structures, energies)]
+        objs = MyTable.from_toolkit_many(entries)
+        MyTable.objects.bulk_create(objs, batch_size=10_000)
+        ```
+
+        Each mix-in populates its columns for all entries at once with its
+        `_from_toolkit_many` method, which lets it reuse work between entries
+        (e.g. the `Structure` mix-in only analyzes each composition once).
+
+        #### Parameters
+
+        - `entries` :
+            A list of kwargs, one for each database entry.
+        - `as_dict` :
+            Whether to return the populated data as dictionaries or to initialize
+            them as database objects. Defaults to False.
+        - `parallel` :
+            Whether to split the expensive parts of each mix-in (such as
+            symmetry analysis) across a pool of processes. Only worth it for
+            thousands of entries. Defaults to False.
+        - `max_workers` :
+            The number of processes to use when `parallel=True`. Defaults to
+            the number of CPUs.
+        - `**kwargs` :
+            Extra kwargs that are shared by all entries (e.g. `source`).
+
+        Returns
+        -------
+        a list of dictionaries if as_dict is True; and a list of database
+        objects if as_dict is False
+        """
+        entries = [{**kwargs, **entry} for entry in entries]
+        all_data = [cls._remove_toolkit_kwargs(entry) for entry in entries]
+
+        for mixin, inputs in cls._get_toolkit_mixins().items():
+            matching_inputs = [
+                {key: entry[key] for key in inputs if key in entry} for entry in entries
+            ]
+            mixin_data = mixin._from_toolkit_many(
+                matching_inputs,
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+            for data, new_data in zip(all_data, mixin_data):
+                data.update(new_data)
+
+        return all_data if as_dict else [cls(**data) for data in all_data]
+
+    @classmethod
+    def _from_toolkit_many(
+        cls,
+        inputs: list[dict],
+        parallel: bool = False,
+        max_workers: int = None,
+    ) -> list[dict]:
+        """
+        Gives the result of `_from_toolkit(**kwargs, as_dict=True)` for each
+        dictionary of kwargs in `inputs`. Mix-ins can override this with a
+        faster, batched version.
+        """
+        return list(
+            convert_in_batches(
+                _mixin_from_toolkit,
+                ((cls, kwargs) for kwargs in inputs),
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+        )
+
+    @staticmethod
+    def _remove_toolkit_kwargs(kwargs: dict) -> dict:
+        data = kwargs.copy()
         # TODO: How should I best handle passing extra kwargs to the final class
         # initialization? For example, I would want to pass `energy` but I wouldn't
         # want to pass the toolkit structure object. I may update this line in
         # the future to remove python objects. For now, I only remove structure
         # and migration_hop because I know that it is a toolkit object -- not
         # a database column.
-        all_data.pop("structure", None)
-        all_data.pop("migration_hop", None)
-        all_data.pop("migration_images", None)
-        all_data.pop("band_structure", None)
-        all_data.pop("density_of_states", None)
-        all_data.pop("molecule", None)
-
-        for parent in parents:
+        data.pop("structure", None)
+        data.pop("migration_hop", None)
+        data.pop("migration_images", None)
+        data.pop("band_structure", None)
+        data.pop("density_of_states", None)
+        data.pop("molecule", None)
+        data.pop("defer_spacegroup", None)
+        return data
+
+    @classmethod
+    @cache_table_metadata
+    def _get_toolkit_mixins(cls) -> dict:
+        """
+        Gives the mix-ins used by `from_toolkit` along with the names of the
+        kwargs that their `_from_toolkit` method accepts.
+        """
+        mixins = {}
+        for parent in inspect.getmro(cls):
             # Skip the parent class if it doesn't directly inherit from the
             # DatabaseTable class. We do this because we want the fundamental
             # mixins that come with Simmate (such as Structure, Forces, Thermodynamics).
@@ -677,25 +830,9 @@ class DatabaseTable(models.Model, ArchiveMixin):
             inputs = inspect.getfullargspec(parent._from_toolkit).args
             inputs.remove("as_dict")
             inputs.remove("cls")
+            mixins[parent] = inputs
 
-            # Now inputs is current of list of keys that we need. Next, we go
-            # through our kwargs and see if we have any of these keys, and if so,
-            # grab them.
-            matching_inputs = {
-                key: kwargs[key] for key in inputs if key in kwargs.keys()
-            }
-
-            # We now pass these inputs to the _from_toolkit. If we're missing
-            # a required input, this will raise an error here. We only
-            # want the expanded input, so we request a dictionary, not object.
-            data = parent._from_toolkit(**matching_inputs, as_dict=True)
-
-            # Now add this mixin's data to our collective dictionary
-            all_data.update(data)
-
-        # If as_dict is false, we build this into an Object. Otherwise, just
-        # return the dictionary
-        return all_data if as_dict else cls(**all_data)
+        return mixins
 
     # -------------------------------------------------------------------------
     # Methods that set up the REST API and filters that can be queried with
@@ -724,11 +861,15 @@ class DatabaseTable(models.Model, ArchiveMixin):
         # See https://stackoverflow.com/questions/21925671/
         # Consider forking model_to_dict or writing custom method.
         # !!! Does not support columns accross relations such as "user__email"
-        return model_to_dict(
+        api_dict = model_to_dict(
             instance=self,
             fields=self.get_column_names() if fields is None else fields,
             exclude=exclude,
         )
+        for column, converter in self.get_export_converters().items():
+            if api_dict.get(column) is not None:
+                api_dict[column] = converter(api_dict[column])
+        return api_dict
 
     def to_json_response(self, **kwargs) -> JsonResponse:
         """
@@ -759,7 +900,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
 
     @classmethod
     @property
-    @cache
+    @cache_table_metadata
     def filter_methods(cls) -> list[str]:
         """
         All filtering methods that can be used to narrow a queryset
@@ -778,7 +919,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
 
     @classmethod
     @property
-    @cache
+    @cache_table_metadata
     def filter_methods_extra_args(cls) -> list[str]:
         """
         Any unique parameters that are used as kwargs in `filter_methods`
@@ -877,9 +1018,15 @@ class DatabaseTable(models.Model, ArchiveMixin):
         page_size: int = 25,
         paginate: bool = True,
         use_web_queryset: bool = False,
-    ) -> SearchResults | Page:
+        cursor: str = None,
+    ) -> SearchResults | Page | CursorPage:
         """
         Converts URL kwargs into a queryset.
+
+        When `cursor` is given, keyset pagination is used instead of page
+        numbers (see `SearchResults.get_cursor_page`). An empty cursor gives
+        the first page. Keyset pages are equally fast at any depth, so `limit`
+        is not applied in this mode.
         """
 
         # Some tables have "advanced" filtering logic. These want us to call
@@ -920,9 +1067,17 @@ class DatabaseTable(models.Model, ArchiveMixin):
                 # The latter is more explicit and robust to errors.
                 # BUG: if the first positional is supposed to be a dict,
                 # you must use the JSON approach instead.
+                # With a single arg, any extra kwargs of the method that were
+                # given alongside it are passed too (e.g. `include_subsystems`
+                # for `chemical_system="Y-C-F"`).
                 method = getattr(queryset, f"filter_{filter_name}")
                 if not isinstance(filter_value, dict):
-                    queryset = method(filter_value)
+                    method_kwargs = {
+                        key: filters[key]
+                        for key in inspect.signature(method).parameters
+                        if key in filter_methods_args and key in filters
+                    }
+                    queryset = method(filter_value, **method_kwargs)
                 else:
                     queryset = method(**filter_value)
 
@@ -953,6 +1108,13 @@ class DatabaseTable(models.Model, ArchiveMixin):
         # now that all filter_methods have been applied, we now apply basic ones
         queryset = queryset.filter(**basic_filters)
 
+        if paginate and cursor is not None:
+            return queryset.get_cursor_page(
+                cursor=cursor,
+                order_by=order_by,
+                page_size=page_size,
+            )
+
         # Handle ordering
         # the ordered_by kwarg takes priority, but in cases where none is set
         # AND the queryset filters didn't give any, pagination still requires
@@ -965,14 +1127,19 @@ class DatabaseTable(models.Model, ArchiveMixin):
                 order_by = [order_by]
             queryset = queryset.order_by(*order_by)
 
-        if limit:
-            queryset = queryset[:limit]
-
-        # if requested, split the results into pages and grab the requested one
+        # if requested, split the results into pages and grab the requested one.
+        # The paginator counts the full results (which may use an estimate for
+        # large tables) and applies the limit to the pages itself.
         if paginate:
-            paginator = Paginator(object_list=queryset, per_page=page_size)
+            paginator = SearchResultsPaginator(
+                object_list=queryset,
+                per_page=page_size,
+                limit=limit,
+            )
             page_obj = paginator.get_page(number=page)
             return page_obj
+        elif limit:
+            return queryset[:limit]
         else:
             return queryset
 
@@ -1014,7 +1181,8 @@ class DatabaseTable(models.Model, ArchiveMixin):
     def get_curated_df(cls, queryset=None):
         if queryset is None:
             queryset = cls.objects
-        return queryset.to_dataframe()  # default to just raw data
+        # default to just raw data (as shown to users)
+        return queryset.to_dataframe(export_values=True)
 
     # -------------------------------------------------------------------------
     # Methods for bulk-loading data from external sources
@@ -1032,3 +1200,7 @@ class DatabaseTable(models.Model, ArchiveMixin):
         raise NotImplementedError(
             "The `load_source_data` method has not been implemented for this table."
         )
+
+
+def _mixin_from_toolkit(mixin: DatabaseTable, kwargs: dict) -> dict:
+    return mixin._from_toolkit(**kwargs, as_dict=True)
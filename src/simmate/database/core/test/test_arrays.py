@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import base64
+
+import numpy
+import pytest
+
+from simmate.database.core.arrays import CompressedArrays
+
+
+def test_compressed_arrays():
+    arrays = dict(
+        decimals=numpy.array([[-3.2541, 0.0, 12.5], [1e-4, 2.0, -7.125]]),
+        floats=numpy.random.random((4, 5, 2)),
+        integers=numpy.arange(10),
+        float32=numpy.array([0.1, 0.5], dtype="f4"),
+        booleans=numpy.array([True, False]),
+        empty=numpy.zeros((0, 3)),
+    )
+    string = CompressedArrays.to_str(arrays, metadata={"efermi": 0.5})
+    assert string.startswith("@")
+
+    loaded = CompressedArrays.from_str(string)
+    assert loaded.metadata == {"efermi": 0.5}
+    assert loaded.names == list(arrays)
+    assert "floats" in loaded and "missing" not in loaded
+    assert loaded.get("missing") is None
+    for name, array in arrays.items():
+        assert loaded[name].dtype == array.dtype
+        assert loaded[name].shape == array.shape
+        assert numpy.array_equal(loaded[name], array)
+    assert loaded["floats"] is loaded["floats"]  # only decompressed once
+
+    # values with few decimals are stored as integers
+    assert loaded._index["decimals"]["decimals"] == 4
+    assert "decimals" not in loaded._index["floats"]
+
+
+def test_compressed_arrays_invalid():
+    with pytest.raises(ValueError):
+        CompressedArrays.from_str("not arrays")
+
+    data = bytearray(CompressedArrays.to_bytes({"a": numpy.arange(3)}))
+    data[3] = 99  # a future version
+    with pytest.raises(ValueError, match="version 99"):
+        CompressedArrays.from_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        CompressedArrays.from_str("@" + base64.b64encode(b"XXX" + data[3:]).decode())
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import polars
+import pyarrow.parquet
 import pytest
 
-from simmate.website.test_app.models import TestDatabaseTable
+from simmate.conftest import run_benchmark
+from simmate.database.core.search_results import convert_in_batches
+from simmate.toolkit.file_converters.structure.binary import BinaryStructureAdapter
+from simmate.utils import get_chunk_key
+from simmate.website.test_app.models import TestDatabaseTable, TestStructure
 
 
 @pytest.mark.django_db
@@ -20,6 +26,30 @@ def test_show_columns():
     TestDatabaseTable.show_columns()
 
 
+def test_table_metadata_cache():
+    from simmate.database.utils import _TABLE_METADATA, clear_table_metadata
+
+    columns = TestDatabaseTable.get_column_names()
+    assert columns == ["id", "created_at", "updated_at", "column1", "column2"]
+
+    # callers get a copy, so changing it doesn't affect the cache
+    columns.append("fake_column")
+    assert "fake_column" not in TestDatabaseTable.get_column_names()
+    assert TestDatabaseTable.get_column_names(id_mode=True) == columns[:-1]
+
+    # nested values are copied too
+    docs = TestDatabaseTable.get_table_docs()
+    docs["table_info"]["sql_name"] = "fake_table"
+    docs["column_descriptions"].clear()
+    docs = TestDatabaseTable.get_table_docs()
+    assert docs["table_info"]["sql_name"] != "fake_table"
+    assert docs["column_descriptions"]
+
+    clear_table_metadata()
+    assert not _TABLE_METADATA
+    assert TestDatabaseTable.archive_fieldset  # rebuilt on the next call
+
+
 @pytest.mark.django_db
 def test_to_dataframe():
     TestDatabaseTable.objects.to_dataframe()
@@ -77,3 +107,489 @@ def test_archive(tmp_path):
     #     "https://assets.simmate.org/TestDatabaseTable-2022-02-08.zip"
     # )
     # TestDatabaseTable.load_remote_archive()
+
+
+@pytest.mark.django_db
+def test_to_dataframe_stream():
+    for i in range(25):
+        TestDatabaseTable(column1=bool(i % 2), column2=i * 0.5).save()
+
+    batches = list(TestDatabaseTable.objects.to_arrow_batches(batch_size=10))
+    assert [b.num_rows for b in batches] == [10, 10, 5]
+    assert batches[0].schema == batches[-1].schema
+    assert batches[0].schema.field("column2").type == "double"
+
+    df = TestDatabaseTable.objects.order_by("id").to_dataframe(
+        stream=True, batch_size=10
+    )
+    df_orig = TestDatabaseTable.objects.order_by("id").to_dataframe()
+    assert list(df.columns) == list(df_orig.columns)
+    assert df.column2.tolist() == df_orig.column2.tolist()
+
+    df = TestDatabaseTable.objects.filter(column1=True).to_dataframe(
+        columns=["id", "column2"],
+        stream=True,
+        engine="polars",
+        limit=5,
+    )
+    assert df.columns == ["id", "column2"]
+    assert df.height == 5
+
+
+@pytest.mark.django_db
+def test_archive_parquet(tmp_path):
+    for i in range(10):
+        TestDatabaseTable(column1=bool(i % 2), column2=i * 0.5).save()
+
+    # a single file with small row groups
+    filename = TestDatabaseTable.objects.to_archive(
+        filename=tmp_path / "test_table.parquet",
+        format="parquet",
+        batch_size=4,
+        compression_level=3,
+    )
+    assert pyarrow.parquet.ParquetFile(filename).num_row_groups == 3
+
+    # a hive-partitioned directory that matches the Datastore layout
+    directory = TestDatabaseTable.to_archive(
+        filename=tmp_path / "test_table_chunks",
+        format="parquet",
+        num_chunks=3,
+    )
+    assert sorted(d.name for d in directory.iterdir()) == [
+        "chunk_key=0",
+        "chunk_key=1",
+        "chunk_key=2",
+    ]
+    # rows are placed in the same chunks that the Datastore would use
+    for chunk_directory in directory.iterdir():
+        chunk_key = int(chunk_directory.name.split("=")[1])
+        table = pyarrow.parquet.read_table(chunk_directory / "data.parquet")
+        assert table.num_rows
+        for row_id in table.column("id").to_pylist():
+            assert get_chunk_key(str(row_id), 3) == chunk_key
+
+    # filtered querysets are scanned in id ranges smaller than the table, and
+    # chunks without any rows give no file
+    directory_filtered = TestDatabaseTable.objects.filter(column2__gte=3.5).to_archive(
+        filename=tmp_path / "test_table_filtered",
+        format="parquet",
+        num_chunks=6,
+        batch_size=2,
+    )
+    tables = [
+        pyarrow.parquet.read_table(d / "data.parquet")
+        for d in directory_filtered.iterdir()
+    ]
+    assert sorted(i for t in tables for i in t.column("column2").to_pylist()) == [
+        3.5,
+        4.0,
+        4.5,
+    ]
+    assert all(t.num_rows for t in tables)
+
+    # reload the chunked archive into an empty table
+    TestDatabaseTable.objects.all().delete()
+    TestDatabaseTable.load_archive(filename=directory, delete_on_completion=True)
+    assert TestDatabaseTable.objects.count() == 10
+    assert TestDatabaseTable.objects.get(column2=1.5).column1
+    assert not directory.exists()
+
+
+@pytest.mark.django_db
+def test_archive_direct_load(tmp_path, sample_structures):
+    for structure in sample_structures.values():
+        TestStructure.from_toolkit(structure=structure).save()
+    columns = ["structure", "nsites", "spacegroup_id", "formula_full"]
+    expected = list(TestStructure.objects.order_by("id").values_list(*columns))
+
+    # full archives have every column, so rows are inserted without from_toolkit
+    for archive_columns, is_direct in [("full", True), ("minimal", False)]:
+        filename = TestStructure.to_archive(
+            filename=tmp_path / "structures.parquet",
+            format="parquet",
+            columns=archive_columns,
+        )
+        df = polars.read_parquet(filename)
+        assert TestStructure._can_load_archive_directly(df) == is_direct
+        # archives keep our binary format, which loads back without parsing
+        assert all(BinaryStructureAdapter.is_binary_str(s) for s in df["structure"])
+
+        TestStructure.objects.all().delete()
+        TestStructure.load_archive(filename=filename, batch_size=3)
+        loaded = list(TestStructure.objects.order_by("id").values_list(*columns))
+        assert loaded == expected
+
+    # rows missing a derived column can't be inserted directly, even when
+    # the first row has it
+    filename = TestStructure.to_archive(
+        filename=tmp_path / "structures.parquet",
+        format="parquet",
+        columns="full",
+    )
+    df = polars.read_parquet(filename)
+    df_mixed = df.with_columns(
+        polars.when(polars.int_range(df.height) == df.height - 1)
+        .then(None)
+        .otherwise(polars.col("nsites"))
+        .alias("nsites")
+    )
+    assert df_mixed["nsites"][0] is not None
+    assert not TestStructure._can_load_archive_directly(df_mixed)
+
+    # older archives with POSCAR text are converted to the binary format
+    df_text = df.with_columns(
+        polars.col("structure").map_elements(
+            BinaryStructureAdapter.to_text, return_dtype=polars.String
+        )
+    )
+    TestStructure.objects.all().delete()
+    TestStructure._load_archive_batch(df_text)
+    loaded = TestStructure.objects.order_by("id").values_list("structure", flat=True)
+    assert all(BinaryStructureAdapter.is_binary_str(s) for s in loaded)
+
+
+@pytest.mark.django_db
+def test_count_cached():
+    for i in range(5):
+        TestDatabaseTable(column1=bool(i % 2), column2=i).save()
+    search = TestDatabaseTable.objects.filter(column1=True)
+    assert search.estimate_count() == 2  # exact when not using PostgreSQL
+    assert search.count_cached() == (2, True)
+
+    # exact counts are cached by query until the timeout passes
+    TestDatabaseTable(column1=True, column2=5).save()
+    assert TestDatabaseTable.objects.filter(column1=True).count_cached() == (2, True)
+    assert search.count_cached(timeout=0) == (3, True)
+    assert TestDatabaseTable.objects.filter(column1=False).count_cached() == (3, True)
+
+    # pages report the total count rather than the number on the page
+    page = TestDatabaseTable.filter_from_config(
+        filters={"column1": True},
+        page_size=2,
+    )
+    assert page.paginator.count_is_exact
+    api_dict = page.object_list.to_api_dict(
+        count=page.paginator.count,
+        count_is_exact=page.paginator.count_is_exact,
+    )
+    assert api_dict["count"] == 3
+    assert len(api_dict["results"]) == 2
+
+    # the limit caps which pages can be reached, but not the total count
+    page = TestDatabaseTable.filter_from_config(
+        filters={"column1": True},
+        page_size=2,
+        limit=3,
+        page=5,
+    )
+    assert page.paginator.count == 3
+    assert page.paginator.num_pages == 2
+    assert page.number == 2 and len(page) == 1
+    page = TestDatabaseTable.filter_from_config(filters={}, page_size=2, limit=3)
+    assert page.paginator.count == 6
+    assert page.paginator.num_pages == 2
+    assert len(page.paginator.page(2)) == 1
+
+
+@pytest.mark.django_db
+def test_cursor_pagination():
+    # duplicate values in column2 check that id breaks ties
+    for i in range(7):
+        TestDatabaseTable(column1=True, column2=i // 2).save()
+    TestDatabaseTable(column1=False, column2=0).save()
+    expected = list(
+        TestDatabaseTable.objects.filter(column1=True)
+        .order_by("-column2", "id")
+        .values_list("id", flat=True)
+    )
+
+    # walk forward through every page and then back again
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        page = TestDatabaseTable.filter_from_config(
+            filters={"column1": True},
+            order_by="-column2",
+            page_size=3,
+            cursor=cursor,
+        )
+        pages.append([entry.id for entry in page])
+        cursor = page.next_cursor
+    assert pages == [expected[0:3], expected[3:6], expected[6:7]]
+    assert page.count == 7
+
+    page = TestDatabaseTable.objects.filter(column1=True).get_cursor_page(
+        cursor=page.previous_cursor,
+        order_by="-column2",
+        page_size=3,
+    )
+    assert [entry.id for entry in page] == expected[3:6]
+    assert page.has_next() and page.has_previous()
+
+    with pytest.raises(ValueError):
+        TestDatabaseTable.objects.get_cursor_page(cursor=page.next_cursor)
+    with pytest.raises(ValueError):
+        TestDatabaseTable.objects.get_cursor_page(cursor="not-a-cursor")
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_nulls():
+    # nulls are placed last in both directions and are never skipped
+    for i in range(6):
+        TestDatabaseTable(column1=True, column2=i).save()
+    TestDatabaseTable.objects.filter(column2__in=[1, 3, 4]).update(created_at=None)
+    for order_by in ["created_at", "-created_at"]:
+        entries = list(TestDatabaseTable.objects.order_by("id"))
+        dated = sorted(
+            [e for e in entries if e.created_at],
+            key=lambda e: e.created_at,
+            reverse=order_by.startswith("-"),
+        )
+        expected = [e.id for e in dated] + [e.id for e in entries if not e.created_at]
+        pages = []
+        cursor = None
+        while True:
+            page = TestDatabaseTable.objects.get_cursor_page(
+                cursor=cursor,
+                order_by=order_by,
+                page_size=2,
+            )
+            pages += [entry.id for entry in page]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert pages == expected
+
+        # and back again from the last page
+        previous = TestDatabaseTable.objects.get_cursor_page(
+            cursor=page.previous_cursor,
+            order_by=order_by,
+            page_size=2,
+        )
+        assert [entry.id for entry in previous] == expected[2:4]
+
+
+@pytest.mark.django_db
+def test_bulk_copy():
+    # without PostgreSQL, this falls back to bulk_create
+    nrows = TestDatabaseTable.objects.bulk_create(
+        [TestDatabaseTable(column1=True, column2=i) for i in range(5)],
+        method="copy",
+        batch_size=2,
+    )
+    assert nrows == 5
+    assert TestDatabaseTable.objects.count() == 5
+
+    # arrow batches (e.g. from another table) can be given directly
+    batches = TestDatabaseTable.objects.to_arrow_batches(
+        columns=["column1", "column2"],
+        batch_size=2,
+    )
+    assert TestDatabaseTable.objects.bulk_copy(batches) == 5
+    assert TestDatabaseTable.objects.filter(column2=4).count() == 2
+
+    # existing rows are skipped when ignoring conflicts
+    table = TestDatabaseTable.objects.filter(id__lte=2).to_arrow_batches()
+    TestDatabaseTable.objects.bulk_copy(table, ignore_conflicts=True)
+    assert TestDatabaseTable.objects.count() == 10
+
+    with pytest.raises(ValueError):
+        TestDatabaseTable.objects.bulk_create([], method="upsert")
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_bulk_create_benchmark():
+    nrows = 50_000
+
+    def create(method):
+        TestDatabaseTable.objects.all().delete()
+        TestDatabaseTable.objects.bulk_create(
+            [
+                TestDatabaseTable(column1=bool(i % 2), column2=i * 0.5)
+                for i in range(nrows)
+            ],
+            batch_size=5_000,
+            method=method,
+        )
+
+    # "copy" only differs from "insert" when using PostgreSQL
+    for method in ["insert", "copy"]:
+        run_benchmark(
+            f"bulk_create (method={method})",
+            create,
+            nrepeats=3,
+            nitems=nrows,
+            method=method,
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_table_metadata_benchmark(client):
+    from django.urls import reverse
+
+    from simmate.apps.materials_project.models import MatprojStructure
+
+    for method in [
+        "get_column_names",
+        "get_column_docs",
+        "get_table_docs",
+        "get_extra_columns",
+    ]:
+        run_benchmark(
+            f"{method} (MatprojStructure)",
+            getattr(MatprojStructure, method),
+            nrepeats=20,
+        )
+    run_benchmark(
+        "archive_fieldset (MatprojStructure)",
+        lambda: MatprojStructure.archive_fieldset,
+        nrepeats=20,
+    )
+
+    url = reverse("data_explorer:table", kwargs={"table_name": "MatprojStructure"})
+    for view_format in ["html", "json"]:
+        run_benchmark(
+            f"data explorer request (format={view_format})",
+            client.get,
+            nrepeats=10,
+            path=url,
+            data={"format": view_format},
+        )
+    run_benchmark(
+        "data explorer request (about page)",
+        client.get,
+        nrepeats=10,
+        path=reverse(
+            "data_explorer:table-about",
+            kwargs={"table_name": "MatprojStructure"},
+        ),
+    )
+
+
+@pytest.mark.benchmark
+def test_molecule_to_toolkit_benchmark():
+    # molecule tables need PostgreSQL, so we only benchmark the conversion
+    from simmate.apps.rdkit.models.molecule import Molecule
+    from simmate.toolkit import Molecule as ToolkitMolecule
+
+    nrows = 5_000
+    smiles = ["CCO", "c1ccccc1O", "CC(=O)Nc1ccc(O)cc1", "CN1CCC[C@H]1c1cccnc1"]
+    sdfs = [ToolkitMolecule.from_smiles(s).to_sdf() for s in smiles]
+    rows = [(sdfs[i % len(sdfs)],) for i in range(nrows)]
+
+    for parallel in [False, True]:
+        run_benchmark(
+            f"Molecule.toolkit_from_values (parallel={parallel})",
+            lambda: list(
+                convert_in_batches(
+                    Molecule.toolkit_from_values,
+                    iter(rows),
+                    batch_size=1_000,
+                    parallel=parallel,
+                )
+            ),
+            nrepeats=3,
+            nitems=nrows,
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_export_benchmark(tmp_path):
+    nrows = 50_000
+    TestDatabaseTable.objects.bulk_create(
+        [TestDatabaseTable(column1=bool(i % 2), column2=i * 0.5) for i in range(nrows)],
+        batch_size=5_000,
+    )
+    for engine in ["pandas", "polars"]:
+        for stream in [False, True]:
+            run_benchmark(
+                f"to_dataframe (engine={engine}, stream={stream})",
+                TestDatabaseTable.objects.to_dataframe,
+                nrepeats=3,
+                nitems=nrows,
+                track_memory=True,
+                engine=engine,
+                stream=stream,
+            )
+    for format in ["csv", "parquet"]:
+        run_benchmark(
+            f"to_archive (format={format})",
+            TestDatabaseTable.objects.to_archive,
+            nrepeats=3,
+            nitems=nrows,
+            track_memory=True,
+            filename=tmp_path / f"archive.{format}",
+            format=format,
+            batch_size=10_000,
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_structure_export_benchmark(tmp_path, sample_structures):
+    nrows = 5_000
+    structures = list(sample_structures.values())
+    TestStructure.objects.bulk_create(
+        [
+            TestStructure.from_toolkit(structure=structures[i % len(structures)])
+            for i in range(nrows)
+        ]
+    )
+
+    # archives keep the stored binary structures, while CSV downloads convert
+    # each one to POSCAR/CIF text (see `export_converters`)
+    run_benchmark(
+        "structure to_archive (format=parquet, columns=full)",
+        TestStructure.objects.to_archive,
+        nrepeats=3,
+        nitems=nrows,
+        filename=tmp_path / "structures.parquet",
+        format="parquet",
+        columns="full",
+    )
+    for export_values in [False, True]:
+        run_benchmark(
+            f"structure to_dataframe (stream=True, export_values={export_values})",
+            TestStructure.objects.to_dataframe,
+            nrepeats=3,
+            nitems=nrows,
+            stream=True,
+            export_values=export_values,
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_load_archive_benchmark(tmp_path, sample_structures):
+    nrows = 2_000
+    structures = list(sample_structures.values())
+    TestStructure.objects.bulk_create(
+        [
+            TestStructure.from_toolkit(structure=structures[i % len(structures)])
+            for i in range(nrows)
+        ]
+    )
+
+    # "minimal" archives need from_toolkit for every row while "full"
+    # archives are inserted directly
+    for columns in ["minimal", "full"]:
+        filename = TestStructure.to_archive(
+            filename=tmp_path / f"{columns}.parquet",
+            format="parquet",
+            columns=columns,
+        )
+
+        def reload():
+            TestStructure.objects.all().delete()
+            TestStructure.load_archive(filename=filename)
+
+        run_benchmark(
+            f"load_archive (columns={columns})",
+            reload,
+            nrepeats=3,
+            nitems=nrows,
+        )
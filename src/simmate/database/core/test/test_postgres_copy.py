@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.backends.postgresql.base import DatabaseWrapper
+
+from simmate.database.core.postgres_copy import (
+    COPY_HEADER,
+    COPY_TRAILER,
+    get_field_encoder,
+    write_copy_data,
+)
+
+
+@pytest.fixture
+def connection():
+    # we only need the column types, so no database server is required
+    return DatabaseWrapper(
+        {
+            "NAME": "test",
+            "USER": "",
+            "PASSWORD": "",
+            "HOST": "",
+            "PORT": "",
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": False,
+            "AUTOCOMMIT": True,
+            "ATOMIC_REQUESTS": False,
+            "TEST": {},
+        }
+    )
+
+
+def test_field_encoders(connection):
+    def encode(field, value):
+        return get_field_encoder(field, connection)(value)
+
+    assert encode(models.IntegerField(), 1) == b"\x00\x00\x00\x01"
+    assert encode(models.BigAutoField(), 2) == struct.pack(">q", 2)
+    assert encode(models.FloatField(), 1.5) == struct.pack(">d", 1.5)
+    assert encode(models.BooleanField(), True) == b"\x01"
+    assert encode(models.CharField(max_length=10), "Na") == b"Na"
+    assert encode(models.JSONField(), {"a": 1}) == b'\x01{"a": 1}'
+
+    run_id = uuid.uuid4()
+    assert encode(models.UUIDField(), run_id) == run_id.bytes
+    assert encode(models.UUIDField(), str(run_id)) == run_id.bytes
+
+    # timestamps are microseconds since 2000-01-01, and naive ones are UTC
+    expected = struct.pack(">q", 86_400_000_001)
+    aware = datetime(2000, 1, 2, 0, 0, 0, 1, tzinfo=timezone.utc)
+    assert encode(models.DateTimeField(), aware) == expected
+    assert encode(models.DateTimeField(), aware.replace(tzinfo=None)) == expected
+
+    # numerics are base-10000 digits: (ndigits, weight, sign, dscale, *digits)
+    assert encode(models.DecimalField(), Decimal("12345.678")) == struct.pack(
+        ">hhHh3h", 3, 1, 0, 3, 1, 2345, 6780
+    )
+    assert encode(models.DecimalField(), Decimal("-0.0001")) == struct.pack(
+        ">hhHh1h", 1, -1, 0x4000, 4, 1
+    )
+
+    # arrays: (ndims, has_null, element oid, size, lower bound, *elements)
+    assert encode(ArrayField(models.IntegerField()), [1, None]) == struct.pack(
+        ">iiiiiii", 1, 1, 23, 2, 1, 4, 1
+    ) + struct.pack(">i", -1)
+    assert encode(
+        ArrayField(ArrayField(models.FloatField())), [[0.0], [1.0]]
+    ) == struct.pack(">iiiiiiiidid", 2, 0, 701, 2, 1, 1, 1, 8, 0.0, 8, 1.0)
+
+    # unsupported column types can't be copied
+    class CustomField(models.Field):
+        def db_type(self, connection):
+            return "mol"
+
+    assert get_field_encoder(CustomField(), connection) is None
+
+
+def test_write_copy_data(connection):
+    encoders = [
+        get_field_encoder(models.IntegerField(), connection),
+        get_field_encoder(models.TextField(), connection),
+    ]
+    data = write_copy_data([(1, "a"), (2, None)], encoders).read()
+    assert data == (
+        COPY_HEADER
+        + struct.pack(">hi", 2, 4)
+        + struct.pack(">i", 1)
+        + struct.pack(">i", 1)
+        + b"a"
+        + struct.pack(">hi", 2, 4)
+        + struct.pack(">i", 2)
+        + struct.pack(">i", -1)
+        + COPY_TRAILER
+    )
+
+
+def test_json_encoder(connection):
+    encode = get_field_encoder(models.JSONField(), connection)
+    # python strings are JSON strings, not pre-encoded JSON
+    assert encode("abc") == b'\x01"abc"'
+    assert encode('{"a": 1}') == b'\x01"{\\"a\\": 1}"'
+    assert encode([1, None]) == b"\x01[1, null]"
+    assert encode(False) == b"\x01false"
+
+    # columns from Arrow are JSON text that was already encoded
+    encode_text = get_field_encoder(models.JSONField(), connection, json_as_text=True)
+    assert encode_text('{"a": 1}') == b'\x01{"a": 1}'
+    assert encode_text('"abc"') == b'\x01"abc"'
+    assert encode_text({"a": 1}) == b'\x01{"a": 1}'
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import numpy
+import pytest
+
+from simmate.conftest import run_benchmark
+from simmate.database.core.vectors import (
+    LocalVectorIndex,
+    VectorDistance,
+    VectorField,
+)
+from simmate.website.test_app.models import TestStructure
+
+
+def test_vector_field():
+    field = VectorField(dimensions=3)
+    assert field.db_type(connection=None) == "vector(3)"
+    assert VectorField().db_type(connection=None) == "vector"
+    assert field.deconstruct()[3]["dimensions"] == 3
+
+    assert field.get_prep_value(numpy.array([1, 2.5, 3])) == "[1.0,2.5,3.0]"
+    assert field.get_prep_value(None) is None
+    assert field.to_python("[1.0,2.5,3.0]") == [1, 2.5, 3]
+
+
+def test_vector_distance():
+    query = TestStructure.objects.annotate(
+        distance=VectorDistance("structure", [1, 2], method="cosine")
+    )
+    sql, params = query.query.sql_with_params()
+    assert '("test_app_teststructure"."structure" <=> CAST(%s AS vector(2)))' in sql
+    assert "[1.0,2.0]" in params
+
+    with pytest.raises(ValueError):
+        VectorDistance("fingerprint", [1, 2], method="hamming")
+
+
+@pytest.mark.parametrize("method", ["L2", "cosine"])
+def test_local_vector_index(tmp_path, method):
+    filename = tmp_path / "vectors" / "test.usearch"
+    vectors = numpy.random.default_rng(0).random((50, 8))
+    ids = list(range(100, 150))
+
+    index = LocalVectorIndex(filename, ndim=8, method=method)
+    assert index.search(vectors[0]) == ([], [])
+    index.add(ids, vectors)
+    index.add(ids[:5], vectors[:5])  # duplicates are skipped
+    assert len(index) == 50
+    assert index.contains([100, 1]).tolist() == [True, False]
+    index.save()
+
+    # reload from file and check against the exact distances
+    index = LocalVectorIndex(filename, ndim=8, method=method)
+    assert len(index) == 50
+    found_ids, distances = index.search(vectors[3], count=5, exact=True)
+    assert found_ids[0] == 103
+    assert distances[0] == pytest.approx(0, abs=1e-5)
+    if method == "L2":
+        expected = numpy.linalg.norm(vectors - vectors[3], axis=1)
+        assert distances[1] == pytest.approx(numpy.sort(expected)[1], rel=1e-4)
+
+
+@pytest.mark.benchmark
+def test_local_vector_index_benchmark(tmp_path):
+    # compares the ANN index to a brute force search (which is what we did
+    # before, after pulling all fingerprints from the database)
+    nvectors, ndim, nqueries, count = 20_000, 244, 100, 10
+    rng = numpy.random.default_rng(0)
+    centers = rng.random((200, ndim))
+    vectors = centers[rng.integers(0, 200, nvectors)] + rng.normal(
+        scale=0.05, size=(nvectors, ndim)
+    )
+    queries = vectors[rng.integers(0, nvectors, nqueries)] + rng.normal(
+        scale=0.01, size=(nqueries, ndim)
+    )
+
+    index = LocalVectorIndex(tmp_path / "bench.usearch", ndim=ndim)
+    start = time.perf_counter()
+    index.add(range(nvectors), vectors)
+    print(f"BENCHMARK index build: {time.perf_counter() - start:.2f} s")
+
+    def brute_force():
+        return [
+            numpy.argsort(numpy.linalg.norm(vectors - query, axis=1))[:count]
+            for query in queries
+        ]
+
+    def ann_search():
+        return [index.search(query, count=count)[0] for query in queries]
+
+    run_benchmark("brute force search", brute_force, nrepeats=1, nitems=nqueries)
+    run_benchmark("HNSW search", ann_search, nrepeats=3, nitems=nqueries)
+
+    recall = numpy.mean(
+        [
+            len(set(expected) & set(found)) / count
+            for expected, found in zip(brute_force(), ann_search())
+        ]
+    )
+    print(f"BENCHMARK HNSW recall@{count}: {recall:.3f}")
+    assert recall > 0.9
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for storing and searching vectors (such as structure fingerprints).
+
+On PostgreSQL with the [pgvector](https://github.com/pgvector/pgvector)
+extension, vectors are stored in a `VectorField` column and searched in-database
+with `VectorDistance`. For all other setups (e.g. SQLite), vectors are kept in a
+`LocalVectorIndex`, which is an approximate nearest neighbor (HNSW) index file
+built with usearch.
+"""
+
+import json
+from pathlib import Path
+
+import numpy
+from django.db import models
+from django.db.models.functions import Cast
+from usearch.index import Index
+
+DISTANCE_METHODS = {
+    # name: (pgvector operator, pgvector index opclass, usearch metric)
+    "L2": ("<->", "vector_l2_ops", "l2sq"),
+    "cosine": ("<=>", "vector_cosine_ops", "cos"),
+}
+"""
+The distance metrics that are supported by both pgvector and `LocalVectorIndex`.
+Smaller distances always mean more similar vectors.
+"""
+
+
+def check_distance_method(method: str):
+    if method not in DISTANCE_METHODS:
+        raise ValueError(
+            f"{method} is not implemented as a distance metric. "
+            f"Available options are {list(DISTANCE_METHODS)}."
+        )
+
+
+class VectorField(models.Field):
+    description = "Vector (pgvector extension)"
+
+    def __init__(self, *args, dimensions: int = None, **kwargs):
+        self.dimensions = dimensions
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dimensions is not None:
+            kwargs["dimensions"] = self.dimensions
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        # gives the database column datatype
+        if self.dimensions is None:
+            return "vector"
+        return f"vector({self.dimensions})"
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        # pgvector gives vectors as text, such as "[1,2,3]"
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps([float(v) for v in value], separators=(",", ":"))
+
+
+class VectorDistance(models.Func):
+    """
+    The pgvector distance between a column and a reference vector, e.g.
+    `fingerprint <-> '[1,2,3]'::vector(3)` for the "L2" method.
+    """
+
+    template = "(%(expressions)s)"
+    output_field = models.FloatField()
+
+    def __init__(self, column: str, vector: list[float], method: str = "L2"):
+        check_distance_method(method)
+        operator = DISTANCE_METHODS[method][0]
+        # the reference vector is passed as a query parameter and cast to a
+        # vector, rather than formatted into the SQL
+        reference = Cast(
+            models.Value(VectorField().get_prep_value(vector)),
+            output_field=VectorField(dimensions=len(vector)),
+        )
+        super().__init__(
+            models.F(column),
+            reference,
+            arg_joiner=f" {operator} ",
+        )
+
+
+class LocalVectorIndex:
+    """
+    A file-based approximate nearest neighbor (HNSW) index of vectors, where
+    each vector is keyed by a database id. This is the fallback used for
+    similarity searches when pgvector is not available.
+
+    The index is loaded into memory on init, and changes are only written to
+    disk with `save`.
+    """
+
+    def __init__(self, filename: Path | str, ndim: int, method: str = "L2"):
+        check_distance_method(method)
+        self.filename = Path(filename)
+        self.ndim = ndim
+        self.method = method
+
+        self.index = None
+        if self.filename.exists():
+            self.index = Index.restore(str(self.filename))
+        if self.index is None:
+            self.index = Index(
+                ndim=ndim,
+                metric=DISTANCE_METHODS[method][2],
+                dtype="f32",
+            )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def contains(self, ids: list[int]) -> numpy.ndarray:
+        """
+        Gives a boolean array of whether each id is already in the index.
+        """
+        if not len(ids) or not len(self.index):
+            return numpy.zeros(len(ids), dtype=bool)
+        return numpy.asarray(
+            self.index.contains(numpy.asarray(ids, dtype=numpy.uint64))
+        )
+
+    def add(self, ids: list[int], vectors: list[list[float]]):
+        """
+        Adds vectors to the index. Ids that are already indexed are skipped.
+        """
+        ids = numpy.asarray(ids, dtype=numpy.uint64)
+        vectors = numpy.asarray(vectors, dtype=numpy.float32).reshape(-1, self.ndim)
+        is_new = ~self.contains(ids)
+        if is_new.any():
+            self.index.add(ids[is_new], vectors[is_new])
+
+    def save(self):
+        # we write to a temporary file first so that an interrupted save never
+        # leaves a broken index behind
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        working_filename = self.filename.with_suffix(".partial")
+        self.index.save(str(working_filename))
+        working_filename.replace(self.filename)
+
+    def search(
+        self,
+        vector: list[float],
+        count: int = 50,
+        exact: bool = False,
+    ) -> tuple[list[int], list[float]]:
+        """
+        Finds the `count` closest vectors to `vector`, giving their ids and
+        distances (closest first). With `exact=True`, all vectors are compared
+        (brute force) rather than using the HNSW graph.
+        """
+        if not len(self.index):
+            return [], []
+        matches = self.index.search(
+            numpy.asarray(vector, dtype=numpy.float32),
+            min(count, len(self.index)),
+            exact=exact,
+        )
+        distances = matches.distances.astype(float)
+        # usearch gives the squared euclidean distance
+        if self.method == "L2":
+            distances = numpy.sqrt(numpy.clip(distances, 0, None))
+        return matches.keys.tolist(), distances.tolist()
@@ -7,8 +7,13 @@ from .dynamics import Dynamics, DynamicsIonicStep
 from .filtered_scope import FilteredScope
 from .fingerprint import Fingerprint, FingerprintPool
 from .forces import Forces
-from .nudged_elastic_band import DiffusionAnalysis, MigrationHop, MigrationImage
-from .population_analysis import PopulationAnalysis
+from .nudged_elastic_band import (
+    DiffusionAnalysis,
+    DistinctPathSearch,
+    MigrationHop,
+    MigrationImage,
+)
+from .population_analysis import PopulationAnalysis, PopulationAnalysisSite
 from .relaxation import IonicStep, Relaxation
 from .staged import StagedWorkflow
 from .staged_relax_static import StagedRelaxStatic
@@ -1,17 +1,26 @@
 # -*- coding: utf-8 -*-
 
 import json
+import logging
 from pathlib import Path
 
+import numpy
+from matplotlib import pyplot
+from pymatgen.core.lattice import Lattice
 from pymatgen.electronic_structure.bandstructure import (
     BandStructureSymmLine as ToolkitBandStructure,
 )
+from pymatgen.electronic_structure.core import Spin
 from pymatgen.electronic_structure.plotter import BSPlotter
 from pymatgen.io.vasp.outputs import Vasprun
+from rich.progress import track
 
+from simmate.toolkit.file_converters.structure.binary import BinaryStructureAdapter
 from simmate.toolkit.visualization.plotting import MatplotlibFigure
+from simmate.utils import chunk_list
 
 from ..core import DatabaseTable, table_column
+from ..core.arrays import CompressedArrays
 from .calculation import Calculation
 from .structure import Structure
 
@@ -25,9 +34,13 @@ class BandStructure(DatabaseTable):
     class Meta:
         abstract = True
 
-    exclude_from_summary = ["band_structure_data"]
+    exclude_from_summary = ["band_structure_data", "band_structure_arrays"]
 
-    archive_fields = ["band_structure_data"]
+    archive_fields = ["band_structure_data", "band_structure_arrays"]
+
+    export_converters = {
+        "band_structure_arrays": lambda text: _band_structure_from_str(text).to_json()
+    }
 
     # kpt_path_type (setyawan_curtarolo, hinuma, latimer_munro)
     # Maybe set as an abstract property?
@@ -38,6 +51,17 @@ class BandStructure(DatabaseTable):
     is generated using pymatgen's 
     `vasprun.get_band_structure(line_mode=True).as_dict()` and is therefore
     currently unoptimized for small storage.
+
+    This column is only filled for older entries. New entries use
+    `band_structure_arrays` instead (see `convert_band_structure_data`).
+    """
+
+    band_structure_arrays = table_column.TextField(blank=True, null=True)
+    """
+    All information for the band structure, stored as compressed arrays (see
+    `simmate.database.core.arrays`). Use `get_bands` to load a single spin
+    channel or a subset for plotting, and `to_toolkit_band_structure` to
+    load the full object.
     """
 
     nbands = table_column.IntegerField(blank=True, null=True)
@@ -102,7 +126,7 @@ class BandStructure(DatabaseTable):
         # for this class as an object (or as a dictionary).
         data = (
             dict(
-                band_structure_data=band_structure.to_json(),
+                band_structure_arrays=_band_structure_to_str(band_structure),
                 nbands=band_structure.nb_bands,
                 band_gap=band_structure.get_band_gap()["energy"],
                 is_gap_direct=band_structure.get_band_gap()["direct"],
@@ -120,13 +144,196 @@ class BandStructure(DatabaseTable):
         # return the dictionary
         return data if as_dict else cls(**data)
 
-    def to_toolkit_band_structure(self) -> ToolkitBandStructure:
+    def to_toolkit_band_structure(
+        self,
+        include_projections: bool = True,
+    ) -> ToolkitBandStructure:
         """
         Converts this DatabaseTable object into a toolkit BandStructure, which
         has many more methods for plotting and analysis.
+
+        Projections are typically most of the data, so set
+        `include_projections=False` when they are not needed (e.g. for plots
+        of the bands).
+        """
+        if not self.band_structure_arrays:
+            data = json.loads(self.band_structure_data)
+            if not include_projections:
+                data.pop("projections", None)
+            return ToolkitBandStructure.from_dict(data)
+        return _band_structure_from_str(
+            self.band_structure_arrays,
+            include_projections=include_projections,
+        )
+
+    def get_bands(
+        self,
+        spin: str = "up",
+        energy_window: tuple[float, float] = None,
+        max_kpoints: int = None,
+    ) -> dict:
         """
-        data = json.loads(self.band_structure_data)
-        return ToolkitBandStructure.from_dict(data)
+        Loads the band energies of a single spin channel, without building
+        the full band structure or reading any projections.
+
+        #### Parameters
+
+        - `spin`:
+            The spin channel to load ("up" or "down").
+
+        - `energy_window`:
+            The (min, max) energy in eV. Only bands that fall within this
+            range for at least one k-point are returned.
+
+        - `max_kpoints`:
+            The maximum number of k-points to return, which is useful for
+            plotting large k-point paths. Points are evenly spaced along the
+            path, but labeled k-points (e.g. Gamma) are always kept.
+
+        #### Returns
+
+        A dictionary with the following keys:
+
+        - `distances`: the distance of each k-point along the path (nkpoints)
+        - `energies`: the band energies (nbands x nkpoints)
+        - `labels`: a dictionary of k-point index to label for labeled k-points
+        - `efermi`: the Fermi energy
+        """
+        if not self.band_structure_arrays:
+            raise ValueError(
+                "This entry stores its band structure in the older JSON format. "
+                "Use `convert_band_structure_data` to update it."
+            )
+
+        arrays = CompressedArrays.from_str(self.band_structure_arrays)
+        if f"bands_{spin}" not in arrays:
+            raise ValueError(f"No band structure data for the '{spin}' spin channel")
+        energies = arrays[f"bands_{spin}"]
+        distances = arrays["distances"]
+        labels = {index: label for index, label in arrays.metadata["kpoint_labels"]}
+
+        if energy_window:
+            emin, emax = energy_window
+            energies = energies[((energies >= emin) & (energies <= emax)).any(axis=1)]
+
+        if max_kpoints and len(distances) > max_kpoints:
+            indices = numpy.unique(
+                numpy.concatenate(
+                    [
+                        numpy.linspace(0, len(distances) - 1, max_kpoints).round(),
+                        list(labels),
+                    ]
+                ).astype(int)
+            )
+            distances = distances[indices]
+            energies = energies[:, indices]
+            labels = {
+                new_index: labels[old_index]
+                for new_index, old_index in enumerate(indices.tolist())
+                if old_index in labels
+            }
+
+        return dict(
+            distances=distances,
+            energies=energies,
+            labels=labels,
+            efermi=arrays.metadata["efermi"],
+        )
+
+    @classmethod
+    def convert_band_structure_data(cls, batch_size: int = 100) -> int:
+        """
+        Converts entries that store their band structure in the older JSON
+        format (`band_structure_data`) to the compressed array format
+        (`band_structure_arrays`). Entries are updated in batches, so this can
+        safely be stopped and restarted.
+
+        Returns the number of entries updated.
+        """
+        old_ids = list(
+            cls.objects.filter(
+                band_structure_arrays__isnull=True,
+                band_structure_data__isnull=False,
+            ).values_list("id", flat=True)
+        )
+
+        logging.info(f"Converting band structures for {len(old_ids)} entries")
+        for ids_chunk in track(list(chunk_list(old_ids, batch_size))):
+            entries = list(
+                cls.objects.filter(id__in=ids_chunk).only("id", "band_structure_data")
+            )
+            for entry in entries:
+                band_structure = entry.to_toolkit_band_structure()
+                entry.band_structure_arrays = _band_structure_to_str(band_structure)
+                entry.band_structure_data = None
+            cls.objects.bulk_update(
+                entries,
+                fields=["band_structure_arrays", "band_structure_data"],
+            )
+
+        return len(old_ids)
+
+
+def _get_spins(arrays: CompressedArrays, prefix: str) -> list[Spin]:
+    return [spin for spin in [Spin.up, Spin.down] if f"{prefix}_{spin.name}" in arrays]
+
+
+def _band_structure_from_str(
+    text: str,
+    include_projections: bool = True,
+) -> ToolkitBandStructure:
+    arrays = CompressedArrays.from_str(text)
+    metadata = arrays.metadata
+    spins = _get_spins(arrays, "bands")
+    projections = (
+        {spin: numpy.array(arrays[f"projections_{spin.name}"]) for spin in spins}
+        if include_projections and "projections_up" in arrays
+        else None
+    )
+    return ToolkitBandStructure(
+        kpoints=arrays["kpoints"],
+        eigenvals={spin: numpy.array(arrays[f"bands_{spin.name}"]) for spin in spins},
+        lattice=Lattice(metadata["lattice_rec"]),
+        efermi=metadata["efermi"],
+        labels_dict=metadata["labels_dict"],
+        structure=(
+            BinaryStructureAdapter.from_str(metadata["structure"])
+            if metadata["structure"]
+            else None
+        ),
+        projections=projections,
+    )
+
+
+def _band_structure_to_str(band_structure: ToolkitBandStructure) -> str:
+    arrays = dict(
+        kpoints=[kpoint.frac_coords for kpoint in band_structure.kpoints],
+        distances=band_structure.distance,
+    )
+    for spin, bands in band_structure.bands.items():
+        arrays[f"bands_{spin.name}"] = bands
+    for spin, projections in (band_structure.projections or {}).items():
+        arrays[f"projections_{spin.name}"] = projections
+
+    metadata = dict(
+        efermi=band_structure.efermi,
+        lattice_rec=band_structure.lattice_rec.matrix.tolist(),
+        labels_dict={
+            label: kpoint.frac_coords.tolist()
+            for label, kpoint in band_structure.labels_dict.items()
+        },
+        kpoint_labels=[
+            [index, kpoint.label]
+            for index, kpoint in enumerate(band_structure.kpoints)
+            if kpoint.label
+        ],
+        structure=(
+            BinaryStructureAdapter.to_str(band_structure.structure)
+            if band_structure.structure
+            else None
+        ),
+    )
+    return CompressedArrays.to_str(arrays, metadata)
 
 
 class BandStructureCalc(Structure, BandStructure, Calculation):
@@ -163,9 +370,53 @@ class BandDiagram(MatplotlibFigure):
         # https://plotly.com/python/v3/ipython-notebooks/density-of-states/
         # https://github.com/materialsproject/crystaltoolkit/blob/main/crystal_toolkit/components/bandstructure.py
 
-        bs_plotter = BSPlotter(result.to_toolkit_band_structure())
-        plot = bs_plotter.get_plot()
-        return plot
+        # older entries are stored as JSON and need the full object
+        if not result.band_structure_arrays:
+            band_structure = result.to_toolkit_band_structure(include_projections=False)
+            return BSPlotter(band_structure).get_plot()
+
+        # otherwise we only load the bands near the Fermi level, and large
+        # k-point paths are downsampled, which keeps the plot fast
+        efermi = result.energy_fermi
+        figure, axes = pyplot.subplots(figsize=(12, 8))
+        for spin, linestyle in [("up", "-"), ("down", "--")]:
+            try:
+                bands = result.get_bands(
+                    spin=spin,
+                    energy_window=(efermi - 4, efermi + 4),
+                    max_kpoints=500,
+                )
+            except ValueError:
+                continue  # not spin-polarized
+            # the path is split into segments where it jumps (e.g. "X|U")
+            distances = bands["distances"]
+            breaks = numpy.flatnonzero(numpy.diff(distances) == 0) + 1
+            for segment in numpy.split(numpy.arange(len(distances)), breaks):
+                axes.plot(
+                    distances[segment],
+                    (bands["energies"][:, segment] - bands["efermi"]).T,
+                    color="blue" if spin == "up" else "red",
+                    linestyle=linestyle,
+                    linewidth=1,
+                )
+
+        ticks = {}
+        for index, label in bands["labels"].items():
+            label = f"${label}$" if label.startswith("\\") else label
+            tick = distances[index]
+            if ticks.get(tick, label) != label:
+                label = f"{ticks[tick]}|{label}"  # the path jumps here
+            ticks[tick] = label
+        for tick in ticks:
+            axes.axvline(tick, color="black", linewidth=0.5)
+        axes.set_xticks(list(ticks))
+        axes.set_xticklabels(list(ticks.values()))
+        axes.axhline(0, color="black", linestyle=":", linewidth=0.5)
+        axes.set_xlim(distances[0], distances[-1])
+        axes.set_ylim(-4, 4)
+        axes.set_xlabel("Wave Vector")
+        axes.set_ylabel("$E - E_f$ (eV)")
+        return figure
 
 
 # register all plotting methods to the database table
@@ -134,6 +134,18 @@ class Calculation(DatabaseTable):
     The status/state of the calculation
     """
 
+    input_hash = table_column.CharField(
+        max_length=32,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    """
+    An MD5 hash of the workflow name, version, and input parameters used for
+    this run. Two runs with the same hash are considered duplicates. This is
+    only set when the workflow has `use_result_cache=True`.
+    """
+
     corrections = table_column.JSONField(blank=True, null=True)
     """
     S3 workflows often have ErrorHandlers that fix any issues while the
@@ -249,11 +261,17 @@ class Calculation(DatabaseTable):
 
         # Depending on how a workflow was submitted, there may be a calculation
         # extry existing already -- which we need to grab and then update. If it's
-        # not there, we create a new one
-
-        # check if the calculation already exists in our database, and if not,
-        # we need to create a new one
-        if not cls.objects.filter(run_id=run_id).exists():
+        # not there, we create a new one.
+        # OPTIMIZE: we load the entry with a single query (rather than checking
+        # exists() and then loading) and combine all of the updates below into
+        # a single save. This method is called at least twice for every workflow
+        # run, so these queries make up most of the overhead for short runs.
+        calculation = (
+            cls.objects.filter(run_id=run_id).first() if run_id is not None else None
+        )
+        is_new = calculation is None
+
+        if is_new:
             # To handle the initialization of other Simmate mix-ins, we pass all
             # information to the from_toolkit method rather than directly to cls.
             calculation = cls.from_toolkit(
@@ -263,35 +281,31 @@ class Calculation(DatabaseTable):
                 workflow_version=workflow_version,
                 **kwargs,
             )
-            calculation.save()
-        # Otherwise the entry exists and we can load it
-        else:
-            calculation = cls.objects.get(run_id=run_id)
 
         # if this is the start of a calculation run (and not just scheduling via
         # run cloud) then we also want to add a timestamp for the start
         if started_at:
             calculation.started_at = started_at
-            queue_time = (
-                calculation.started_at - calculation.created_at
-            ).total_seconds()
+            # new entries are created right now, so there was no time in queue.
             # if we run the workflow locally, this can sometimes give a negative
             # value for queue time because of database hit / python continutation
             # inconsistencies. We therefore give a minimum value of 0
-            if queue_time < 0:
-                queue_time = 0
-            calculation.queue_time = queue_time
-            calculation.save()
+            queue_time = (
+                0 if is_new else (started_at - calculation.created_at).total_seconds()
+            )
+            calculation.queue_time = max(queue_time, 0)
 
         if finished_at:
             calculation.finished_at = finished_at
             calculation.total_time = (
                 calculation.finished_at - calculation.started_at
             ).total_seconds()
-            calculation.save()
 
-        if status and calculation.status != status:
+        status_changed = status and calculation.status != status
+        if status_changed:
             calculation.status = status
+
+        if is_new or started_at or finished_at or status_changed:
             calculation.save()
 
         return calculation
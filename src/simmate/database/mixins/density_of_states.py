@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
 
 import json
+import logging
 from pathlib import Path
 
-from pymatgen.electronic_structure.dos import CompleteDos
+import numpy
+from matplotlib import pyplot
+from pymatgen.electronic_structure.core import Orbital, Spin
+from pymatgen.electronic_structure.dos import CompleteDos, Dos
 from pymatgen.electronic_structure.plotter import DosPlotter
 from pymatgen.io.vasp.outputs import Vasprun
+from rich.progress import track
 
+from simmate.toolkit.file_converters.structure.binary import BinaryStructureAdapter
 from simmate.toolkit.visualization.plotting import MatplotlibFigure
+from simmate.utils import chunk_list
 
 from ..core import DatabaseTable, table_column
+from ..core.arrays import CompressedArrays
 from .calculation import Calculation
 from .structure import Structure
 
@@ -23,9 +31,15 @@ class DensityofStates(DatabaseTable):
     class Meta:
         abstract = True
 
-    exclude_from_summary = ["density_of_states_data"]
+    exclude_from_summary = ["density_of_states_data", "density_of_states_arrays"]
 
-    archive_fields = ["density_of_states_data"]
+    archive_fields = ["density_of_states_data", "density_of_states_arrays"]
+
+    export_converters = {
+        "density_of_states_arrays": (
+            lambda text: _density_of_states_from_str(text).to_json()
+        )
+    }
 
     # !!! Consider breaking down data into...
     #   total
@@ -36,6 +50,17 @@ class DensityofStates(DatabaseTable):
     A JSON dictionary holding all information for the band structure. This JSON
     is generated using pymatgen's `vasprun.complete_dos.as_dict()` and is 
     therefore currently unoptimized for small storage.
+
+    This column is only filled for older entries. New entries use
+    `density_of_states_arrays` instead (see `convert_density_of_states_data`).
+    """
+
+    density_of_states_arrays = table_column.TextField(blank=True, null=True)
+    """
+    All information for the density of states, stored as compressed arrays (see
+    `simmate.database.core.arrays`). Use `get_densities` to load a single spin
+    channel or energy window, and `to_toolkit_density_of_states` to load the
+    full object.
     """
 
     band_gap = table_column.FloatField(blank=True, null=True)
@@ -81,7 +106,7 @@ class DensityofStates(DatabaseTable):
         # for this class as an object (or as a dictionary).
         data = (
             dict(
-                density_of_states_data=density_of_states.to_json(),
+                density_of_states_arrays=_density_of_states_to_str(density_of_states),
                 band_gap=float(density_of_states.get_gap()),
                 energy_fermi=density_of_states.efermi,
                 conduction_band_minimum=float(density_of_states.get_cbm_vbm()[0]),
@@ -100,8 +125,187 @@ class DensityofStates(DatabaseTable):
         Converts this DatabaseTable object into a toolkit CompleteDos, which
         has many more methods for plotting and analysis.
         """
-        data = json.loads(self.density_of_states_data)
-        return CompleteDos.from_dict(data)
+        if not self.density_of_states_arrays:
+            data = json.loads(self.density_of_states_data)
+            return CompleteDos.from_dict(data)
+
+        return _density_of_states_from_str(self.density_of_states_arrays)
+
+    def get_densities(
+        self,
+        spin: str = "up",
+        energy_window: tuple[float, float] = None,
+        element: str = None,
+        max_points: int = None,
+    ) -> dict:
+        """
+        Loads the density of states of a single spin channel, without building
+        the full density of states object.
+
+        #### Parameters
+
+        - `spin`:
+            The spin channel to load ("up" or "down").
+
+        - `energy_window`:
+            The (min, max) energy in eV to load.
+
+        - `element`:
+            If given, the density of states projected onto this element (e.g.
+            "Fe") is returned instead of the total.
+
+        - `max_points`:
+            The maximum number of energies to return, which is useful for
+            plotting. Every n-th point is kept to stay under this limit.
+
+        #### Returns
+
+        A dictionary with the following keys:
+
+        - `energies`: the energy of each point
+        - `densities`: the density of states at each energy
+        - `efermi`: the Fermi energy
+        """
+        if not self.density_of_states_arrays:
+            raise ValueError(
+                "This entry stores its density of states in the older JSON format. "
+                "Use `convert_density_of_states_data` to update it."
+            )
+
+        return _get_densities(
+            CompressedArrays.from_str(self.density_of_states_arrays),
+            spin=spin,
+            energy_window=energy_window,
+            element=element,
+            max_points=max_points,
+        )
+
+    @classmethod
+    def convert_density_of_states_data(cls, batch_size: int = 100) -> int:
+        """
+        Converts entries that store their density of states in the older JSON
+        format (`density_of_states_data`) to the compressed array format
+        (`density_of_states_arrays`). Entries are updated in batches, so this
+        can safely be stopped and restarted.
+
+        Returns the number of entries updated.
+        """
+        old_ids = list(
+            cls.objects.filter(
+                density_of_states_arrays__isnull=True,
+                density_of_states_data__isnull=False,
+            ).values_list("id", flat=True)
+        )
+
+        logging.info(f"Converting densities of states for {len(old_ids)} entries")
+        for ids_chunk in track(list(chunk_list(old_ids, batch_size))):
+            entries = list(
+                cls.objects.filter(id__in=ids_chunk).only(
+                    "id", "density_of_states_data"
+                )
+            )
+            for entry in entries:
+                density_of_states = entry.to_toolkit_density_of_states()
+                entry.density_of_states_arrays = _density_of_states_to_str(
+                    density_of_states
+                )
+                entry.density_of_states_data = None
+            cls.objects.bulk_update(
+                entries,
+                fields=["density_of_states_arrays", "density_of_states_data"],
+            )
+
+        return len(old_ids)
+
+
+def _get_densities(
+    arrays: CompressedArrays,
+    spin: str = "up",
+    energy_window: tuple[float, float] = None,
+    element: str = None,
+    max_points: int = None,
+) -> dict:
+    if f"total_{spin}" not in arrays:
+        raise ValueError(f"No density of states for the '{spin}' spin channel")
+    energies = arrays["energies"]
+
+    if element:
+        site_elements = numpy.array(arrays.metadata["site_elements"])
+        if "projected_up" not in arrays or element not in site_elements:
+            raise ValueError(f"No projected density of states for '{element}'")
+        projected = arrays[f"projected_{spin}"]
+        densities = projected[site_elements == element].sum(axis=(0, 1))
+    else:
+        densities = arrays[f"total_{spin}"]
+
+    if energy_window:
+        emin, emax = energy_window
+        in_window = (energies >= emin) & (energies <= emax)
+        energies = energies[in_window]
+        densities = densities[in_window]
+
+    if max_points and len(energies) > max_points:
+        step = -(-len(energies) // max_points)  # rounds up
+        energies = energies[::step]
+        densities = densities[::step]
+
+    return dict(
+        energies=energies,
+        densities=densities,
+        efermi=arrays.metadata["efermi"],
+    )
+
+
+def _density_of_states_from_str(text: str) -> CompleteDos:
+    arrays = CompressedArrays.from_str(text)
+    metadata = arrays.metadata
+    spins = [s for s in [Spin.up, Spin.down] if f"total_{s.name}" in arrays]
+    structure = BinaryStructureAdapter.from_str(metadata["structure"])
+    total_dos = Dos(
+        efermi=metadata["efermi"],
+        energies=numpy.array(arrays["energies"]),
+        densities={spin: numpy.array(arrays[f"total_{spin.name}"]) for spin in spins},
+    )
+    pdoss = {}
+    if "projected_up" in arrays:
+        orbitals = [Orbital[name] for name in metadata["orbitals"]]
+        projected = {spin: arrays[f"projected_{spin.name}"] for spin in spins}
+        for site_index, site in enumerate(structure):
+            pdoss[site] = {
+                orbital: {
+                    spin: numpy.array(projected[spin][site_index, orbital_index])
+                    for spin in spins
+                }
+                for orbital_index, orbital in enumerate(orbitals)
+            }
+    return CompleteDos(structure, total_dos, pdoss)
+
+
+def _density_of_states_to_str(density_of_states: CompleteDos) -> str:
+    structure = density_of_states.structure
+    arrays = dict(energies=density_of_states.energies)
+    for spin, densities in density_of_states.densities.items():
+        arrays[f"total_{spin.name}"] = densities
+
+    # Projections are stored as (site, orbital, energy) arrays, which requires
+    # every site to have the same orbitals (as is the case for VASP outputs).
+    orbitals = []
+    pdos = density_of_states.pdos
+    if pdos:
+        orbitals = list(next(iter(pdos.values())))
+        for spin in density_of_states.densities:
+            arrays[f"projected_{spin.name}"] = [
+                [pdos[site][orbital][spin] for orbital in orbitals]
+                for site in structure
+            ]
+
+    metadata = dict(
+        efermi=density_of_states.efermi,
+        orbitals=[orbital.name for orbital in orbitals],
+        site_elements=[site.specie.symbol for site in structure],
+        structure=BinaryStructureAdapter.to_str(structure),
+    )
+    return CompressedArrays.to_str(arrays, metadata)
 
 
 class DensityofStatesCalc(Structure, DensityofStates, Calculation):
@@ -137,24 +341,49 @@ class DosDiagram(MatplotlibFigure):
         # https://plotly.com/python/v3/ipython-notebooks/density-of-states/
         # https://github.com/materialsproject/crystaltoolkit/blob/main/crystal_toolkit/components/bandstructure.py
 
-        plotter = DosPlotter()
-        complete_dos = result.to_toolkit_density_of_states()
-
-        # Add the total density of States
-        plotter.add_dos("Total DOS", complete_dos)
-
-        # add element-projected density of states
-        plotter.add_dos_dict(complete_dos.get_element_dos())
-
-        # If I want plots for individual orbitals
-        # for site in vasprun.final_structure:
-        #     spd_dos = vasprun.complete_dos.get_site_spd_dos(site)
-        #     plotter.add_dos_dict(spd_dos)
-
-        # NOTE: get_dos_dict may be useful in the future
-
-        plot = plotter.get_plot()
-        return plot
+        # older entries are stored as JSON and need the full object
+        if not result.density_of_states_arrays:
+            plotter = DosPlotter()
+            complete_dos = result.to_toolkit_density_of_states()
+            plotter.add_dos("Total DOS", complete_dos)
+            plotter.add_dos_dict(complete_dos.get_element_dos())
+            return plotter.get_plot()
+
+        # otherwise we only load the energies near the Fermi level, and these
+        # are downsampled, which keeps the plot fast
+        arrays = CompressedArrays.from_str(result.density_of_states_arrays)
+        efermi = arrays.metadata["efermi"]
+        elements = list(dict.fromkeys(arrays.metadata["site_elements"]))
+        if "projected_up" not in arrays:
+            elements = []
+
+        figure, axes = pyplot.subplots(figsize=(12, 8))
+        for color, element in enumerate([None] + elements):
+            for spin, sign in [("up", 1), ("down", -1)]:
+                try:
+                    dos = _get_densities(
+                        arrays,
+                        spin=spin,
+                        energy_window=(efermi - 5, efermi + 5),
+                        element=element,
+                        max_points=1_000,
+                    )
+                except ValueError:
+                    continue  # not spin-polarized
+                axes.plot(
+                    dos["energies"] - efermi,
+                    sign * dos["densities"],
+                    color=f"C{color}",
+                    label=(element or "Total DOS") if spin == "up" else None,
+                )
+
+        axes.axvline(0, color="black", linestyle="--", linewidth=0.5)
+        axes.axhline(0, color="black", linewidth=0.5)
+        axes.set_xlim(-5, 5)
+        axes.set_xlabel("Energies (eV)")
+        axes.set_ylabel("Density of states")
+        axes.legend()
+        return figure
 
 
 # register all plotting methods to the database table
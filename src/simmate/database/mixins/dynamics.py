@@ -11,6 +11,7 @@ from simmate.toolkit.visualization.plotting import PlotlyFigure
 from ..core import table_column
 from .calculation import Calculation
 from .forces import Forces
+from .relaxation import bulk_create_ionic_steps
 from .structure import Structure
 from .thermodynamics import Thermodynamics
 
@@ -78,7 +79,7 @@ class Dynamics(Structure, Calculation):
         vasprun = Vasprun.from_directory(directory)
         self.update_from_vasp_run(vasprun)
 
-    def update_from_vasp_run(self, vasprun: Vasprun):
+    def update_from_vasp_run(self, vasprun: Vasprun, defer_spacegroups: bool = True):
         """
         Given a Vasprun object from a finished dynamics run, this will update the
         Dynamics table entry and the corresponding DynamicsIonicStep entries.
@@ -92,6 +93,12 @@ class Dynamics(Structure, Calculation):
         directory :
             name of the directory that relaxation was ran in. This is only used
             to reference the archive file if it's ever needed again.
+        defer_spacegroups :
+            Whether to skip symmetry analysis for all ionic steps besides the
+            first and last (see `bulk_create_ionic_steps`). Dynamics runs often
+            have thousands of steps, so this defaults to True and those steps
+            are saved with a null spacegroup. Fill these in afterwards with
+            `DynamicsIonicStep.update_spacegroups` when needed.
         """
 
         # The data is actually easier to access as a dictionary and everything
@@ -102,24 +109,29 @@ class Dynamics(Structure, Calculation):
         # pull the structure for each ionic step from the vasprun class directly.
         structures = vasprun.structures
 
-        # Now let's iterate through the ionic steps and save these to the database.
-        for number, (structure, ionic_step) in enumerate(
-            zip(structures, data["ionic_steps"])
-        ):
-            # first pull all the data together and save it to the database. We
-            # are saving this to an DynamicsIonicStepStructure datatable. To access this
-            # model, we look need to use "structures.model".
-            structure = self.structures.model.from_toolkit(
-                number=number,
-                structure=structure,
-                energy=ionic_step.get("e_wo_entrp", None),
-                site_forces=ionic_step.get("forces", None),
-                lattice_stress=ionic_step.get("stress", None),
-                temperature=self._get_temperature_at_step(number),
-                # simulation_time=number*self.time_step,
-                dynamics_run=self,  # this links the structure to this dynamics run
-            )
-            structure.save()
+        # Now let's pull all the data for the ionic steps together and save
+        # these to the database.
+        bulk_create_ionic_steps(
+            # We are saving this to an DynamicsIonicStepStructure datatable. To
+            # access this model, we look need to use "structures.model".
+            table=self.structures.model,
+            entries=[
+                dict(
+                    number=number,
+                    structure=structure,
+                    energy=ionic_step.get("e_wo_entrp", None),
+                    site_forces=ionic_step.get("forces", None),
+                    lattice_stress=ionic_step.get("stress", None),
+                    temperature=self._get_temperature_at_step(number),
+                    # simulation_time=number*self.time_step,
+                )
+                for number, (structure, ionic_step) in enumerate(
+                    zip(structures, data["ionic_steps"])
+                )
+            ],
+            defer_spacegroups=defer_spacegroups,
+            dynamics_run=self,  # this links the structures to this dynamics run
+        )
 
         # Now we have the relaxation data all loaded and can save it to the database
         self.save()
@@ -138,6 +150,10 @@ class DynamicsIonicStep(Structure, Thermodynamics, Forces):
     Each entry will map to a `Dynamics`, so you should typically access this
     data through that class. The exception to this is when you want all ionic
     steps accross many relaxations for a machine learning input.
+
+    By default, only the first and last steps of a run have a `spacegroup`
+    (see `Dynamics.update_from_vasp_run`). Use `update_spacegroups` to fill
+    in the rest.
     """
 
     class Meta:
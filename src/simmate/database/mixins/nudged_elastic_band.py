@@ -2,18 +2,24 @@
 
 from pathlib import Path
 
+import numpy
+from pymatgen.analysis.diffusion.neb.pathfinder import (
+    MigrationHop as PymatgenMigrationHop,
+)
 from pymatgen.analysis.transition_state import NEBAnalysis
 from pymatgen.core.sites import PeriodicSite
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
 from simmate.apps.vasp.outputs import Vasprun
 from simmate.toolkit import Structure as ToolkitStructure
+from simmate.toolkit.diffusion import DistinctPathFinder
 from simmate.toolkit.diffusion import MigrationHop as ToolkitMigrationHop
 from simmate.toolkit.diffusion import MigrationImages
 from simmate.toolkit.visualization.plotting import MatplotlibFigure
 
-from ..core import table_column
+from ..core import DatabaseTable, table_column
 from .calculation import Calculation
+from .relaxation import bulk_create_ionic_steps
 from .structure import Structure
 
 
@@ -144,13 +150,15 @@ class DiffusionAnalysis(Structure, Calculation):
             if f.is_dir() and "single-path" in f.stem
         ]
 
-        # now save each migration hop present
-        for migration_dir in migration_directories:
-            hop = self.migration_hops.field.model.from_directory(
-                directory=migration_dir,
-            )
-            hop.diffusion_analysis_id = self.id
-            hop.save()
+        # now save each migration hop present, and then link them all to
+        # this analysis with a single update
+        hop_ids = [
+            self.migration_hops.field.model.from_directory(directory=migration_dir).id
+            for migration_dir in migration_directories
+        ]
+        self.migration_hops.field.model.objects.filter(id__in=hop_ids).update(
+            diffusion_analysis_id=self.id
+        )
 
 
 class MigrationHop(Calculation):
@@ -349,29 +357,40 @@ class MigrationHop(Calculation):
 
         return hop_db
 
-    def update_from_neb_toolkit(self, neb_results: NEBAnalysis):
+    def update_from_neb_toolkit(
+        self,
+        neb_results: NEBAnalysis,
+        defer_spacegroups: bool = False,
+    ):
         # build migration images and link them to this parent object.
         # Note, the start/end Migration images will exist already in the
         # relaxation database table. We still want to save them again here for
         # easy access.
-        for image_number, image_data in enumerate(
-            zip(
-                neb_results.structures,
-                neb_results.energies,
-                neb_results.forces,
-                neb_results.r,
-            )
-        ):
-            image, energy, force, distance = image_data
-            image_db = self.migration_images.field.model.from_toolkit(
+        # All images are saved together, and symmetry analysis of the midpoint
+        # images can be deferred (see `bulk_create_ionic_steps`).
+        images = [
+            dict(
                 structure=image,
                 number=image_number,
                 force_tangent=force,
                 energy=energy,
                 structure_distance=distance,
-                migration_hop_id=self.id,
             )
-            image_db.save()
+            for image_number, (image, energy, force, distance) in enumerate(
+                zip(
+                    neb_results.structures,
+                    neb_results.energies,
+                    neb_results.forces,
+                    neb_results.r,
+                )
+            )
+        ]
+        bulk_create_ionic_steps(
+            table=self.migration_images.field.model,
+            entries=images,
+            defer_spacegroups=defer_spacegroups,
+            migration_hop_id=self.id,
+        )
 
     @classmethod
     def from_toolkit(  # from_migration_hop_toolkit -- registration uses this
@@ -453,6 +472,154 @@ class MigrationImage(Structure):
     )
 
 
+class DistinctPathSearch(DatabaseTable):
+    """
+    Stores the results of `DistinctPathFinder` searches, so that finding the
+    migration hops of a structure can be skipped when the same search was
+    done before (e.g. when rerunning diffusion workflows on many structures).
+
+    Use `get_paths` rather than querying this table directly.
+    """
+
+    class Meta:
+        app_label = "workflow_explorer"
+        db_table = "workflows_distinctpathsearch"
+
+    structure_hash = table_column.CharField(max_length=40, db_index=True)
+    """
+    A hash of the host structure that was searched. Structures with the same
+    sites and lattice (to 4 decimals) give the same hash, regardless of site
+    order.
+    """
+
+    migrating_specie = table_column.CharField(max_length=10)
+    """
+    The element of the diffusion atom (e.g. "Li" or "Li1+")
+    """
+
+    max_path_length = table_column.FloatField(blank=True, null=True)
+    """
+    The `max_path_length` given to `DistinctPathFinder`. Empty if it was
+    determined automatically.
+    """
+
+    symprec = table_column.FloatField()
+    """
+    The `symprec` given to `DistinctPathFinder`.
+    """
+
+    percolation_mode = table_column.CharField(max_length=10)
+    """
+    The `perc_mode` given to `DistinctPathFinder` (e.g. ">1d").
+    """
+
+    migration_hops = table_column.JSONField(default=list)
+    """
+    The migration hops found, in the order given by `DistinctPathFinder.get_paths`.
+    Each hop is given as a dictionary with the migrating species and the
+    fractional coordinates of its start and end sites.
+    """
+
+    @classmethod
+    def get_paths(
+        cls,
+        structure: ToolkitStructure,
+        migrating_specie: str,
+        max_path_length: float = None,
+        symprec: float = 0.1,
+        percolation_mode: str = ">1d",
+    ) -> list[PymatgenMigrationHop]:
+        """
+        Gives the same result as `DistinctPathFinder(...).get_paths()`, but
+        reuses the result of any earlier search with the same structure and
+        parameters. New searches are saved to this table.
+        """
+        search_kwargs = dict(
+            structure_hash=structure.get_hash_key(),
+            migrating_specie=str(migrating_specie),
+            max_path_length=max_path_length,
+            symprec=symprec,
+            percolation_mode=percolation_mode,
+        )
+        search = cls.objects.filter(**search_kwargs).first()
+        if search:
+            return search.to_migration_hops(structure)
+
+        pathfinder = DistinctPathFinder(
+            structure=structure,
+            migrating_specie=migrating_specie,
+            max_path_length=max_path_length,
+            symprec=symprec,
+            perc_mode=percolation_mode,
+        )
+        migration_hops = pathfinder.get_paths()
+        cls.objects.create(
+            migration_hops=[
+                dict(
+                    specie=str(hop.isite.specie),
+                    site_start=hop.isite.frac_coords.tolist(),
+                    site_end=hop.esite.frac_coords.tolist(),
+                )
+                for hop in migration_hops
+            ],
+            **search_kwargs,
+        )
+        return migration_hops
+
+    def to_migration_hops(
+        self,
+        structure: ToolkitStructure,
+    ) -> list[PymatgenMigrationHop]:
+        """
+        Rebuilds the migration hops that were found for a structure. This only
+        requires one symmetry analysis of the structure, rather than a full
+        path search.
+
+        The saved sites are matched to the sites of the given structure, so the
+        hops use its exact coordinates even when it lists its sites in another
+        order or differs by rounding from the structure that was searched.
+        """
+        symm_structure = SpacegroupAnalyzer(
+            structure,
+            symprec=self.symprec,
+        ).get_symmetrized_structure()
+        return [
+            PymatgenMigrationHop(
+                isite=PeriodicSite(
+                    hop["specie"],
+                    _match_site(symm_structure, hop["specie"], hop["site_start"]),
+                    symm_structure.lattice,
+                ),
+                esite=PeriodicSite(
+                    hop["specie"],
+                    _match_site(symm_structure, hop["specie"], hop["site_end"]),
+                    symm_structure.lattice,
+                ),
+                symm_structure=symm_structure,
+            )
+            for hop in self.migration_hops
+        ]
+
+
+def _match_site(
+    structure: ToolkitStructure,
+    specie: str,
+    frac_coords: list[float],
+) -> numpy.ndarray:
+    # Gives the fractional coordinates of the site (or its periodic image)
+    # that is closest to the given coordinates
+    indices = [i for i, site in enumerate(structure) if site.species_string == specie]
+    sites_coords = structure.frac_coords[indices or slice(None)]
+    shifts = numpy.array(frac_coords) - sites_coords
+    images = numpy.round(shifts)
+    distances = numpy.linalg.norm(
+        structure.lattice.get_cartesian_coords(shifts - images),
+        axis=1,
+    )
+    closest = numpy.argmin(distances)
+    return sites_coords[closest] + images[closest]
+
+
 class NebDiagram(MatplotlibFigure):
     def get_plot(results: MigrationHop):
         neb_results = results.to_neb_toolkit()
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import logging
 from pathlib import Path
 
 from pandas import DataFrame
+from rich.progress import track
 
 from simmate.apps.bader.outputs import ACF
+from simmate.utils import chunk_list
 
-from ..core import table_column
+from ..core import DatabaseTable, table_column
 from .static_energy import StaticEnergy
 
 
@@ -14,6 +17,30 @@ class PopulationAnalysis(StaticEnergy):
     """
     This table combines results from a static energy calculation and the follow-up
     oxidation analysis on the charge density.
+
+    In addition to the list columns below, the results for each site are stored
+    in the `PopulationAnalysisSite` table and can be accessed with the `sites`
+    attribute. Use this table for site-level queries, which run in SQL rather
+    than loading every list into python:
+
+    ``` python
+    from django.db.models import Avg
+    from simmate.database.workflow_results import (
+        PopulationAnalysis,
+        PopulationAnalysisSite,
+    )
+
+    # all calculations that have an oxygen site with a charge above 7
+    PopulationAnalysis.objects.filter(
+        sites__element="O",
+        sites__charge__gt=7,
+    ).distinct()
+
+    # the average oxidation state of every element across all calculations
+    PopulationAnalysisSite.objects.values("element").annotate(
+        oxidation_state=Avg("oxidation_state"),
+    )
+    ```
     """
 
     class Meta:
@@ -115,7 +142,8 @@ class PopulationAnalysis(StaticEnergy):
             dataframe, extra_data = ACF(directory)
 
             all_data = {
-                # OPTIMIZE: consider a related table for Sites
+                # NOTE: these lists are also saved to the PopulationAnalysisSite
+                # table with `update_sites` (once this entry is saved)
                 "oxidation_states": list(dataframe.oxidation_state.values),
                 "charges": list(dataframe.charge.values),
                 "min_dists": list(dataframe.min_dist.values),
@@ -129,6 +157,64 @@ class PopulationAnalysis(StaticEnergy):
 
         return all_data if as_dict else cls(**all_data)
 
+    def update_from_directory(self, directory: Path):
+        super().update_from_directory(directory)
+        self.update_sites()
+
+    def update_sites(self):
+        """
+        Saves the results of each site to the `PopulationAnalysisSite` table
+        (replacing any that exist), using the list columns of this entry.
+        """
+        self.sites.all().delete()
+        self.sites.model.objects.bulk_create(
+            self.sites.model.from_population_analysis(
+                population_analysis_id=self.id,
+                element_list=self.element_list,
+                oxidation_states=self.oxidation_states,
+                charges=self.charges,
+                min_dists=self.min_dists,
+                atomic_volumes=self.atomic_volumes,
+            )
+        )
+
+    @classmethod
+    def update_all_sites(cls, batch_size: int = 1_000) -> int:
+        """
+        Populates the `PopulationAnalysisSite` table for all entries that
+        have results but no sites yet, such as entries that were saved before
+        the site table existed. Sites are saved after every batch, so this can
+        safely be stopped and restarted.
+
+        Returns the number of entries updated.
+        """
+        columns = [
+            "id",
+            "element_list",
+            "oxidation_states",
+            "charges",
+            "min_dists",
+            "atomic_volumes",
+        ]
+        new_ids = list(
+            cls.objects.filter(charges__isnull=False, sites__isnull=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        site_table = cls.sites.rel.related_model
+
+        logging.info(f"Adding sites for {len(new_ids)} population analyses")
+        for ids_chunk in track(list(chunk_list(new_ids, batch_size))):
+            rows = cls.objects.filter(id__in=ids_chunk).values_list(*columns)
+            sites = []
+            for row in rows:
+                sites += site_table.from_population_analysis(
+                    **dict(zip(["population_analysis_id", *columns[1:]], row))
+                )
+            site_table.objects.bulk_create(sites, batch_size=10_000)
+
+        return len(new_ids)
+
     def get_summary_dataframe(self):
         df = DataFrame(
             {
@@ -145,3 +231,101 @@ class PopulationAnalysis(StaticEnergy):
         df = self.get_summary_dataframe()
         filename = directory / "simmate_population_summary.csv"
         df.to_csv(filename)
+
+
+class PopulationAnalysisSite(DatabaseTable):
+    """
+    Holds the results for a single site of a `PopulationAnalysis` entry.
+
+    Each entry will map to a `PopulationAnalysis`, so you should typically
+    access this data through the `sites` attribute of that class. The exception
+    to this is when you want to search or aggregate sites across many
+    calculations.
+    """
+
+    class Meta:
+        app_label = "workflow_explorer"
+        db_table = "workflows_populationanalysissite"
+
+    number = table_column.IntegerField()
+    """
+    The index of the site in the structure. This starts counting from 0.
+    """
+
+    element = table_column.CharField(max_length=5, db_index=True)
+    """
+    The element of the site (e.g. "Na")
+    """
+
+    oxidation_state = table_column.FloatField(blank=True, null=True, db_index=True)
+    """
+    The calculated oxidation state of the site.
+    """
+
+    charge = table_column.FloatField(blank=True, null=True, db_index=True)
+    """
+    The total "valence" electron count of the site. See the warning on
+    `PopulationAnalysis.charges`.
+    """
+
+    min_dist = table_column.FloatField(blank=True, null=True)
+    """
+    The minimum distance from the site to the surface of its bader volume.
+    """
+
+    atomic_volume = table_column.FloatField(blank=True, null=True, db_index=True)
+    """
+    The volume of the site from the oxidation analysis (i.e. the bader volume)
+    """
+
+    population_analysis = table_column.ForeignKey(
+        PopulationAnalysis,
+        on_delete=table_column.CASCADE,
+        related_name="sites",
+    )
+    """
+    The population analysis that this site belongs to.
+    """
+
+    @classmethod
+    def from_population_analysis(
+        cls,
+        population_analysis_id: int,
+        element_list: list[str],
+        oxidation_states: list[float] = None,
+        charges: list[float] = None,
+        min_dists: list[float] = None,
+        atomic_volumes: list[float] = None,
+    ) -> list:
+        """
+        Builds (but does not save) the site entries from the list columns of
+        a `PopulationAnalysis` entry.
+        """
+        if not element_list:
+            return []
+        nsites = len(element_list)
+        columns = zip(
+            element_list,
+            oxidation_states or [None] * nsites,
+            charges or [None] * nsites,
+            min_dists or [None] * nsites,
+            atomic_volumes or [None] * nsites,
+        )
+        return [
+            cls(
+                population_analysis_id=population_analysis_id,
+                number=number,
+                element=element,
+                oxidation_state=oxidation_state,
+                charge=charge,
+                min_dist=min_dist,
+                atomic_volume=atomic_volume,
+            )
+            for number, (
+                element,
+                oxidation_state,
+                charge,
+                min_dist,
+                atomic_volume,
+            ) in enumerate(columns)
+        ]
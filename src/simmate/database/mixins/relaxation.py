@@ -150,7 +150,7 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
             # )
             return  # just exit
 
-    def update_from_vasp_run(self, vasprun: Vasprun):
+    def update_from_vasp_run(self, vasprun: Vasprun, defer_spacegroups: bool = False):
         """
         Given a Vasprun object from a finished relaxation, this will update the
         Relaxation table entry and the corresponding IonicStep entries.
@@ -159,6 +159,9 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
 
         vasprun :
             The final Vasprun object from the relaxation outputs.
+        defer_spacegroups :
+            Whether to skip symmetry analysis for all ionic steps besides the
+            first and last (see `bulk_create_ionic_steps`). Defaults to False.
         """
 
         # The data is actually easier to access as a dictionary and everything
@@ -169,31 +172,37 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
         # pull the structure for each ionic step from the vasprun class directly.
         structures = vasprun.structures
 
-        # Now let's iterate through the ionic steps and save these to the database.
-        for number, (pymstructure, ionic_step) in enumerate(
-            zip(structures, data["ionic_steps"])
-        ):
-            # first pull all the data together and save it to the database. We
-            # are saving this to an IonicStepStructure datatable. To access this
-            # model, we look need to use "structures.model".
-            structure = self.structures.model.from_toolkit(
-                number=number,
-                structure=pymstructure,
-                energy=ionic_step["e_wo_entrp"],
-                site_forces=ionic_step["forces"],
-                lattice_stress=ionic_step["stress"],
-                relaxation=self,  # this links the structure to this relaxation
-            )
-            structure.save()
+        # Now let's pull all the data for the ionic steps together and save
+        # these to the database.
+        ionic_steps = bulk_create_ionic_steps(
+            # We are saving this to an IonicStepStructure datatable. To access
+            # this model, we look need to use "structures.model".
+            table=self.structures.model,
+            entries=[
+                dict(
+                    number=number,
+                    structure=pymstructure,
+                    energy=ionic_step["e_wo_entrp"],
+                    site_forces=ionic_step["forces"],
+                    lattice_stress=ionic_step["stress"],
+                )
+                for number, (pymstructure, ionic_step) in enumerate(
+                    zip(structures, data["ionic_steps"])
+                )
+            ],
+            defer_spacegroups=defer_spacegroups,
+            relaxation=self,  # this links the structures to this relaxation
+        )
 
-            # If this is the first structure, we want to link it as such
-            if number == 0:
-                self.structure_start_id = structure.id
-            # and same for the final structure. Note, we can't use elif becuase
-            # there's a chance the start/end structure are the same, which occurs
-            # when the starting structure is found to be relaxed already.
-            if number == len(structures) - 1:
-                self.structure_final_id = structure.id
+        # nothing to link if the calculation didn't finish a single ionic step
+        if not ionic_steps:
+            return
+
+        # Link the first and final structures. Note, there's a chance these
+        # are the same, which occurs when the starting structure is found to
+        # be relaxed already.
+        self.structure_start_id = ionic_steps[0].id
+        self.structure_final_id = ionic_steps[-1].id
 
         # update our relaxation entry with new data
         self.update_from_toolkit(
@@ -207,7 +216,11 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
             * 100,
         )
 
-    def update_from_pwscf_run(self, pwscf_run: PwscfXml):
+    def update_from_pwscf_run(
+        self,
+        pwscf_run: PwscfXml,
+        defer_spacegroups: bool = False,
+    ):
         """
         Given a Vasprun object from a finished relaxation, this will update the
         Relaxation table entry and the corresponding IonicStep entries.
@@ -216,6 +229,9 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
 
         pwscf_run :
             The final PwscfXml object from the relaxation outputs.
+        defer_spacegroups :
+            Whether to skip symmetry analysis for all ionic steps besides the
+            first and last (see `bulk_create_ionic_steps`). Defaults to False.
         """
 
         structures = pwscf_run.structures
@@ -223,29 +239,34 @@ class Relaxation(Structure, Thermodynamics, Forces, Calculation):
         all_site_forces = pwscf_run.all_site_forces
         lattice_stresses = pwscf_run.lattice_stresses
 
-        # Now let's iterate through the ionic steps and save these to the database.
-        for number, pymstructure in enumerate(structures):
-            # first pull all the data together and save it to the database. We
-            # are saving this to an IonicStepStructure datatable. To access this
-            # model, we look need to use "structures.model".
-            structure = self.structures.model.from_toolkit(
-                number=number,
-                structure=pymstructure,
-                energy=energies[number],
-                site_forces=all_site_forces[number].tolist(),
-                lattice_stress=lattice_stresses[number].tolist(),
-                relaxation=self,  # this links the structure to this relaxation
-            )
-            structure.save()
-
-            # If this is the first structure, we want to link it as such
-            if number == 0:
-                self.structure_start_id = structure.id
-            # and same for the final structure. Note, we can't use elif because
-            # there's a chance the start/end structure are the same, which occurs
-            # when the starting structure is found to be relaxed already.
-            if number == len(structures) - 1:
-                self.structure_final_id = structure.id
+        # Now let's pull all the data for the ionic steps together and save
+        # these to the database.
+        ionic_steps = bulk_create_ionic_steps(
+            table=self.structures.model,
+            entries=[
+                dict(
+                    number=number,
+                    structure=pymstructure,
+                    energy=energies[number],
+                    site_forces=all_site_forces[number].tolist(),
+                    lattice_stress=lattice_stresses[number].tolist(),
+                )
+                for number, pymstructure in enumerate(structures)
+            ],
+            defer_spacegroups=defer_spacegroups,
+            relaxation=self,  # this links the structures to this relaxation
+        )
+
+        # nothing to link if the calculation didn't finish a single ionic step
+        if not ionic_steps:
+            return
+
+        # Link the first and final structures. Note, there's a chance these
+        # are the same, which occurs when the starting structure is found to
+        # be relaxed already.
+        self.structure_start_id = ionic_steps[0].id
+        self.structure_final_id = ionic_steps[-1].id
+
         # update our relaxation entry with new data
         self.update_from_toolkit(
             # use the final ionic setup for the structure and energy
@@ -323,6 +344,32 @@ class IonicStep(Structure, Thermodynamics, Forces):
     )
 
 
+def bulk_create_ionic_steps(
+    table: Structure,
+    entries: list[dict],
+    defer_spacegroups: bool = False,
+    **kwargs,
+) -> list[Structure]:
+    """
+    Builds and saves all ionic steps of a calculation (such as a relaxation or
+    dynamics run) with a single `bulk_create`, rather than saving each step one
+    at a time.
+
+    Each entry is the kwargs for `table.from_toolkit`, and `kwargs` are shared
+    by all entries (e.g. `relaxation=self`). With `defer_spacegroups`, symmetry
+    analysis is skipped for all steps besides the first and last, as it is the
+    slowest part of building each row. Those spacegroups are left empty until
+    `table.update_spacegroups` is called, so this is off by default.
+
+    Returns the saved ionic steps (in the same order as `entries`).
+    """
+    last_step = len(entries) - 1
+    for number, entry in enumerate(entries):
+        entry["defer_spacegroup"] = defer_spacegroups and number not in (0, last_step)
+    ionic_steps = table.from_toolkit_many(entries, **kwargs)
+    return table.objects.bulk_create(ionic_steps)
+
+
 class RelaxationConvergence(PlotlyFigure):
     def get_plot(relaxation: Relaxation):
         # Grab the calculation's structure and convert it to a dataframe
@@ -1,151 +1,172 @@
 # -*- coding: utf-8 -*-
 
-from django.db.models import Func
+import logging
+from functools import cache
+
+import numpy
+from django.db import connection
+from django.db.models import Case, F, Q, Value, When
+from pymatgen.core.periodic_table import Element
+from pymatgen.core.units import Length, Mass
+from rich.progress import track
 from scipy.constants import Avogadro
 
 from simmate.config import settings
 from simmate.toolkit import Structure as ToolkitStructure
-from simmate.toolkit.validators.fingerprint import PartialCrystalNNFingerprint
-from simmate.utils import get_chemical_subsystems
+from simmate.toolkit.file_converters.structure.binary import (
+    TEXT_PREFIX,
+    BinaryStructureAdapter,
+)
+from simmate.toolkit.validators.fingerprint import CrystalNNFingerprint
+from simmate.utils import chunk_list
 
 from ..core import DatabaseTable, SearchResults, table_column
+from ..core.search_results import convert_in_batches
+from ..core.vectors import (
+    DISTANCE_METHODS,
+    LocalVectorIndex,
+    VectorDistance,
+    VectorField,
+    check_distance_method,
+)
 from .symmetry import Spacegroup
 
+# CrystalNN fingerprints (with Materials Project settings) always have 244
+# features: 61 site features x 4 statistics
+_FINGERPRINT_NDIM = 244
+
 
-# UNDER DEV -- Not used elsewhere yet
 class StructureSearchResults(SearchResults):
 
+    def filter_chemical_system(
+        self,
+        chemical_system: str,
+        include_subsystems: bool = False,
+        include_supersystems: bool = False,
+    ):
+        """
+        Filters structures by their chemical system (e.g. "Y-C-F"), with the
+        option to include subsystems (Y, C, F, Y-C, ...) and/or supersystems
+        (Y-C-F-Br, Sc-Y-C-F, ...).
+
+        Subsystem and supersystem searches use the element bitmask columns
+        (see `update_element_bits`), so they are a single indexed comparison
+        rather than a list of every possible system. Exact searches use the
+        `chemical_system` column directly.
+        """
+        elements = sorted(chemical_system.replace(" ", "").split("-"))
+        if not include_subsystems and not include_supersystems:
+            return self.filter(chemical_system="-".join(elements))
+
+        # symbols that aren't elements (e.g. a typo in a search form) are never
+        # in the table, so there is nothing to match
+        if not all(Element.is_valid_symbol(element) for element in elements):
+            return self.none()
+
+        query_bits = get_element_bits(elements)
+        filters = Q()
+        if include_subsystems:
+            # no elements outside of the query (i.e. bits & ~query == 0). Any
+            # subset of the query is also numerically smaller, which lets the
+            # database narrow the search with its index.
+            subsystem_filter = Q()
+            for column, bits in zip(_ELEMENT_BITS_COLUMNS, query_bits):
+                subsystem_filter &= Q(**{f"{column}__lte": bits}) & Q(
+                    **{f"{column}_outside": 0}
+                )
+            filters |= subsystem_filter
+        if include_supersystems:
+            # every element of the query (i.e. bits & query == query)
+            supersystem_filter = Q()
+            for column, bits in zip(_ELEMENT_BITS_COLUMNS, query_bits):
+                supersystem_filter &= Q(**{f"{column}__gte": bits}) & Q(
+                    **{f"{column}_inside": bits}
+                )
+            filters |= supersystem_filter
+
+        queryset = self
+        for column, bits in zip(_ELEMENT_BITS_COLUMNS, query_bits):
+            queryset = queryset.alias(
+                **{
+                    f"{column}_outside": F(column).bitand(~bits & _ELEMENT_BITS_MAX),
+                    f"{column}_inside": F(column).bitand(bits),
+                }
+            )
+        return queryset.filter(filters)
+
     def filter_similarity(
         self,
         structure: ToolkitStructure,
         method: str = "L2",
-        cutoff: float = 0.8,
+        cutoff: float = None,
         order: bool = True,
+        limit: int = 100,
     ):
         """
-        Method for searching table for matching structures using the pgvector
-        extension in postgres databases. If another backend is used, the search
-        manually calculates the distance using scipy which is much slower for
-        methods running on parallel machines (i.e. evolutionary search) as it
-        must be run locally rather than on the host server (requiring the fingerprints
-        to be transferred to the local cpu).
+        Searches the table for structures that are similar to the one given,
+        using their CrystalNN fingerprints (see `Structure.update_fingerprints`).
+        The distance to each match is added as the `fingerprint_distance` column,
+        where a smaller value means a more similar structure.
+
+        If the `postgres_pgvector_extension` setting is enabled, the search
+        runs in-database using the pgvector extension (and its HNSW/IVFFlat
+        indexes if made with `Structure.create_fingerprint_index`). Otherwise,
+        the search uses the table's local index file, which is an approximate
+        nearest neighbor (HNSW) index built by usearch. In both cases, the
+        fingerprints are never pulled from the database and compared one by one.
+
+        #### Parameters
+
+        - `structure` :
+            The structure to compare the table against.
+        - `method` :
+            The distance metric to use. Options are "L2" (euclidean distance)
+            and "cosine" (cosine distance).
+        - `cutoff` :
+            The maximum distance for a structure to count as a match. None
+            (default) disables this filter.
+        - `order` :
+            Whether to order the results from most to least similar.
+        - `limit` :
+            The maximum number of matches to return. Approximate indexes are
+            only used by postgres when a limit is given. For the local index,
+            this limit is applied before any other filters of this query, so
+            use a larger limit when searching within a filtered query.
         """
-        #############################################
-        NotImplementedError("Method still in testing")
-        #############################################
-
-        if settings.database_backend != "postgresql":
-            NotImplementedError(
-                "Similarity searches in-database are not supported outside of "
-                "postgres. You can still use the toolkit's SimilarityFilter "
-                "to handle this outside the database though."
+        check_distance_method(method)
+        fingerprint = _get_fingerprint_crystalnn(structure)
+
+        if settings.postgres_pgvector_extension:
+            queryset = self.annotate(
+                fingerprint_distance=VectorDistance(
+                    "fingerprint_crystalnn",
+                    fingerprint,
+                    method,
+                )
             )
-            # TODO: may remove and just require users to switch to postgres, so
-            # I'd like to leave this disabled for now
-
-            # Sam's method which will be converted to a filter:
-            # if method == "L2":
-            #     scipy_method_str = "euclidean"
-            # elif method == "inner product":
-            #     scipy_method_str = "inner product" # This is easier to implement with numpy
-            # elif method == "cosine":
-            #     scipy_method_str = "cosine"
-            # elif method == "L1":
-            #     scipy_method_str = "cityblock"
-            # elif method == "hamming":
-            #     scipy_method_str = "hamming"
-            # elif method == "jaccard":
-            #     scipy_method_str = "jaccard"
-            # # our database backend is not postgress. We calculate the distance
-            # # locally using numpy/scipy instead of pgvector
-            # fingerprints = cls.objects.values_list("fingerprint", flat=True)
-            # fingerprints_array = np.vstack(fingerprints)
-            # if scipy_method_str == "inner product":
-            #     # no inner product method for cdist, but it's easy to do with numpy
-            #     # note this distance is higher for closer arrays and is dependent
-            #     # on magnitude of the vectors.
-            #     distances = -np.dot(fingerprints_array, new_fingerprint)
-            # else:
-            #     reshaped_new_fingerprint = new_fingerprint.reshape(1,-1) # reshape because scipy requires 2D
-            #     distances = cdist(fingerprints_array, reshaped_new_fingerprint, metric=scipy_method_str)
-            # result_indices = np.where(distances<cutoff)[0]
-            # if len(result_indices) > 0:
-            #     # return datatable id for structures that match
-            #     db_ids = [cls.objects.values_list("id", flat=True)[int(i)] for i in result_indices]
-            #     return db_ids
-
-        # BUG:
-        # This doesn't check if pgvector is installed. Is there a way to do this? -@SWeav02
-        #
-        # Yes, there is a way to enforce this, which is what I do with Rdkit+postgres,
-        # but it may result in us *requiring* postgres and doing away with sqlite
-        # altogether. I'll think more on a workaround -@jacksund
-
-        # from name to pgvector op
-        operator_mappings = {
-            "L1": "<+>",  # cityblock
-            "L2": "<->",  # euclidean
-            "inner product": "<#>",
-            "cosine": "<=>",
-            "hamming": "<~>",
-            "jaccard": "<%>",
+            if cutoff is not None:
+                queryset = queryset.filter(fingerprint_distance__lte=cutoff)
+            if order:
+                queryset = queryset.order_by("fingerprint_distance")
+            return queryset[:limit] if limit else queryset
+
+        # otherwise we search the local index, and then load the matches
+        index = self.model.get_fingerprint_index(method)
+        ids, distances = index.search(fingerprint, count=limit or len(index))
+        matches = {
+            id: distance
+            for id, distance in zip(ids, distances)
+            if cutoff is None or distance <= cutoff
         }
-        if method not in operator_mappings:
-            raise Exception(
-                f"{method} is not implemented as a distance metric. "
-                f"Available options are L2, inner product, cosine, L1, hamming, and jaccard."
-            )
-
-        if not isinstance(structure, ToolkitStructure):
-            structure = ToolkitStructure.from_dynamic(structure)
-
-        # get new structure feature
-        featurizer = PartialCrystalNNFingerprint.get_featurizer(
-            composition=structure.composition
-        )
-        new_fingerprint = featurizer.featurize(structure)
-        fingerprint_str = str(new_fingerprint)
-        # TODO: this is used in several places and should probably be a property
-        # of our toolkit structure class
-
-        queryset = self.annotate(
-            similarity=Func(
-                "fingerprint_crystalnn",  # the column that holds the fingerprint
-                reference_structure=fingerprint_str,
-                function="tanimoto_sml",
-                template="...",  # TODO
+        queryset = self.filter(id__in=matches).annotate(
+            fingerprint_distance=Case(
+                *[When(id=id, then=Value(d)) for id, d in matches.items()],
+                default=None,
                 output_field=table_column.FloatField(),
             )
         )
-        # This code below does the same thing & is easier to read -- but it doesn't
-        # allow for use of filter() afterwards, so we opt for the annotate()
-        # method above.
-        #
-        # BUG: injection risk here.
-        #   https://docs.djangoproject.com/en/4.2/topics/db/sql/#passing-parameters-into-raw
-        #
-        # NOTE: the percent signs are doubled in this query, when the real
-        # SQL query they are single! This is because django tries to read
-        # them as a formatted string
-        #
-        # query = (
-        #       TODO
-        # )
-        # results = cls.objects.raw(query)
-
-        # Sam's query template:
-        # SELECT * FROM fingerprint WHERE embedding {postgres_method_str} '{fingerprint_str}' < {cutoff};
-        # FROM {table_name}
-
-        if cutoff:
-            queryset = queryset.filter(
-                similarity__gte=cutoff,
-            )
-
         if order:
-            # reverse order because bigger number = more similar
-            queryset = queryset.order_by("-similarity_2d")
-
+            queryset = queryset.order_by("fingerprint_distance")
         return queryset
 
 
@@ -155,7 +176,17 @@ class Structure(DatabaseTable):
 
     exclude_from_summary = ["structure", "elements"]
 
-    archive_fields = ["structure", "is_invalid_structure"]
+    archive_fields = ["structure", "is_invalid_structure", "--fingerprint_crystalnn"]
+
+    toolkit_columns = ["structure"]
+
+    export_converters = {"structure": BinaryStructureAdapter.to_text}
+
+    # -------------------------------- MANAGER --------------------------------
+
+    objects = StructureSearchResults.as_manager()
+
+    # -------------------------------------------------------------------------
 
     # NOTE: below is for legacy implementation of compositional API searches.
     # This is kept for reference as we migrate to the new api
@@ -181,6 +212,10 @@ class Structure(DatabaseTable):
     The core structure information, which is written to a string and in a 
     compressed format using the `from_toolkit` method. To get back to our toolkit
     structure object, use the `to_toolkit` method.
+
+    New rows use a compact binary format (see `BinaryStructureAdapter`), while
+    older rows may be POSCAR or CIF strings until they are converted with
+    `convert_structure_format` (or `simmate database convert-structures`).
     """
 
     nsites = table_column.IntegerField(blank=True, null=True)
@@ -209,6 +244,19 @@ class Structure(DatabaseTable):
     odd use of quotes '"C"' is required here!
     """
 
+    element_bits_1 = table_column.BigIntegerField(blank=True, null=True, db_index=True)
+    """
+    The elements of the structure stored as bits (H through Pr, i.e. atomic
+    numbers 1-59). Used for fast chemical system searches with
+    `filter_chemical_system`, so you shouldn't need to query this directly.
+    """
+
+    element_bits_2 = table_column.BigIntegerField(blank=True, null=True, db_index=True)
+    """
+    The elements of the structure stored as bits (Nd through Og, i.e. atomic
+    numbers 60-118). See `element_bits_1`.
+    """
+
     is_invalid_structure = table_column.BooleanField(blank=True, null=True)
     """
     Whether the structure was loaded successfully into the simmate database.
@@ -284,14 +332,28 @@ class Structure(DatabaseTable):
     `simmate.database.mixins.symmetry.Spacegroup`
     """
 
-    # TODO:
-    # fingerprint_crystalnn = table_column.JSONField(blank=True, null=True)
-    # """
-    # The fingerprint for the structure determined using a custom CrystalNN fingerprint
-    # """
-    # TODO: This should be a vector type column to be most efficient. Otherwise
-    # the database will run conversions on the entire column before doing distance
-    # comparisons -- which would be a clear bottleneck.
+    # ------------------------ pgvector-extension fields ------------------------
+
+    # Fingerprints are only stored in the database when using postgres with
+    # the pgvector extension. Otherwise, they are stored in a local index
+    # file (see `get_fingerprint_index`).
+
+    if settings.postgres_pgvector_extension:
+
+        fingerprint_crystalnn = VectorField(
+            dimensions=_FINGERPRINT_NDIM,
+            blank=True,
+            null=True,
+        )
+        """
+        The fingerprint for the structure determined using a CrystalNN 
+        fingerprint (with the Materials Project settings). This column is used
+        for similarity searches, and we recommend using the `filter_similarity`
+        method in our Python API rather than interact with this column via SQL.
+        
+        Fingerprints are slow to calculate, so this column is populated with
+        the `update_fingerprints` method rather than when each structure is saved.
+        """
 
     # The AFLOW prototype that this structure maps to.
     # TODO: this will be a relationship in the future
@@ -305,44 +367,11 @@ class Structure(DatabaseTable):
     # criteria, you can still do this in python and pandas! Just not at the
     # SQL level
 
-    # DEPRECIATED: will move to `StructureSearchResults`
-    def filter_chemical_system(self, queryset, name, value):
-
-        # name/value here are the key/value pair for chemical system
-
-        # Grab the "include_subsystems" field from the filter form. Note, this
-        # value will be given as a string which we convert to a python boolean
-        include_subsystems = self.data.dict().get("include_subsystems", "false")
-        include_subsystems = True if include_subsystems == "true" else False
-
-        # TODO:
-        # Make sure that the chemical system is made of valid elements and
-        # separated by hyphens
-
-        # check if the user wants subsystems included (This will be True or False)
-        if include_subsystems:
-            systems_cleaned = get_chemical_subsystems(value)
-
-        # otherwise just clean the single system
-        else:
-            # Convert the system to a list of elements
-            systems_cleaned = value.split("-")
-            # now recombine the list back into alphabetical order
-            systems_cleaned = ["-".join(sorted(systems_cleaned))]
-            # NOTE: we call this "systems_cleaned" and put it in a list so
-            # that our other methods don't have to deal with multiple cases
-            # when running a django filter.
-
-        filtered_queryset = queryset.filter(chemical_system__in=systems_cleaned)
-
-        # now return the cleaned value. Note that this is now a list of
-        # chemical systems, where all elements are in alphabetical order.
-        return filtered_queryset
-
     @classmethod
     def _from_toolkit(
         cls,
         structure: ToolkitStructure | str = None,
+        defer_spacegroup: bool = False,
         as_dict: bool = False,
         **kwargs,
     ):
@@ -350,22 +379,7 @@ class Structure(DatabaseTable):
         if not structure:
             return kwargs if as_dict else cls(**kwargs)
 
-        if isinstance(structure, str):
-            structure = ToolkitStructure.from_database_string(structure)
-
-        # BUG: This is an old line and I can't remember why I have it. Once I
-        # have implemented more unittests, consider deleting. This method is
-        # ment to convert to a ToolkitStructure, but the structure should
-        # already be in this format...
-        structure = ToolkitStructure.from_dynamic(structure)
-
-        # OPTIMIZE: I currently store files as poscar strings for ordered structures
-        # and as CIFs for disordered structures. Both of this include excess information
-        # that slightly inflates file size, so I will be making a new string format in
-        # the future. This will largely be based off the POSCAR format, but will
-        # account for disordered structures and all limit repeated data (such as the
-        # header line, "direct", listing each element/composition, etc.).
-        storage_format = "POSCAR" if structure.is_ordered else "CIF"
+        structure = _load_structure(structure)
 
         # OPTIMIZE
         # This attempts to match the structure to an AFLOW prototype and it is
@@ -377,50 +391,489 @@ class Structure(DatabaseTable):
         # Alternatively, add as a method to the table, similar to
         # the "update_all_stabilities" for thermodynamics
 
-        # TODO:
-        # Generate fingerprint
-        # featurizer = PartialCrystalNNFingerprint.get_featurizer(
-        #     composition=structure.composition
-        # )
-        # fingerprint = featurizer.featurize(structure)
+        # NOTE: fingerprints are too slow to generate here, so they are
+        # populated separately with `update_fingerprints`. The same can be
+        # done for the spacegroup with `defer_spacegroup=True`, which is
+        # recommended when loading large datasets.
 
         # Given a pymatgen structure object, this will return a database structure
         # object, but will NOT save it to the database yet. The kwargs input
         # is only if you inherit from this class and add extra fields.
-        structure_dict = dict(
-            structure=structure.to(fmt=storage_format),
-            nsites=structure.num_sites,
-            nelements=len(structure.composition),
-            elements=[str(e) for e in structure.composition.elements],
-            chemical_system=structure.composition.chemical_system,
-            density=float(structure.density),
-            density_atomic=structure.num_sites / structure.volume,
-            volume=structure.volume,
-            # 1e-27 is to convert from cubic angstroms to Liter and then 1e3 to
-            # mL. Therefore this value is in mL/mol
-            # OPTIMIZE: move this to a class method
-            volume_molar=(structure.volume / structure.num_sites)
-            * Avogadro
-            * 1e-27
-            * 1e3,
-            # OPTIMIZE SPACEGROUP INFO
-            spacegroup_id=structure.get_space_group_info(
-                symprec=0.1,
-                # angle_tolerance=5.0,
-            )[1],
-            formula_full=structure.composition.formula,
-            formula_reduced=structure.composition.reduced_formula,
-            formula_anonymous=structure.composition.anonymized_formula,
-            # fingerprint_crystalnn=list(fingerprint),
+        structure_dict = _combine_columns(
+            composition_columns=_get_composition_columns(structure.composition),
+            structure_columns=_get_structure_columns(structure, defer_spacegroup),
             # prototype=prototype_name,
             **kwargs,  # this allows subclasses to add fields with ease
         )
+
         # If as_dict is false, we build this into an Object. Otherwise, just
         # return the dictionary
         return structure_dict if as_dict else cls(**structure_dict)
 
+    @classmethod
+    def _from_toolkit_many(
+        cls,
+        inputs: list[dict],
+        parallel: bool = False,
+        max_workers: int = None,
+    ) -> list[dict]:
+        # Columns that only depend on the composition are computed once for
+        # each unique composition, which is common when loading relaxations,
+        # prototypes, or the results of an evolutionary search. The rest
+        # (mainly symmetry analysis) is done per structure and can be split
+        # across processes.
+        structures = [
+            _load_structure(kwargs["structure"]) if kwargs.get("structure") else None
+            for kwargs in inputs
+        ]
+        structure_columns = iter(
+            convert_in_batches(
+                _get_structure_columns,
+                (
+                    (structure, kwargs.get("defer_spacegroup", False))
+                    for kwargs, structure in zip(inputs, structures)
+                    if structure
+                ),
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+        )
+
+        composition_cache = {}
+        all_data = []
+        for kwargs, structure in zip(inputs, structures):
+            extra_kwargs = {
+                k: v
+                for k, v in kwargs.items()
+                if k not in ["structure", "defer_spacegroup"]
+            }
+            if not structure:
+                all_data.append(extra_kwargs)
+                continue
+
+            composition = structure.composition
+            key = frozenset(composition.items())
+            if key not in composition_cache:
+                composition_cache[key] = _get_composition_columns(composition)
+
+            structure_dict = _combine_columns(
+                composition_columns=composition_cache[key],
+                structure_columns=next(structure_columns),
+                **extra_kwargs,
+            )
+            all_data.append(structure_dict)
+
+        return all_data
+
     def to_toolkit(self) -> ToolkitStructure:
         """
         Converts the database object to toolkit Structure object.
         """
         return ToolkitStructure.from_database_object(self)
+
+    @classmethod
+    def toolkit_from_values(cls, structure: str) -> ToolkitStructure:
+        """
+        Converts the values of `toolkit_columns` to a toolkit Structure object.
+        Unlike `to_toolkit`, the structure is not linked to a database object.
+        """
+        return ToolkitStructure.from_database_string(structure)
+
+    @classmethod
+    def _load_archive_batch(cls, df):
+        # archives keep our binary format, but older ones have POSCAR or CIF
+        # text that we convert (and new archives skip this entirely)
+        if "structure" in df.columns:
+            import polars
+
+            is_text = ~polars.col("structure").str.starts_with(TEXT_PREFIX)
+            if df.select(is_text.any()).item():
+                df = df.with_columns(
+                    polars.col("structure").map_elements(
+                        _to_binary_structure_str,
+                        return_dtype=polars.String,
+                    )
+                )
+        super()._load_archive_batch(df)
+
+    @classmethod
+    def convert_structure_format(cls, batch_size: int = 10_000) -> int:
+        """
+        Converts rows that still store their `structure` as a POSCAR or CIF
+        string to the compact binary format, which is smaller and faster to
+        load. Rows are converted in batches, so this can safely be stopped
+        and restarted.
+
+        Returns the number of rows converted.
+        """
+        query = cls.objects.filter(structure__isnull=False).exclude(
+            structure__startswith=TEXT_PREFIX
+        )
+        total = query.count()
+        nconverted = 0
+        for _ in track(range(0, total, batch_size)):
+            # we always grab the first batch because converted rows drop out
+            # of this query
+            rows = list(
+                query.order_by("id").values_list("id", "structure")[:batch_size]
+            )
+            if not rows:
+                break
+            cls.objects.bulk_update(
+                [
+                    cls(id=id, structure=_to_binary_structure_str(structure))
+                    for id, structure in rows
+                ],
+                fields=["structure"],
+            )
+            nconverted += len(rows)
+        return nconverted
+
+    @classmethod
+    def update_spacegroups(
+        cls,
+        batch_size: int = 1_000,
+        parallel: bool = False,
+        max_workers: int = None,
+    ) -> int:
+        """
+        Determines the spacegroup of every structure that doesn't have one yet,
+        which is the case for rows loaded with `defer_spacegroup=True`:
+
+        ``` python
+        entries = [dict(structure=s, defer_spacegroup=True) for s in structures]
+        MyTable.objects.bulk_create(MyTable.from_toolkit_many(entries))
+        MyTable.update_spacegroups(parallel=True)
+        ```
+
+        Results are saved after every batch, so this can safely be stopped
+        and restarted (or called on a cycle to pick up new structures).
+        Structures are matched by a hash of their sites & lattice, and
+        symmetry analysis is only done once for each unique structure.
+
+        Returns the number of structures updated.
+        """
+        new_ids = list(
+            cls.objects.filter(
+                spacegroup__isnull=True,
+                structure__isnull=False,
+            ).values_list("id", flat=True)
+        )
+
+        logging.info(f"Determining spacegroups for {len(new_ids)} structures")
+        spacegroups = {}  # structure hash --> spacegroup number
+        for ids_chunk in track(list(chunk_list(new_ids, batch_size))):
+            rows = list(
+                cls.objects.filter(id__in=ids_chunk).values_list("id", "structure")
+            )
+            structures = [ToolkitStructure.from_database_string(row[1]) for row in rows]
+            hashes = [structure.get_hash_key() for structure in structures]
+
+            new_structures = {
+                structure_hash: structure
+                for structure_hash, structure in zip(hashes, structures)
+                if structure_hash not in spacegroups
+            }
+            numbers = convert_in_batches(
+                _get_spacegroup_number,
+                ((structure,) for structure in new_structures.values()),
+                batch_size=batch_size,
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+            spacegroups.update(zip(new_structures.keys(), numbers))
+
+            # there are only 230 spacegroups, so one update per spacegroup is
+            # much faster than a `bulk_update` of every row
+            ids_by_spacegroup = {}
+            for row, structure_hash in zip(rows, hashes):
+                number = spacegroups[structure_hash]
+                ids_by_spacegroup.setdefault(number, []).append(row[0])
+            for number, ids in ids_by_spacegroup.items():
+                cls.objects.filter(id__in=ids).update(spacegroup_id=number)
+
+        return len(new_ids)
+
+    @classmethod
+    def update_element_bits(cls, batch_size: int = 10_000) -> int:
+        """
+        Fills in the `element_bits_1` and `element_bits_2` columns for rows
+        that were saved before these columns existed, which is required for
+        subsystem and supersystem searches with `filter_chemical_system`.
+        Rows are updated in batches, so this can safely be stopped and
+        restarted.
+
+        Returns the number of rows updated.
+        """
+        new_ids = list(
+            cls.objects.filter(
+                element_bits_1__isnull=True,
+                elements__isnull=False,
+            ).values_list("id", flat=True)
+        )
+
+        logging.info(f"Updating element bits for {len(new_ids)} structures")
+        for ids_chunk in track(list(chunk_list(new_ids, batch_size))):
+            rows = cls.objects.filter(id__in=ids_chunk).values_list("id", "elements")
+            # structures with the same elements are updated together
+            ids_by_bits = {}
+            for id, elements in rows:
+                ids_by_bits.setdefault(get_element_bits(elements), []).append(id)
+            for bits, ids in ids_by_bits.items():
+                cls.objects.filter(id__in=ids).update(
+                    **dict(zip(_ELEMENT_BITS_COLUMNS, bits))
+                )
+
+        return len(new_ids)
+
+    # -------------------------------------------------------------------------
+    # Methods for structure fingerprints and similarity searches
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def update_fingerprints(
+        cls,
+        batch_size: int = 1_000,
+        parallel: bool = False,
+        max_workers: int = None,
+    ) -> int:
+        """
+        Calculates the CrystalNN fingerprint of every structure that doesn't
+        have one yet, which is required before using `filter_similarity`.
+        This can be called on a cycle to pick up new structures.
+
+        Fingerprints are saved to the `fingerprint_crystalnn` column when the
+        `postgres_pgvector_extension` setting is enabled, and to the table's
+        local index files otherwise.
+
+        Note, fingerprints are not updated if a structure is changed after
+        its fingerprint was calculated.
+
+        Returns the number of new fingerprints.
+        """
+        use_pgvector = settings.postgres_pgvector_extension
+
+        if use_pgvector:
+            query = cls.objects.filter(
+                fingerprint_crystalnn__isnull=True,
+                structure__isnull=False,
+            )
+            new_ids = list(query.values_list("id", flat=True))
+        else:
+            indexes = [cls.get_fingerprint_index(method) for method in DISTANCE_METHODS]
+            ids = numpy.array(
+                cls.objects.filter(structure__isnull=False).values_list("id", flat=True)
+            )
+            new_ids = ids[~indexes[0].contains(ids)].tolist()
+
+        logging.info(f"Calculating fingerprints for {len(new_ids)} structures")
+        for ids_chunk in track(list(chunk_list(new_ids, batch_size))):
+            rows = list(
+                cls.objects.filter(id__in=ids_chunk).values_list("id", "structure")
+            )
+            ids_chunk = [row[0] for row in rows]
+            fingerprints = list(
+                convert_in_batches(
+                    _get_fingerprint_crystalnn,
+                    ((row[1],) for row in rows),
+                    batch_size=batch_size,
+                    parallel=parallel,
+                    max_workers=max_workers,
+                )
+            )
+            if use_pgvector:
+                cls.objects.bulk_update(
+                    [
+                        cls(id=id, fingerprint_crystalnn=fingerprint)
+                        for id, fingerprint in zip(ids_chunk, fingerprints)
+                    ],
+                    fields=["fingerprint_crystalnn"],
+                )
+            else:
+                # saved after every chunk so an interrupted update resumes here
+                for index in indexes:
+                    index.add(ids_chunk, fingerprints)
+                    index.save()
+
+        return len(new_ids)
+
+    @classmethod
+    def get_fingerprint_index(cls, method: str = "L2") -> LocalVectorIndex:
+        """
+        Loads the local index file of structure fingerprints, which is used for
+        similarity searches when the pgvector extension isn't available. There
+        is one index for each distance method, and they are stored in the
+        `~/simmate/<app_label>/vectors/` directory.
+        """
+        directory = settings.config_directory / cls._meta.app_label / "vectors"
+        return LocalVectorIndex(
+            filename=directory
+            / f"{cls.table_name}-fingerprint_crystalnn-{method}.usearch",
+            ndim=_FINGERPRINT_NDIM,
+            method=method,
+        )
+
+    @classmethod
+    def create_fingerprint_index(
+        cls,
+        method: str = "L2",
+        index_type: str = "hnsw",
+        lists: int = None,
+    ):
+        """
+        Builds a pgvector index on the `fingerprint_crystalnn` column, which
+        makes `filter_similarity` searches approximate but much faster. Only
+        one index per distance method is needed, and it is best to make this
+        after the bulk of fingerprints have been loaded.
+
+        #### Parameters
+
+        - `method` :
+            The distance method that the index is for ("L2" or "cosine").
+        - `index_type` :
+            Either "hnsw" (better speed-recall tradeoff, but slower to build)
+            or "ivfflat" (faster to build and smaller).
+        - `lists` :
+            The number of lists for an "ivfflat" index. Defaults to the number
+            of rows / 1000 (with a minimum of 10), as recommended by pgvector.
+        """
+        if not settings.postgres_pgvector_extension:
+            raise Exception(
+                "Fingerprint indexes can only be built in postgres with the "
+                "pgvector extension. Otherwise, a local index is already made "
+                "with `update_fingerprints`."
+            )
+        check_distance_method(method)
+        opclass = DISTANCE_METHODS[method][1]
+
+        if index_type == "hnsw":
+            options = ""
+        elif index_type == "ivfflat":
+            lists = lists or max(cls.objects.count() // 1000, 10)
+            options = f" WITH (lists = {int(lists)})"
+        else:
+            raise ValueError(f"Unknown index_type: {index_type}")
+
+        table = cls._meta.db_table
+        index_name = f"{table}_fp_{opclass}_{index_type}"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table}" '
+                f"USING {index_type} (fingerprint_crystalnn {opclass}){options}"
+            )
+
+
+# Used to convert density from amu/Å^3 to g/cm^3. We avoid the slower
+# `Structure.density`, which repeats these unit conversions for every structure.
+_AMU_TO_G = float(Mass(1, "amu").to("g"))
+_ANG3_TO_CM3 = float(Length(1, "ang").to("cm")) ** 3
+
+
+def _load_structure(structure: ToolkitStructure | str) -> ToolkitStructure:
+    if isinstance(structure, str):
+        structure = ToolkitStructure.from_database_string(structure)
+
+    # BUG: This is an old line and I can't remember why I have it. Once I
+    # have implemented more unittests, consider deleting. This method is
+    # ment to convert to a ToolkitStructure, but the structure should
+    # already be in this format...
+    return ToolkitStructure.from_dynamic(structure)
+
+
+def _get_composition_columns(composition) -> dict:
+    elements = [str(e) for e in composition.elements]
+    return dict(
+        nelements=len(composition),
+        elements=elements,
+        **dict(zip(_ELEMENT_BITS_COLUMNS, get_element_bits(elements))),
+        chemical_system=composition.chemical_system,
+        formula_full=composition.formula,
+        formula_reduced=composition.reduced_formula,
+        formula_anonymous=composition.anonymized_formula,
+        # not a column, but needed for the density
+        weight=composition.weight,
+    )
+
+
+# Elements are stored as bits across two columns, where the element with atomic
+# number Z is bit (Z-1) % 59 of column (Z-1) // 59. We only use 59 bits per
+# column so that values always fit in a positive 64-bit integer, which keeps
+# the values of a subsystem smaller than those of its supersystems.
+_ELEMENT_BITS_COLUMNS = ["element_bits_1", "element_bits_2"]
+_ELEMENT_BITS_PER_COLUMN = 59
+_ELEMENT_BITS_MAX = (1 << _ELEMENT_BITS_PER_COLUMN) - 1
+
+
+def get_element_bits(elements: list[str]) -> tuple[int, int]:
+    """
+    Gives the values of the `element_bits_1` and `element_bits_2` columns for
+    a list of elements (e.g. ["Y", "C", "F"]).
+    """
+    bits = [0] * len(_ELEMENT_BITS_COLUMNS)
+    for element in elements:
+        column, bit = divmod(Element(element).Z - 1, _ELEMENT_BITS_PER_COLUMN)
+        bits[column] |= 1 << bit
+    return tuple(bits)
+
+
+def _get_structure_columns(
+    structure: ToolkitStructure,
+    defer_spacegroup: bool = False,
+) -> dict:
+    return dict(
+        # stored in our compact binary format (see `BinaryStructureAdapter`)
+        structure=BinaryStructureAdapter.to_str(structure),
+        nsites=structure.num_sites,
+        volume=structure.volume,
+        # symmetry analysis is the slowest step here, so it can be left for
+        # `Structure.update_spacegroups`
+        spacegroup_id=(None if defer_spacegroup else _get_spacegroup_number(structure)),
+    )
+
+
+def _to_binary_structure_str(structure: str) -> str:
+    # POSCAR and CIF strings (from older rows or archives) to our binary format
+    if BinaryStructureAdapter.is_binary_str(structure):
+        return structure
+    return BinaryStructureAdapter.to_str(
+        ToolkitStructure.from_database_string(structure)
+    )
+
+
+def _get_spacegroup_number(structure: ToolkitStructure) -> int:
+    return structure.get_space_group_info(
+        symprec=0.1,
+        # angle_tolerance=5.0,
+    )[1]
+
+
+def _combine_columns(
+    composition_columns: dict,
+    structure_columns: dict,
+    **kwargs,
+) -> dict:
+    nsites = structure_columns["nsites"]
+    volume = structure_columns["volume"]
+    columns = {**composition_columns, **structure_columns}
+    weight = columns.pop("weight")
+    return dict(
+        **columns,
+        density=weight * _AMU_TO_G / (volume * _ANG3_TO_CM3),
+        density_atomic=nsites / volume,
+        # 1e-27 is to convert from cubic angstroms to Liter and then 1e3 to
+        # mL. Therefore this value is in mL/mol
+        volume_molar=(volume / nsites) * Avogadro * 1e-27 * 1e3,
+        **kwargs,
+    )
+
+
+@cache
+def _get_fingerprint_featurizer():
+    return CrystalNNFingerprint.get_featurizer()
+
+
+def _get_fingerprint_crystalnn(structure: ToolkitStructure | str) -> list[float]:
+    structure = _load_structure(structure)
+    fingerprint = _get_fingerprint_featurizer().featurize(structure)
+    # some sites can give NaN values, which can't be compared
+    return numpy.nan_to_num(numpy.array(fingerprint, dtype=float)).tolist()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy
+import pytest
+from pymatgen.electronic_structure.bandstructure import BandStructureSymmLine
+from pymatgen.electronic_structure.core import Spin
+from pymatgen.io.vasp.outputs import Vasprun
+
+from simmate.apps.materials_project import workflows as matproj_workflows
+from simmate.conftest import run_benchmark
+from simmate.database.workflow_results import BandStructureCalc
+
+
+@pytest.fixture(scope="module")
+def vasprun(tmp_path_factory):
+    # a spin-polarized band structure of Fe (216 k-points, 11 bands)
+    directory = tmp_path_factory.mktemp("band_structure")
+    shutil.unpack_archive(
+        Path(matproj_workflows.__file__).parent / "test" / "band_structure.zip",
+        extract_dir=directory,
+    )
+    return Vasprun(directory / "vasprun.xml", parse_projected_eigen=True)
+
+
+def assert_same_band_structure(new, original):
+    for spin in original.bands:
+        assert numpy.array_equal(new.bands[spin], original.bands[spin])
+        assert numpy.array_equal(new.projections[spin], original.projections[spin])
+    assert numpy.allclose(new.distance, original.distance)
+    assert new.branches == original.branches
+    assert new.get_band_gap() == original.get_band_gap()
+
+
+@pytest.mark.django_db
+def test_band_structure_table(vasprun, tmp_path):
+    BandStructureCalc.show_columns()
+
+    original = vasprun.get_band_structure(line_mode=True)
+    entry = BandStructureCalc.from_vasp_run(vasprun)
+    entry = BandStructureCalc.objects.get(id=entry.id)
+    assert entry.band_structure_data is None
+    assert entry.band_gap == original.get_band_gap()["energy"]
+    assert_same_band_structure(entry.to_toolkit_band_structure(), original)
+    assert not entry.to_toolkit_band_structure(include_projections=False).projections
+
+    # loading a single spin channel
+    bands = entry.get_bands(spin="down")
+    assert numpy.array_equal(bands["energies"], original.bands[Spin.down])
+    assert bands["labels"][0] == "\\Gamma"
+    assert bands["efermi"] == original.efermi
+    with pytest.raises(ValueError):
+        entry.get_bands(spin="other")
+
+    # loading a subset for plotting
+    bands = entry.get_bands(energy_window=(-2, 2), max_kpoints=50)
+    energies = original.bands[Spin.up]
+    in_window = ((energies >= -2) & (energies <= 2)).any(axis=1)
+    assert len(bands["energies"]) == in_window.sum()
+    assert 50 <= len(bands["distances"]) < 216
+    assert bands["energies"].shape[1] == len(bands["distances"])
+    labels = [k.label for k in original.kpoints if k.label]
+    assert sorted(bands["labels"].values()) == sorted(labels)
+
+    # plots use the subset above, and exports give pymatgen's JSON
+    entry.write_band_diagram_plot(directory=tmp_path)
+    assert (tmp_path / "band_diagram.png").exists()
+    exported = BandStructureCalc.objects.filter(id=entry.id).to_dataframe(
+        columns=["band_structure_arrays"], export_values=True
+    )
+    assert_same_band_structure(
+        BandStructureSymmLine.from_dict(
+            json.loads(exported.band_structure_arrays.iloc[0])
+        ),
+        original,
+    )
+
+    # older entries that used the JSON format
+    legacy_entry = BandStructureCalc.objects.create(
+        band_structure_data=original.to_json()
+    )
+    assert_same_band_structure(legacy_entry.to_toolkit_band_structure(), original)
+    with pytest.raises(ValueError):
+        legacy_entry.get_bands()
+    legacy_entry.write_band_diagram_plot(directory=tmp_path)
+    assert BandStructureCalc.convert_band_structure_data() == 1
+    assert BandStructureCalc.convert_band_structure_data() == 0
+    legacy_entry.refresh_from_db()
+    assert legacy_entry.band_structure_data is None
+    assert_same_band_structure(legacy_entry.to_toolkit_band_structure(), original)
+
+
+@pytest.mark.benchmark
+def test_band_structure_benchmark(vasprun):
+    # compares the JSON format with the compressed arrays for the Fe band
+    # structure and for a larger one (1000 k-points, 60 bands, 4 sites)
+    typical = vasprun.get_band_structure(line_mode=True)
+
+    rng = numpy.random.default_rng(0)
+    nkpoints, nbands, nsites = 1_000, 60, 4
+    fractions = numpy.linspace(0, 1, nkpoints)[:, None]
+    large = BandStructureSymmLine(
+        kpoints=fractions * [0.5, 0.5, 0.5],
+        eigenvals={
+            spin: numpy.sort(rng.uniform(-10, 10, (nbands, nkpoints)), axis=0).round(4)
+            for spin in [Spin.up, Spin.down]
+        },
+        lattice=typical.lattice_rec,
+        efermi=0.0,
+        labels_dict={"\\Gamma": [0, 0, 0], "L": [0.5, 0.5, 0.5]},
+        structure=typical.structure * (2, 2, 1),
+        projections={
+            spin: rng.uniform(0, 1, (nbands, nkpoints, 9, nsites)).round(3)
+            for spin in [Spin.up, Spin.down]
+        },
+    )
+
+    for name, band_structure in [("typical", typical), ("large", large)]:
+        entry = BandStructureCalc.from_toolkit(band_structure=band_structure)
+        legacy_entry = BandStructureCalc(band_structure_data=band_structure.to_json())
+        print(
+            f"STORAGE {name}: {len(entry.band_structure_arrays)} characters "
+            f"vs {len(legacy_entry.band_structure_data)} as JSON"
+        )
+        run_benchmark(
+            f"to_toolkit_band_structure ({name}, JSON)",
+            legacy_entry.to_toolkit_band_structure,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"to_toolkit_band_structure ({name}, arrays)",
+            entry.to_toolkit_band_structure,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_band_diagram_html_div ({name}, JSON)",
+            legacy_entry.get_band_diagram_html_div,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_band_diagram_html_div ({name}, arrays)",
+            entry.get_band_diagram_html_div,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_bands ({name}, plot subset)",
+            entry.get_bands,
+            nrepeats=3,
+            energy_window=(-5, 5),
+            max_kpoints=200,
+        )
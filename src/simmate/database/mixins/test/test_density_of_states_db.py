@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy
+import pytest
+from pymatgen.electronic_structure.core import Orbital, Spin
+from pymatgen.electronic_structure.dos import CompleteDos, Dos
+from pymatgen.io.vasp.outputs import Vasprun
+
+from simmate.apps.materials_project import workflows as matproj_workflows
+from simmate.conftest import run_benchmark
+from simmate.database.workflow_results import DensityofStatesCalc
+
+
+@pytest.fixture(scope="module")
+def vasprun(tmp_path_factory):
+    # a spin-polarized density of states of Fe (301 energies)
+    directory = tmp_path_factory.mktemp("density_of_states")
+    shutil.unpack_archive(
+        Path(matproj_workflows.__file__).parent / "test" / "band_structure.zip",
+        extract_dir=directory,
+    )
+    return Vasprun(directory / "vasprun.xml")
+
+
+def assert_same_density_of_states(new, original):
+    new, original = new.as_dict(), original.as_dict()
+    new.pop("structure")  # the class is a simmate structure now
+    original.pop("structure")
+    assert new == original
+
+
+@pytest.mark.django_db
+def test_density_of_states_table(vasprun, tmp_path):
+    DensityofStatesCalc.show_columns()
+
+    original = vasprun.complete_dos
+    entry = DensityofStatesCalc.from_vasp_run(vasprun)
+    entry = DensityofStatesCalc.objects.get(id=entry.id)
+    assert entry.density_of_states_data is None
+    assert_same_density_of_states(entry.to_toolkit_density_of_states(), original)
+
+    # loading a single spin channel
+    dos = entry.get_densities(spin="down")
+    assert numpy.array_equal(dos["energies"], original.energies)
+    assert numpy.array_equal(dos["densities"], original.densities[Spin.down])
+    assert dos["efermi"] == original.efermi
+    with pytest.raises(ValueError):
+        entry.get_densities(spin="other")
+
+    # loading an energy window of a projection for plotting
+    element_dos = list(original.get_element_dos().values())[0]
+    dos = entry.get_densities(element="Fe", energy_window=(-5, 5), max_points=50)
+    in_window = (original.energies >= -5) & (original.energies <= 5)
+    assert len(dos["energies"]) <= 50
+    assert numpy.allclose(
+        dos["densities"],
+        element_dos.densities[Spin.up][in_window][:: -(-in_window.sum() // 50)],
+    )
+    with pytest.raises(ValueError):
+        entry.get_densities(element="Cl")
+
+    # plots use the subset above, and exports give pymatgen's JSON
+    entry.write_dos_diagram_plot(directory=tmp_path)
+    assert (tmp_path / "dos_diagram.png").exists()
+    exported = entry.to_api_dict()["density_of_states_arrays"]
+    assert_same_density_of_states(CompleteDos.from_dict(json.loads(exported)), original)
+
+    # older entries that used the JSON format
+    legacy_entry = DensityofStatesCalc.objects.create(
+        density_of_states_data=original.to_json()
+    )
+    assert_same_density_of_states(legacy_entry.to_toolkit_density_of_states(), original)
+    legacy_entry.write_dos_diagram_plot(directory=tmp_path)
+    assert DensityofStatesCalc.convert_density_of_states_data() == 1
+    assert DensityofStatesCalc.convert_density_of_states_data() == 0
+    legacy_entry.refresh_from_db()
+    assert legacy_entry.density_of_states_data is None
+    assert_same_density_of_states(legacy_entry.to_toolkit_density_of_states(), original)
+
+
+@pytest.mark.benchmark
+def test_density_of_states_benchmark(vasprun):
+    # compares the JSON format with the compressed arrays for the Fe density
+    # of states and for a larger one (3000 energies, 32 sites)
+    typical = vasprun.complete_dos
+
+    rng = numpy.random.default_rng(0)
+    nenergies = 3_000
+    structure = typical.structure * (2, 2, 2) * (2, 2, 1)
+    energies = numpy.linspace(-20, 10, nenergies).round(4)
+    spins = [Spin.up, Spin.down]
+    large = CompleteDos(
+        structure=structure,
+        total_dos=Dos(
+            efermi=0.0,
+            energies=energies,
+            densities={s: rng.uniform(0, 5, nenergies).round(4) for s in spins},
+        ),
+        pdoss={
+            site: {
+                orbital: {s: rng.uniform(0, 1, nenergies).round(4) for s in spins}
+                for orbital in list(Orbital)
+            }
+            for site in structure
+        },
+    )
+
+    for name, density_of_states in [("typical", typical), ("large", large)]:
+        entry = DensityofStatesCalc.from_toolkit(density_of_states=density_of_states)
+        legacy_entry = DensityofStatesCalc(
+            density_of_states_data=density_of_states.to_json()
+        )
+        print(
+            f"STORAGE {name}: {len(entry.density_of_states_arrays)} characters "
+            f"vs {len(legacy_entry.density_of_states_data)} as JSON"
+        )
+        run_benchmark(
+            f"to_toolkit_density_of_states ({name}, JSON)",
+            legacy_entry.to_toolkit_density_of_states,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"to_toolkit_density_of_states ({name}, arrays)",
+            entry.to_toolkit_density_of_states,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_dos_diagram_html_div ({name}, JSON)",
+            legacy_entry.get_dos_diagram_html_div,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_dos_diagram_html_div ({name}, arrays)",
+            entry.get_dos_diagram_html_div,
+            nrepeats=3,
+        )
+        run_benchmark(
+            f"get_densities ({name}, plot subset)",
+            entry.get_densities,
+            nrepeats=3,
+            energy_window=(-5, 5),
+            max_points=500,
+        )
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import uuid
+from types import SimpleNamespace
 
 import pytest
 from pandas import DataFrame
@@ -48,3 +49,44 @@ def test_static_energy_table(structure):
     structures = Dynamics.objects.to_toolkit()
     assert isinstance(structures, list)
     assert isinstance(structures[0], Structure)
+
+
+@pytest.mark.django_db
+def test_dynamics_update_from_vasp_run(sample_structures):
+    structure = sample_structures["NaCl_mp-22862_primitive"]
+    ionic_steps = [dict(e_wo_entrp=-1.0, forces=[[0.1, 0.0, 0.0]] * len(structure))] * 5
+
+    # mimics the parts of a Vasprun that are used to load ionic steps
+    vasprun = SimpleNamespace(
+        structures=[structure.copy() for _ in range(5)],
+        as_dict=lambda: {"output": {"ionic_steps": ionic_steps}},
+    )
+
+    dynamics = Dynamics.from_run_context(
+        run_id=uuid.uuid4(),
+        workflow_name="example.test.workflow",
+        workflow_version="1.2.3",
+        structure=vasprun.structures[0],
+        temperature_start=300,
+        temperature_end=800,
+        nsteps=5,
+    )
+    dynamics.save()
+    dynamics.update_from_vasp_run(vasprun)
+
+    ionic_steps = dynamics.structures.order_by("number")
+    assert list(ionic_steps.values_list("temperature", flat=True)) == [
+        300,
+        400,
+        500,
+        600,
+        700,
+    ]
+    spacegroups = list(ionic_steps.values_list("spacegroup_id", flat=True))
+    # dynamics runs skip symmetry analysis for intermediate steps by default
+    assert spacegroups == [225, None, None, None, 225]
+
+    # and they can be filled in afterwards
+    ionic_steps.model.update_spacegroups()
+    spacegroups = list(ionic_steps.values_list("spacegroup_id", flat=True))
+    assert spacegroups == [225] * 5
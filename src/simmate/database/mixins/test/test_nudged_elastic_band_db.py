@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+import numpy
+import pytest
+
+from simmate.conftest import run_benchmark
+from simmate.database.workflow_results import (
+    DistinctPathSearch,
+    MigrationHop,
+    MigrationImage,
+)
+from simmate.toolkit.diffusion import (
+    DistinctPathFinder,
+    MigrationImages,
+    write_migration_hops,
+)
+
+
+def get_fake_neb_results(structure, migrating_specie: str) -> SimpleNamespace:
+    # mimics the NEBAnalysis object returned by our Vasprun for NEB runs
+    images = MigrationImages.from_structure(structure, migrating_specie)[0]
+    nimages = len(images)
+    return SimpleNamespace(
+        structures=list(images),
+        energies=numpy.linspace(-10, -9, nimages).tolist(),
+        forces=numpy.linspace(0, 0.1, nimages).tolist(),
+        r=numpy.linspace(0, 2, nimages).tolist(),
+    )
+
+
+@pytest.mark.django_db
+def test_distinct_path_search(sample_structures, mocker, tmp_path):
+    DistinctPathSearch.show_columns()
+
+    for name, migrating_specie in [
+        ("Y2CI2_mp-1206803_primitive", "I"),
+        ("Al2O3_mp-1143_primitive", "O"),
+    ]:
+        structure = sample_structures[name]
+        expected = DistinctPathFinder(structure, migrating_specie).get_paths()
+
+        hops = DistinctPathSearch.get_paths(structure, migrating_specie)
+        assert DistinctPathSearch.objects.count() == 1
+        assert hops == expected
+
+        # a second search is loaded from the table
+        search = mocker.spy(DistinctPathSearch, "to_migration_hops")
+        cached_hops = DistinctPathSearch.get_paths(structure, migrating_specie)
+        assert search.call_count == 1
+        assert DistinctPathSearch.objects.count() == 1
+        assert len(cached_hops) == len(expected)
+        for hop, expected_hop in zip(cached_hops, expected):
+            assert hop == expected_hop
+            assert hop.length == pytest.approx(expected_hop.length)
+            assert (hop.iindex, hop.eindex) == (
+                expected_hop.iindex,
+                expected_hop.eindex,
+            )
+
+        # ...even when the sites are given in a different order or differ by
+        # rounding, where the hops use the exact sites of the given structure
+        shuffled = structure.get_sorted_structure(key=lambda s: -s.frac_coords[0])
+        shuffled.translate_sites(range(len(shuffled)), [1e-6, 0, 0])
+        shuffled_hops = DistinctPathSearch.get_paths(shuffled, migrating_specie)
+        assert shuffled_hops == expected
+        assert search.call_count == 2
+        for hop in shuffled_hops:
+            for site in [hop.isite, hop.esite]:
+                shifts = shuffled.frac_coords - site.frac_coords
+                assert numpy.abs(shifts - numpy.round(shifts)).sum(axis=1).min() < 1e-9
+        mocker.stopall()
+
+        # other search parameters are a new search
+        DistinctPathSearch.get_paths(structure, migrating_specie, max_path_length=5)
+        assert DistinctPathSearch.objects.count() == 2
+        DistinctPathSearch.objects.all().delete()
+
+    write_migration_hops(cached_hops, tmp_path)
+    assert (tmp_path / "all_migration_hops.cif").exists()
+    assert (tmp_path / "migration_hop_00.cif").exists()
+
+
+@pytest.mark.django_db
+def test_migration_hop_update_from_neb_toolkit(sample_structures):
+    neb_results = get_fake_neb_results(
+        sample_structures["Y2CI2_mp-1206803_primitive"], "I"
+    )
+    nimages = len(neb_results.structures)
+
+    hop = MigrationHop.from_neb_toolkit(neb_results)
+    images = hop.migration_images.order_by("number")
+    assert list(images.values_list("number", flat=True)) == list(range(nimages))
+    assert list(images.values_list("energy", flat=True)) == neb_results.energies
+    assert images.to_toolkit() == neb_results.structures
+
+    assert not images.filter(spacegroup__isnull=True).exists()
+
+    # when deferred, symmetry analysis is only done for the start and end images
+    hop_2 = MigrationHop.objects.create()
+    hop_2.update_from_neb_toolkit(neb_results, defer_spacegroups=True)
+    images = hop_2.migration_images.order_by("number")
+    spacegroups = list(images.values_list("spacegroup_id", flat=True))
+    assert spacegroups[0] and spacegroups[-1]
+    assert set(spacegroups[1:-1]) == {None}
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_distinct_path_search_benchmark(sample_structures):
+    # compares finding the paths of several host structures with and without
+    # the results of a previous search, as well as saving NEB images one at a
+    # time vs in bulk
+    hosts = [
+        (sample_structures["Y2CI2_mp-1206803_primitive"] * (2, 2, 2), "I"),
+        (sample_structures["NaCl_mp-22862_primitive"] * (2, 2, 2), "Na"),
+        (sample_structures["Al2O3_mp-1143_primitive"] * (2, 2, 2), "O"),
+        (sample_structures["MgSiO3_mp-4321_primitive"] * (2, 2, 2), "Mg"),
+    ]
+
+    def find_paths():
+        for structure, migrating_specie in hosts:
+            DistinctPathFinder(structure, migrating_specie).get_paths()
+
+    def search_paths():
+        for structure, migrating_specie in hosts:
+            DistinctPathSearch.get_paths(structure, migrating_specie)
+
+    search_paths()  # fills the table
+    run_benchmark("DistinctPathFinder", find_paths, nrepeats=3, nitems=len(hosts))
+    run_benchmark(
+        "DistinctPathSearch (rerun)", search_paths, nrepeats=3, nitems=len(hosts)
+    )
+
+    neb_results = get_fake_neb_results(
+        sample_structures["Y2CI2_mp-1206803_primitive"], "I"
+    )
+    hop = MigrationHop.objects.create()
+
+    def save_one_at_a_time():
+        for number, image in enumerate(neb_results.structures):
+            MigrationImage.from_toolkit(
+                structure=image,
+                number=number,
+                energy=neb_results.energies[number],
+                migration_hop_id=hop.id,
+            ).save()
+
+    nimages = len(neb_results.structures)
+    run_benchmark(
+        "save images (one at a time)", save_one_at_a_time, nrepeats=3, nitems=nimages
+    )
+    run_benchmark(
+        "save images (update_from_neb_toolkit)",
+        hop.update_from_neb_toolkit,
+        nrepeats=3,
+        nitems=nimages,
+        neb_results=neb_results,
+    )
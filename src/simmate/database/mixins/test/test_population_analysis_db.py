@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+import pytest
+from django.db.models import Avg
+
+from simmate.conftest import run_benchmark
+from simmate.database.mixins import PopulationAnalysis, PopulationAnalysisSite
+
+
+def make_population_analyses(nentries: int, nsites: int) -> list:
+    # Note, we can't use bulk_create because this table inherits from the
+    # StaticEnergy table
+    rng = numpy.random.default_rng(0)
+    return [
+        PopulationAnalysis.objects.create(
+            element_list=["Na", "Cl"] * (nsites // 2),
+            oxidation_states=rng.uniform(-1, 1, nsites).round(3).tolist(),
+            charges=rng.uniform(0, 8, nsites).round(3).tolist(),
+            min_dists=rng.uniform(0.5, 2, nsites).round(3).tolist(),
+            atomic_volumes=rng.uniform(5, 30, nsites).round(3).tolist(),
+        )
+        for _ in range(nentries)
+    ]
+
+
+@pytest.mark.django_db
+def test_population_analysis_sites():
+    PopulationAnalysis.show_columns()
+    PopulationAnalysisSite.show_columns()
+
+    analysis, legacy_analysis = make_population_analyses(nentries=2, nsites=4)
+    analysis.update_sites()
+    analysis.update_sites()  # old sites are replaced
+    sites = analysis.sites.order_by("number")
+    assert list(sites.values_list("element", flat=True)) == ["Na", "Cl", "Na", "Cl"]
+    assert list(sites.values_list("charge", flat=True)) == analysis.charges
+
+    # entries saved before the site table existed are backfilled
+    assert PopulationAnalysis.update_all_sites() == 1
+    assert PopulationAnalysis.update_all_sites() == 0
+    assert legacy_analysis.sites.count() == 4
+
+    # site-level searches and aggregation
+    max_charge = max(analysis.charges + legacy_analysis.charges)
+    assert (
+        PopulationAnalysis.objects.filter(sites__charge__gte=max_charge)
+        .distinct()
+        .count()
+        == 1
+    )
+    averages = dict(
+        PopulationAnalysisSite.objects.values("element")
+        .annotate(average=Avg("oxidation_state"))
+        .values_list("element", "average")
+    )
+    expected = numpy.mean(
+        analysis.oxidation_states[::2] + legacy_analysis.oxidation_states[::2]
+    )
+    assert averages["Na"] == pytest.approx(expected)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_population_analysis_sites_benchmark():
+    nentries, nsites, cutoff = 5_000, 10, 7.9
+    make_population_analyses(nentries, nsites)
+    run_benchmark(
+        "update_all_sites",
+        PopulationAnalysis.update_all_sites,
+        nrepeats=1,
+        nitems=nentries,
+    )
+
+    def search_json_lists():
+        # what was required before the site table
+        return [
+            id
+            for id, charges in PopulationAnalysis.objects.values_list("id", "charges")
+            if any(charge > cutoff for charge in charges)
+        ]
+
+    def search_sites():
+        return list(
+            PopulationAnalysis.objects.filter(sites__charge__gt=cutoff)
+            .distinct()
+            .values_list("id", flat=True)
+        )
+
+    assert sorted(search_sites()) == sorted(search_json_lists())
+    run_benchmark("site search (json lists)", search_json_lists, nitems=nentries)
+    run_benchmark("site search (site table)", search_sites, nitems=nentries)
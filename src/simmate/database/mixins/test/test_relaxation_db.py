@@ -5,6 +5,7 @@ import uuid
 import pytest
 from pandas import DataFrame
 
+from simmate.conftest import run_benchmark
 from simmate.database.mixins import IonicStep, Relaxation
 from simmate.toolkit import Structure
 
@@ -48,3 +49,102 @@ def test_relaxation_table(structure):
     structures = Relaxation.objects.to_toolkit()
     assert isinstance(structures, list)
     assert isinstance(structures[0], Structure)
+
+
+class FakeVasprun:
+    # mimics the parts of a Vasprun that are used to load ionic steps
+    def __init__(self, structures: list[Structure]):
+        self.structures = structures
+
+    def as_dict(self) -> dict:
+        ionic_steps = [
+            dict(
+                e_wo_entrp=-1.0 - 0.01 * number,
+                forces=[[0.1, 0.0, 0.0]] * len(structure),
+                stress=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+            )
+            for number, structure in enumerate(self.structures)
+        ]
+        return {"output": {"ionic_steps": ionic_steps}}
+
+
+def get_fake_vasprun(structure: Structure, nsteps: int) -> FakeVasprun:
+    structures = []
+    for number in range(nsteps):
+        step = structure.copy()
+        step.scale_lattice(structure.volume * (1 + 0.001 * number))
+        structures.append(step)
+    return FakeVasprun(structures)
+
+
+@pytest.mark.django_db
+def test_relaxation_update_from_vasp_run(sample_structures):
+    vasprun = get_fake_vasprun(sample_structures["NaCl_mp-22862_primitive"], 5)
+
+    relaxation = Relaxation.from_run_context(
+        run_id=uuid.uuid4(),
+        workflow_name="example.test.workflow",
+        workflow_version="1.2.3",
+        structure=vasprun.structures[0],
+    )
+    relaxation.save()
+    relaxation.update_from_vasp_run(vasprun, defer_spacegroups=True)
+
+    ionic_steps = relaxation.structures.order_by("number")
+    assert list(ionic_steps.values_list("number", flat=True)) == [0, 1, 2, 3, 4]
+    assert relaxation.structure_start_id == ionic_steps[0].id
+    assert relaxation.structure_final == ionic_steps[4]
+    assert relaxation.energy == pytest.approx(-1.04)
+    assert ionic_steps[2].site_force_norm_max == pytest.approx(0.1)
+
+    # only the first and last steps have symmetry analysis when deferred
+    spacegroups = list(ionic_steps.values_list("spacegroup_id", flat=True))
+    assert spacegroups == [225, None, None, None, 225]
+    IonicStep.update_spacegroups()
+    assert set(ionic_steps.values_list("spacegroup_id", flat=True)) == {225}
+
+    # runs that didn't finish an ionic step are left as-is
+    empty_run = Relaxation.from_run_context(
+        run_id=uuid.uuid4(),
+        workflow_name="example.test.workflow",
+        workflow_version="1.2.3",
+        structure=vasprun.structures[0],
+    )
+    empty_run.save()
+    empty_run.update_from_vasp_run(get_fake_vasprun(vasprun.structures[0], 0))
+    assert not empty_run.structures.exists()
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_relaxation_update_from_vasp_run_benchmark(sample_structures):
+    nsteps = 1_000
+    vasprun = get_fake_vasprun(sample_structures["Fe_mp-13_primitive"], nsteps)
+    relaxation = Relaxation.from_toolkit(structure=vasprun.structures[0])
+    relaxation.save()
+
+    def save_each_step():
+        # this is what update_from_vasp_run did before
+        data = vasprun.as_dict()["output"]
+        for number, (structure, ionic_step) in enumerate(
+            zip(vasprun.structures, data["ionic_steps"])
+        ):
+            IonicStep.from_toolkit(
+                number=number,
+                structure=structure,
+                energy=ionic_step["e_wo_entrp"],
+                site_forces=ionic_step["forces"],
+                lattice_stress=ionic_step["stress"],
+                relaxation=relaxation,
+            ).save()
+
+    run_benchmark("save each ionic step", save_each_step, nrepeats=3, nitems=nsteps)
+    for defer_spacegroups in [False, True]:
+        run_benchmark(
+            f"update_from_vasp_run (defer_spacegroups={defer_spacegroups})",
+            relaxation.update_from_vasp_run,
+            nrepeats=3,
+            nitems=nsteps,
+            vasprun=vasprun,
+            defer_spacegroups=defer_spacegroups,
+        )
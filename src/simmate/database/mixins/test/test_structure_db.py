@@ -3,6 +3,8 @@
 import pytest
 from pandas import DataFrame
 
+from simmate.config import settings
+from simmate.conftest import run_benchmark
 from simmate.toolkit import Structure
 from simmate.website.test_app.models import TestStructure
 
@@ -45,3 +47,392 @@ def test_structure_archives(tmp_path):
         filename=archive_filename,
         delete_on_completion=True,
     )
+
+
+@pytest.mark.django_db
+def test_structure_to_toolkit_batched(sample_structures):
+    for structure in sample_structures.values():
+        TestStructure.from_toolkit(structure=structure).save()
+    search = TestStructure.objects.order_by("id")
+    expected = search.to_toolkit()
+
+    structures = search.to_toolkit(batch_size=4)
+    assert structures == expected
+
+    structures = search.to_toolkit(
+        batch_size=4, parallel=True, max_workers=2, lazy=True
+    )
+    assert not isinstance(structures, list)
+    assert list(structures) == expected
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_structure_to_toolkit_benchmark(sample_structures):
+    nrows = 5_000
+    structures = list(sample_structures.values())
+    TestStructure.objects.bulk_create(
+        [
+            TestStructure.from_toolkit(structure=structures[i % len(structures)])
+            for i in range(nrows)
+        ]
+    )
+    for kwargs in [
+        {},
+        {"batch_size": 1_000},
+        {"batch_size": 1_000, "parallel": True},
+    ]:
+        run_benchmark(
+            f"to_toolkit ({kwargs})",
+            TestStructure.objects.to_toolkit,
+            nrepeats=3,
+            nitems=nrows,
+            **kwargs,
+        )
+
+
+def test_structure_from_toolkit_many(sample_structures):
+    structures = list(sample_structures.values()) * 2
+    entries = [dict(structure=s) for s in structures] + [dict(structure=None)]
+    expected = [TestStructure.from_toolkit(**entry, as_dict=True) for entry in entries]
+
+    structures_db = TestStructure.from_toolkit_many(entries, as_dict=True)
+    assert structures_db == expected
+
+    structures_db = TestStructure.from_toolkit_many(
+        entries[:4], parallel=True, max_workers=2
+    )
+    assert all(isinstance(s, TestStructure) for s in structures_db)
+    assert [s.formula_full for s in structures_db] == [
+        e["formula_full"] for e in expected[:4]
+    ]
+
+
+@pytest.mark.benchmark
+def test_structure_from_toolkit_many_benchmark(sample_structures):
+    nrows = 2_000
+    structures = list(sample_structures.values())
+    entries = [dict(structure=structures[i % len(structures)]) for i in range(nrows)]
+
+    run_benchmark(
+        "from_toolkit (loop)",
+        lambda: [TestStructure.from_toolkit(**entry) for entry in entries],
+        nrepeats=3,
+        nitems=nrows,
+    )
+    for kwargs in [{}, {"parallel": True}]:
+        run_benchmark(
+            f"from_toolkit_many ({kwargs})",
+            TestStructure.from_toolkit_many,
+            nrepeats=3,
+            nitems=nrows,
+            entries=entries,
+            **kwargs,
+        )
+
+
+@pytest.mark.django_db
+def test_structure_filter_similarity(sample_structures, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "config_directory", tmp_path)
+
+    structure = sample_structures["C_mp-48_primitive"]
+    TestStructure.objects.all().delete()
+    TestStructure.objects.bulk_create(
+        TestStructure.from_toolkit_many(
+            [dict(structure=s) for s in [structure, structure.copy(), None]]
+            + [
+                dict(structure=sample_structures[n])
+                for n in ["C_mp-66_primitive", "Fe_mp-13_primitive"]
+            ]
+        )
+    )
+    assert TestStructure.update_fingerprints() == 4
+    assert TestStructure.update_fingerprints() == 0  # nothing new
+    assert len(TestStructure.get_fingerprint_index("cosine")) == 4
+
+    for method in ["L2", "cosine"]:
+        results = TestStructure.objects.filter_similarity(structure, method=method)
+        assert results.count() == 4
+        assert results[0].formula_full == "C4"
+        assert results[0].fingerprint_distance == pytest.approx(0, abs=1e-5)
+        distances = [r.fingerprint_distance for r in results]
+        assert distances == sorted(distances)
+
+    results = TestStructure.objects.filter_similarity(structure, cutoff=0.01)
+    assert results.count() == 2
+    results = TestStructure.objects.filter(id=results[0].id).filter_similarity(
+        structure, limit=2
+    )
+    assert results.count() == 1
+
+
+@pytest.mark.django_db
+def test_structure_convert_format(sample_structures):
+    structures = list(sample_structures.values())[:5]
+    TestStructure.objects.all().delete()
+    TestStructure.objects.bulk_create(
+        TestStructure.from_toolkit_many([dict(structure=s) for s in structures])
+    )
+    # mimic rows written before the binary format existed
+    for row, structure in zip(TestStructure.objects.order_by("id"), structures):
+        row.structure = structure.to(fmt="POSCAR")
+        row.save()
+
+    assert TestStructure.convert_structure_format(batch_size=2) == 5
+    assert TestStructure.convert_structure_format() == 0  # nothing left
+    search = TestStructure.objects.order_by("id")
+    assert all(s.startswith("@") for s in search.values_list("structure", flat=True))
+    assert search.to_toolkit() == structures
+
+
+@pytest.mark.django_db
+def test_structure_update_spacegroups(sample_structures):
+    structures = list(sample_structures.values())[:6]
+    expected = TestStructure.from_toolkit_many(
+        [dict(structure=s) for s in structures], as_dict=True
+    )
+
+    TestStructure.objects.all().delete()
+    entries = [dict(structure=s) for s in structures + [structures[0].copy()]]
+    TestStructure.objects.bulk_create(
+        TestStructure.from_toolkit_many(entries, defer_spacegroup=True)
+        + [TestStructure.from_toolkit(structure=structures[1], defer_spacegroup=True)]
+    )
+    assert TestStructure.objects.filter(spacegroup__isnull=True).count() == 8
+
+    assert TestStructure.update_spacegroups(batch_size=3) == 8
+    assert TestStructure.update_spacegroups() == 0  # nothing left
+    spacegroups = list(
+        TestStructure.objects.order_by("id").values_list("spacegroup_id", flat=True)
+    )
+    assert spacegroups[:6] == [e["spacegroup_id"] for e in expected]
+    assert spacegroups[6] == spacegroups[0]
+    assert spacegroups[7] == spacegroups[1]
+
+
+def _make_chemical_system_rows(systems: list[list[str]]) -> list[TestStructure]:
+    from simmate.database.mixins.structure import get_element_bits
+
+    rows = []
+    for elements in systems:
+        elements = sorted(elements)
+        bits_1, bits_2 = get_element_bits(elements)
+        rows.append(
+            TestStructure(
+                elements=elements,
+                nelements=len(elements),
+                chemical_system="-".join(elements),
+                element_bits_1=bits_1,
+                element_bits_2=bits_2,
+            )
+        )
+    return rows
+
+
+@pytest.mark.django_db
+def test_structure_filter_chemical_system(sample_structures):
+    from simmate.database.mixins.structure import get_element_bits
+    from simmate.utils import get_chemical_subsystems
+
+    # saving from the toolkit fills the bit columns
+    structure = sample_structures["SiO2_mp-7029_primitive"]
+    entry = TestStructure.from_toolkit(structure=structure, as_dict=True)
+    assert (entry["element_bits_1"], entry["element_bits_2"]) == (
+        get_element_bits(["O", "Si"])
+    )
+    assert get_element_bits(["O", "Si"]) == ((1 << 7) | (1 << 13), 0)
+
+    # includes elements from both bit columns (H, Pr, Nd, U, Og)
+    systems = [
+        ["H"],
+        ["C"],
+        ["Y", "C"],
+        ["Y", "C", "F"],
+        ["Y", "C", "F", "Br"],
+        ["C", "F", "Pr"],
+        ["C", "Nd"],
+        ["Y", "C", "F", "U"],
+        ["U"],
+        ["Og", "H"],
+        ["Sc", "Y", "C", "F", "Nd"],
+    ]
+    TestStructure.objects.bulk_create(_make_chemical_system_rows(systems))
+
+    def search(query, **kwargs):
+        return set(
+            TestStructure.objects.filter_chemical_system(query, **kwargs).values_list(
+                "chemical_system", flat=True
+            )
+        )
+
+    all_systems = {"-".join(sorted(s)) for s in systems}
+    for query in ["Y-C-F", "C-F-Y-U", "Nd-C", "H-Og", "Pr-C-F-Nd", "Br"]:
+        elements = set(query.split("-"))
+        subsystems = set(get_chemical_subsystems(query)) & all_systems
+        supersystems = {s for s in all_systems if elements <= set(s.split("-"))}
+        exact = {"-".join(sorted(elements))} & all_systems
+        assert search(query) == exact
+        assert search(query, include_subsystems=True) == subsystems
+        assert search(query, include_supersystems=True) == supersystems
+        assert (
+            search(query, include_subsystems=True, include_supersystems=True)
+            == subsystems | supersystems
+        )
+
+    # unknown symbols (e.g. from a search form) give no results
+    assert not search("Xx-O", include_subsystems=True)
+    assert not search("Xx-O", include_supersystems=True)
+
+    # the filter is used by filter_from_config, with extra kwargs given
+    # either alongside the value or within a dict
+    for filters in [
+        dict(chemical_system="C-Y-F", include_subsystems=True),
+        dict(chemical_system={"chemical_system": "C-Y-F", "include_subsystems": True}),
+    ]:
+        results = TestStructure.filter_from_config(filters=filters, paginate=False)
+        assert set(results.values_list("chemical_system", flat=True)) == (
+            set(get_chemical_subsystems("Y-C-F")) & all_systems
+        )
+
+
+@pytest.mark.django_db
+def test_structure_update_element_bits():
+    from simmate.database.mixins.structure import get_element_bits
+
+    systems = [["Y", "C", "F"], ["C", "Nd"], ["Y", "C", "F"], ["U"]]
+    rows = _make_chemical_system_rows(systems)
+    for row in rows:
+        row.element_bits_1 = row.element_bits_2 = None
+    TestStructure.objects.bulk_create(rows)
+
+    assert TestStructure.update_element_bits(batch_size=3) == 4
+    assert TestStructure.update_element_bits() == 0  # nothing left
+    for elements, bits_1, bits_2 in TestStructure.objects.values_list(
+        "elements", "element_bits_1", "element_bits_2"
+    ):
+        assert (bits_1, bits_2) == get_element_bits(elements)
+
+
+@pytest.mark.django_db
+def test_structure_element_bits_migration():
+    import importlib
+
+    from django.apps import apps
+
+    migration = importlib.import_module(
+        "simmate.apps.materials_project.migrations.0004_element_bits"
+    )
+
+    rows = _make_chemical_system_rows([["Y", "C", "F"], ["C", "Y"], ["Nd"]])
+    for row in rows:
+        row.element_bits_1 = row.element_bits_2 = None
+    ids = [row.id for row in TestStructure.objects.bulk_create(rows)]
+    search = TestStructure.objects.filter(id__in=ids).filter_chemical_system(
+        "Y-C-F", include_subsystems=True
+    )
+    assert not search.exists()  # rows without bits can't be found
+
+    migration.backfill_element_bits(apps, schema_editor=None, app_label="test_app")
+    assert search.count() == 2
+    assert not TestStructure.objects.filter(element_bits_1__isnull=True).exists()
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_structure_filter_chemical_system_benchmark():
+    import random
+
+    from simmate.utils import get_chemical_subsystems
+
+    # compares subsystem searches on high-element-count systems using the
+    # full list of subsystems vs the element bit columns
+    random.seed(0)
+    elements = [
+        "H", "Li", "C", "N", "O", "F", "Na", "Mg", "Al", "Si", "P", "S", "Cl",
+        "K", "Ca", "Sc", "Ti", "Fe", "Y", "Zr", "Nb", "La", "Nd", "U",
+    ]  # fmt: skip
+    nrows = 20_000
+    systems = [random.sample(elements, random.randint(1, 5)) for _ in range(nrows)]
+    TestStructure.objects.bulk_create(_make_chemical_system_rows(systems))
+
+    def search_list(query):
+        return list(
+            TestStructure.objects.filter(
+                chemical_system__in=get_chemical_subsystems(query)
+            ).values_list("id", flat=True)
+        )
+
+    def search_bits(query):
+        return list(
+            TestStructure.objects.filter_chemical_system(
+                query, include_subsystems=True
+            ).values_list("id", flat=True)
+        )
+
+    for nelements in [4, 8, 10, 12]:
+        query = "-".join(elements[:nelements])
+        assert sorted(search_list(query)) == sorted(search_bits(query))
+        for method in [search_list, search_bits]:
+            run_benchmark(
+                f"{method.__name__} ({nelements} elements)",
+                method,
+                nrepeats=3,
+                query=query,
+            )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_structure_update_spacegroups_benchmark(sample_structures):
+    # compares loading rows with symmetry analysis inline vs deferred, where
+    # the deferred rows then have their spacegroups filled by the batch job
+    nrows = 2_000
+    structures = list(sample_structures.values())
+    entries = [dict(structure=structures[i % len(structures)]) for i in range(nrows)]
+
+    def load(defer_spacegroup: bool):
+        TestStructure.objects.all().delete()
+        TestStructure.objects.bulk_create(
+            TestStructure.from_toolkit_many(entries, defer_spacegroup=defer_spacegroup)
+        )
+
+    def load_then_update():
+        load(defer_spacegroup=True)
+        TestStructure.update_spacegroups()
+
+    for defer_spacegroup in [False, True]:
+        run_benchmark(
+            f"load (defer_spacegroup={defer_spacegroup})",
+            load,
+            nrepeats=3,
+            nitems=nrows,
+            defer_spacegroup=defer_spacegroup,
+        )
+    run_benchmark(
+        "load + update_spacegroups",
+        load_then_update,
+        nrepeats=3,
+        nitems=nrows,
+    )
+
+
+@pytest.mark.django_db
+def test_structure_export_as_text(sample_structures):
+    structure = sample_structures["C_mp-48_primitive"]
+    entry = TestStructure.from_toolkit(structure=structure)
+    entry.save()
+    assert entry.structure.startswith("@")
+
+    # users get a POSCAR rather than our binary format
+    api_structure = entry.to_api_dict()["structure"]
+    assert Structure.from_str(api_structure, fmt="poscar") == structure
+    search = TestStructure.objects.filter(id=entry.id)
+    df = search.to_dataframe(columns=["structure"], export_values=True)
+    assert df["structure"][0] == api_structure
+    batch = next(search.to_arrow_batches(columns=["structure"], export_values=True))
+    assert batch.column(0)[0].as_py() == api_structure
+    assert b"direct" in search.to_csv_response().content  # from the POSCAR
+
+    # bulk exports keep the stored value by default
+    df = search.to_dataframe(columns=["structure"], stream=True)
+    assert df["structure"][0] == entry.structure
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import numpy
 import pytest
 
+from simmate.conftest import run_benchmark
+from simmate.toolkit import Composition
 from simmate.website.test_app.models import TestThermodynamics
 
 
@@ -39,3 +42,123 @@ def test_thermo_table(structure, tmp_path):
         archive_filename,
         delete_on_completion=True,
     )
+
+
+def _make_hull_entries(elements: list[str], nentries: int, seed: int = 0) -> list:
+    # random compositions (and energies) across all subsystems of the elements
+    rng = numpy.random.default_rng(seed)
+    entries = [
+        TestThermodynamics(
+            chemical_system=element,
+            formula_full=f"{element}1",
+            energy=-rng.uniform(1, 2),
+        )
+        for element in elements
+    ]
+    for _ in range(nentries):
+        amounts = rng.integers(0, 4, len(elements))
+        if not amounts.any():
+            continue
+        composition = Composition(dict(zip(elements, amounts.tolist())))
+        entries.append(
+            TestThermodynamics(
+                chemical_system=composition.chemical_system,
+                formula_full=composition.formula,
+                energy=-composition.num_atoms * rng.uniform(1, 2.5),
+            )
+        )
+    return entries
+
+
+def _get_hull_columns() -> list:
+    return list(
+        TestThermodynamics.objects.order_by("id").values_list(
+            "energy_above_hull",
+            "is_stable",
+            "formation_energy",
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_update_all_stabilities():
+    TestThermodynamics.objects.all().delete()
+    TestThermodynamics.objects.bulk_create(
+        _make_hull_entries(["Y", "C", "F", "O"], nentries=150)
+    )
+
+    # the full phase diagram gives the reference values for every entry
+    TestThermodynamics.update_chemical_system_stabilities("C-F-O-Y")
+    expected = _get_hull_columns()
+    TestThermodynamics.objects.update(energy_above_hull=None, is_stable=None)
+
+    TestThermodynamics.update_all_stabilities()
+    results = _get_hull_columns()
+    for result, expected_result in zip(results, expected):
+        assert result == pytest.approx(expected_result, abs=1e-8)
+    assert any(is_stable for _, is_stable, _ in results)
+
+    TestThermodynamics.objects.update(energy_above_hull=None, is_stable=None)
+    TestThermodynamics.update_all_stabilities(parallel=True, max_workers=2)
+    assert _get_hull_columns() == results
+
+    # adding a very stable entry should update systems that contain it
+    TestThermodynamics.objects.bulk_create(
+        [
+            TestThermodynamics(
+                chemical_system="C-O",
+                formula_full="C1 O2",
+                energy=-100,
+            )
+        ]
+    )
+    TestThermodynamics.update_all_stabilities(new_only=True)
+    TestThermodynamics.update_chemical_system_stabilities("C-F-O-Y")
+    expected = _get_hull_columns()
+    TestThermodynamics.update_all_stabilities(new_only=True)  # nothing to do
+    for result, expected_result in zip(_get_hull_columns(), expected):
+        assert result == pytest.approx(expected_result, abs=1e-8)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_update_all_stabilities_benchmark():
+    TestThermodynamics.objects.all().delete()
+    TestThermodynamics.objects.bulk_create(
+        _make_hull_entries(["Y", "C", "F", "O", "N", "Li"], nentries=3_000)
+    )
+    nentries = TestThermodynamics.objects.count()
+    chemical_systems = TestThermodynamics.objects.values_list(
+        "chemical_system", flat=True
+    ).distinct()
+
+    def update_each_system():
+        # this is what update_all_stabilities did before
+        for chemical_system in chemical_systems:
+            TestThermodynamics.update_chemical_system_stabilities(chemical_system)
+
+    run_benchmark(
+        "one phase diagram per system",
+        update_each_system,
+        nrepeats=1,
+        nitems=nentries,
+    )
+    run_benchmark(
+        "update_all_stabilities",
+        TestThermodynamics.update_all_stabilities,
+        nrepeats=3,
+        nitems=nentries,
+    )
+
+    def add_entry_and_update():
+        TestThermodynamics.objects.bulk_create(
+            _make_hull_entries(["C", "O"], nentries=1, seed=1)[-1:]
+        )
+        TestThermodynamics.update_all_stabilities(new_only=True)
+
+    run_benchmark(
+        "update_all_stabilities (new_only, 1 new entry)",
+        add_entry_and_update,
+        nrepeats=3,
+        nitems=nentries,
+    )
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+import pytest
+
+from simmate.website.test_app.models import TestStructure
+
+
+@pytest.fixture
+def workflow_columns(monkeypatch):
+    # a fake workflow that gives a value for each input structure
+    calls = []
+
+    def run(molecules, compress_output):
+        calls.append(len(molecules))
+        return [float(len(molecule)) for molecule in molecules]
+
+    workflow = SimpleNamespace(parameter_names=["molecules"], run=run)
+    monkeypatch.setattr(
+        "simmate.workflows.utils.get_workflow",
+        lambda workflow_name: workflow,
+    )
+    monkeypatch.setattr(
+        TestStructure,
+        "workflow_columns",
+        {
+            "density": "example.fake.workflow",
+            "density_atomic": {
+                "workflow_name": "example.fake.workflow",
+                "depends_on": ["volume"],
+            },
+            "volume": "example.fake.workflow",
+        },
+    )
+    return calls
+
+
+def test_workflow_column_stages(workflow_columns, monkeypatch):
+    assert TestStructure._get_workflow_column_stages() == [
+        ["density", "volume"],
+        ["density_atomic"],
+    ]
+
+    monkeypatch.setitem(
+        TestStructure.workflow_columns,
+        "volume",
+        {"workflow_name": "example.fake.workflow", "depends_on": ["density_atomic"]},
+    )
+    with pytest.raises(Exception, match="circular"):
+        TestStructure._get_workflow_column_stages()
+
+
+@pytest.mark.django_db
+def test_populate_workflow_columns(workflow_columns, sample_structures):
+    TestStructure.objects.all().delete()
+    TestStructure.objects.bulk_create(
+        TestStructure.from_toolkit_many(
+            [dict(structure=s) for s in sample_structures.values()]
+        )
+    )
+    nrows = TestStructure.objects.count()
+    TestStructure.objects.update(density=None, density_atomic=None, volume=None)
+    skipped_ids = list(TestStructure.objects.values_list("id", flat=True)[:2])
+    TestStructure.objects.filter(id__in=skipped_ids).update(volume=-1)
+    TestStructure.objects.filter(id=skipped_ids[0]).update(is_invalid_structure=False)
+
+    # rows that are already populated are skipped
+    nupdated = TestStructure.populate_workflow_columns(batch_size=4)
+    assert nupdated == nrows * 3 - 2
+    assert sum(workflow_columns) == nupdated
+
+    for structure_db in TestStructure.objects.all():
+        assert structure_db.density == structure_db.nsites
+        assert structure_db.density_atomic == structure_db.nsites
+        if structure_db.id not in skipped_ids:
+            assert structure_db.volume == structure_db.nsites
+
+    assert TestStructure.populate_workflow_column("volume") == 0
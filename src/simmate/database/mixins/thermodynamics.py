@@ -10,6 +10,7 @@ from simmate.toolkit.visualization.plotting import PlotlyFigure
 from simmate.utils import get_chemical_subsystems
 
 from ..core import DatabaseTable, table_column
+from ..core.search_results import convert_in_batches
 
 # BUG: This prints a tqdm error so we silence it here.
 with warnings.catch_warnings(record=True):
@@ -157,23 +158,139 @@ class Thermodynamics(DatabaseTable):
         )
 
     @classmethod
-    def update_all_stabilities(cls, workflow_name: str = None):
-        # grab all unique chemical systems
-        chemical_systems = cls.objects.values_list(
-            "chemical_system", flat=True
-        ).distinct()
-
-        # Now  go through each and run the analysis.
-        # OPTIMIZE: Some systems will be analyzed multiple times. For example,
-        # C would be repeatedly updated through C, C-O, Y-C-F, etc.
-        for chemical_system in track(chemical_systems):
-            try:
-                cls.update_chemical_system_stabilities(
-                    chemical_system,
-                    workflow_name,
-                )
-            except ValueError as exception:
-                logging.warning(f"Failed for {chemical_system} with error: {exception}")
+    def update_all_stabilities(
+        cls,
+        workflow_name: str = None,
+        new_only: bool = False,
+        parallel: bool = False,
+        max_workers: int = None,
+    ):
+        """
+        Updates the hull energy, decomposition, and formation energy of every
+        entry, relative to all other entries in this table.
+
+        Chemical systems are analyzed in order of their number of elements,
+        and only the stable entries of a system are carried over to the
+        systems that contain it (e.g. the stable C and O entries are reused for
+        C-O, Y-C-O, etc.). Each entry is therefore only analyzed once, and the
+        phase diagrams stay small. Systems with the same number of elements
+        don't depend on one another, so they can be analyzed in parallel.
+
+        #### Parameters
+
+        - `workflow_name` :
+            The workflow to update entries for. This is required if the table
+            contains results from multiple workflows.
+        - `new_only` :
+            Whether to only update chemical systems that have new entries (i.e.
+            entries without an `energy_above_hull` yet), as well as systems
+            that contain them and whose hull changes as a result. This is much
+            faster when calling this method on a cycle as new results come in.
+            Defaults to False.
+        - `parallel` :
+            Whether to analyze independent chemical systems across a pool of
+            processes. Defaults to False.
+        - `max_workers` :
+            The number of processes to use when `parallel=True`. Defaults to
+            the number of CPUs.
+        """
+        entries = cls._get_hull_entries(workflow_name).values_list(
+            "id",
+            "chemical_system",
+            "formula_full",
+            "energy",
+            "energy_above_hull",
+            "is_stable",
+        )
+
+        # group entries by their chemical system and note what the hull was
+        # the last time stabilities were updated
+        system_entries = {}  # chemical system --> list of (id, formula, energy)
+        previous_stable_ids = {}  # chemical system --> set of ids
+        new_systems = set()
+        for id, system, formula, energy, hull_energy, is_stable in entries.iterator():
+            if not system:
+                continue
+            system_entries.setdefault(system, []).append((id, formula, energy))
+            previous_stable_ids.setdefault(system, set())
+            if is_stable:
+                previous_stable_ids[system].add(id)
+            if hull_energy is None:
+                new_systems.add(system)
+
+        # Group systems by the number of elements. Systems in each group only
+        # depend on systems in earlier groups.
+        system_levels = {}
+        for system in system_entries:
+            system_levels.setdefault(system.count("-"), []).append(system)
+
+        stable_entries = {}  # chemical system --> list of (id, formula, energy)
+        changed_systems = set()
+        for level in sorted(system_levels):
+            systems_to_update = []
+            for system in system_levels[level]:
+                subsystems = [
+                    subsystem
+                    for subsystem in get_chemical_subsystems(system)
+                    if subsystem != system and subsystem in system_entries
+                ]
+                if (
+                    not new_only
+                    or system in new_systems
+                    or any(subsystem in changed_systems for subsystem in subsystems)
+                ):
+                    reference_entries = [
+                        entry
+                        for subsystem in subsystems
+                        for entry in stable_entries[subsystem]
+                    ]
+                    systems_to_update.append(
+                        (system, system_entries[system], reference_entries)
+                    )
+                else:
+                    # nothing changed, so we reuse the saved hull
+                    stable_entries[system] = [
+                        entry
+                        for entry in system_entries[system]
+                        if entry[0] in previous_stable_ids[system]
+                    ]
+
+            if not systems_to_update:
+                continue
+            logging.info(
+                f"Updating stabilities for {len(systems_to_update)} chemical "
+                f"systems with {level + 1} element(s)"
+            )
+
+            results = convert_in_batches(
+                _get_stabilities,
+                iter(systems_to_update),
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+            objs = []
+            for (system, entries, _), system_results in zip(systems_to_update, results):
+                stable_ids = {
+                    id for id, data in system_results.items() if data["is_stable"]
+                }
+                stable_entries[system] = [e for e in entries if e[0] in stable_ids]
+                if stable_ids != previous_stable_ids[system]:
+                    changed_systems.add(system)
+                objs += [cls(id=id, **data) for id, data in system_results.items()]
+
+            cls.objects.bulk_update(
+                objs=objs,
+                fields=[
+                    "energy_above_hull",
+                    "is_stable",
+                    "decomposes_to",
+                    "formation_energy",
+                    "formation_energy_per_atom",
+                ],
+                # updating extremely large systems (>3k structures) can cause
+                # this to time-out and crash. We therefore update in batches
+                batch_size=500,
+            )
 
     @classmethod
     def get_phase_diagram(
@@ -182,26 +299,14 @@ class Thermodynamics(DatabaseTable):
         workflow_name: str = None,
         return_entries: bool = False,
     ) -> PhaseDiagram:
-        if workflow_name is None and hasattr(cls, "workflow_name"):
-            raise Exception(
-                "This table contains results from multiple workflows, so you must "
-                "provide a workflow_name as an input to indicate which entries "
-                "should be loaded/updated."
-            )
-
         # if we have a multi-element system, we need to include subsystems as
         # well. ex: Na --> Na, Cl, Na-Cl
         subsystems = get_chemical_subsystems(chemical_system)
 
         # grab all entries for this chemical system
-        entries = cls.objects.filter(
-            # workflow_name="relaxation.vasp.staged",
+        entries = cls._get_hull_entries(workflow_name).filter(
             chemical_system__in=subsystems,
-            energy__isnull=False,  # only completed calculations
         )
-        # add an extra filter if provided
-        if workflow_name:
-            entries = entries.filter(workflow_name=workflow_name)
 
         # now make the queryy
         entries = entries.only("id", "energy", "formula_full").all()
@@ -232,6 +337,69 @@ class Thermodynamics(DatabaseTable):
             )
         )
 
+    @classmethod
+    def _get_hull_entries(cls, workflow_name: str = None):
+        """
+        Gives all completed entries that should be considered when building
+        phase diagrams.
+        """
+        if workflow_name is None and hasattr(cls, "workflow_name"):
+            raise Exception(
+                "This table contains results from multiple workflows, so you must "
+                "provide a workflow_name as an input to indicate which entries "
+                "should be loaded/updated."
+            )
+
+        entries = cls.objects.filter(energy__isnull=False)  # only completed calcs
+        # add an extra filter if provided
+        if workflow_name:
+            entries = entries.filter(workflow_name=workflow_name)
+        return entries
+
+
+def _get_stabilities(
+    chemical_system: str,
+    entries: list[tuple],
+    reference_entries: list[tuple],
+) -> dict:
+    """
+    Builds the phase diagram for a single chemical system and gives the
+    stability columns for each of its entries (as a dictionary of id --> columns).
+
+    `entries` are the (id, formula, energy) of every entry in this chemical
+    system, while `reference_entries` only needs to be the stable entries of its
+    subsystems, as unstable ones never affect the hull.
+    """
+    entries_pmg = []
+    for id, formula, energy in entries + reference_entries:
+        pde = PDEntry(composition=formula, energy=energy)
+        # BUG: pymatgen grabs entry_id, when it should really be grabbing name.
+        # https://github.com/materialsproject/pymatgen/blob/de17dd84ba90dbf7a8ed709a33d894a4edb82d02/pymatgen/analysis/phase_diagram.py#L2926
+        pde.entry_id = f"id={id}"
+        entries_pmg.append(pde)
+
+    try:
+        phase_diagram = PhaseDiagram(entries_pmg)
+    except ValueError as exception:
+        logging.warning(f"Failed for {chemical_system} with error: {exception}")
+        return {}
+
+    results = {}
+    for (id, _, _), entry_pmg in zip(entries, entries_pmg):
+        decomp, hull_energy = phase_diagram.get_decomp_and_e_above_hull(entry_pmg)
+        results[id] = dict(
+            energy_above_hull=hull_energy,
+            is_stable=True if hull_energy == 0 else False,
+            # OPTIMIZE: I would like this to point to another entry
+            # specifically but this will take more work.
+            decomposes_to=(
+                [d.composition.formula for d in decomp] if hull_energy != 0 else []
+            ),
+            formation_energy=phase_diagram.get_form_energy(entry_pmg),
+            formation_energy_per_atom=phase_diagram.get_form_energy_per_atom(entry_pmg),
+        )
+    return results
+
 
 class HullDiagram(PlotlyFigure):
     method_type = "classmethod"
@@ -2,7 +2,10 @@
 
 import logging
 
-from simmate.utils import chunk_list
+from django.db import connections
+from django.db.models import Q
+
+from simmate.utils import chunk_list, dispatch
 
 
 class WorkflowPopulator:
@@ -23,6 +26,11 @@ class WorkflowPopulator:
     possible with Django models) and the workflow must be accessible with
     the `get_workflow` utility.
     
+    If a column needs another workflow column to be populated first, use the
+    dict format and give "depends_on" (e.g. `{"workflow_name": ...,
+    "depends_on": ["other_column"]}`). Columns without dependencies on each
+    other are populated concurrently.
+    
     Note, this is meant for bringing workflow results IN TO a table -- like
     having a full dataset (like the OQMD library) and wanting to add a column
     for some ML/AI model you've built. If your workflow takes >30s per entry,
@@ -36,10 +44,111 @@ class WorkflowPopulator:
         batch_size: int = 500,
         update_only: bool = True,
         filters: dict = None,
-    ):
+        parallel: bool | str = False,
+        max_workers: int = None,
+    ) -> int:
         """
         Populates a specific workflow column. The column must be present in the
         `workflow_columns` attribute.
+
+        Each batch of rows is saved as soon as it finishes, so rows that are
+        already populated are skipped if this is stopped and restarted (when
+        `update_only=True`). Batches can be run across a pool of processes
+        (`parallel=True`) or submitted to Simmate workers (`parallel="job"`),
+        as with the `dispatch` utility.
+
+        Returns the number of rows updated.
+        """
+        chunks = cls._get_workflow_column_chunks(
+            column_name,
+            batch_size=batch_size,
+            update_only=update_only,
+            filters=filters,
+        )
+        return cls._run_workflow_column_chunks(chunks, parallel, max_workers)
+
+    @classmethod
+    def populate_workflow_columns(
+        cls,
+        batch_size: int = 500,
+        update_only: bool = True,
+        filters: dict = None,
+        parallel: bool | str = False,
+        max_workers: int = None,
+    ) -> int:
+        """
+        Uses the `workflow_columns` property to fill columns with data.
+
+        Columns that don't depend on one another (see the "depends_on" option in
+        `workflow_columns`) are populated together, so that batches for all of
+        them are run concurrently when `parallel` is set.
+
+        Returns the number of rows updated (summed over all columns).
+        """
+        nupdated = 0
+        for column_names in cls._get_workflow_column_stages():
+            chunks = []
+            for column_name in column_names:
+                chunks += cls._get_workflow_column_chunks(
+                    column_name,
+                    batch_size=batch_size,
+                    update_only=update_only,
+                    filters=filters,
+                )
+            nupdated += cls._run_workflow_column_chunks(chunks, parallel, max_workers)
+        return nupdated
+
+    @classmethod
+    def _get_workflow_column_config(cls, column_name: str) -> dict:
+        # Config can be a simple string (single column) or a dict with
+        # "workflow_name" and "columns" (multi-column from one workflow), as
+        # well as "depends_on" (columns that must be populated first).
+        column_config = cls.workflow_columns[column_name]
+        if not isinstance(column_config, dict):
+            column_config = dict(workflow_name=column_config)
+        return dict(
+            workflow_name=column_config["workflow_name"],
+            # maps db_column_name -> result_key in the workflow output dict
+            columns_mapping=column_config.get("columns", None),
+            depends_on=column_config.get("depends_on", []),
+        )
+
+    @classmethod
+    def _get_workflow_column_stages(cls) -> list[list[str]]:
+        """
+        Groups the workflow columns into stages, where each column only
+        depends on columns in earlier stages.
+        """
+        remaining = {
+            column_name: set(cls._get_workflow_column_config(column_name)["depends_on"])
+            for column_name in cls.workflow_columns.keys()
+        }
+        stages = []
+        while remaining:
+            stage = [name for name, depends_on in remaining.items() if not depends_on]
+            if not stage:
+                raise Exception(
+                    "The 'depends_on' options of `workflow_columns` are circular "
+                    f"or point to unknown columns: {remaining}"
+                )
+            stages.append(stage)
+            for column_name in stage:
+                remaining.pop(column_name)
+            for depends_on in remaining.values():
+                depends_on.difference_update(stage)
+        return stages
+
+    @classmethod
+    def _get_workflow_column_chunks(
+        cls,
+        column_name: str,
+        batch_size: int = 500,
+        update_only: bool = True,
+        filters: dict = None,
+    ) -> list[tuple[str, list]]:
+        """
+        Gives the batches of ids that need to be populated for a column, as a
+        list of (column_name, ids) tuples.
         """
 
         # BUG: using 'id__in' below might cause batches >1k to fail
@@ -53,21 +162,14 @@ class WorkflowPopulator:
         from simmate.workflows.utils import get_workflow
 
         # grab the workflow mapped to this column.
-        # Config can be a simple string (single column) or a dict with
-        # "workflow_name" and "columns" (multi-column from one workflow).
-        column_config = cls.workflow_columns[column_name]
-        if isinstance(column_config, dict):
-            workflow_name = column_config["workflow_name"]
-            # maps db_column_name -> result_key in the workflow output dict
-            columns_mapping = column_config["columns"]
-        else:
-            workflow_name = column_config
-            columns_mapping = None
+        column_config = cls._get_workflow_column_config(column_name)
+        workflow_name = column_config["workflow_name"]
+        columns_mapping = column_config["columns_mapping"]
         workflow = get_workflow(workflow_name)
 
         # BUG: I assume inputs are the common ones for now...
         # but I need a way to specify this for more diverse workflows
-        # (I give one suggested fix to this in the while-loop below)
+        # (I give one suggested fix to this in `_populate_workflow_chunk`)
         if "molecules" not in workflow.parameter_names:
             raise Exception(
                 "We are still at early stage testing for this method, so "
@@ -84,64 +186,107 @@ class WorkflowPopulator:
                     query_filters[f"{db_col}__isnull"] = True
             else:
                 query_filters[f"{column_name}__isnull"] = True
-        # some tables allow "broken" entries, which we always want to skip
+        # some tables allow "broken" entries, which we always want to skip.
+        # These columns are often left null, so we exclude True values rather
+        # than filtering for False ones.
+        query_excludes = Q()
         if "is_invalid_molecule" in cls.get_column_names():
-            query_filters["is_invalid_molecule"] = False
-            query_filters["is_empty_molecule"] = False
+            query_excludes |= Q(is_invalid_molecule=True) | Q(is_empty_molecule=True)
         if "is_invalid_structure" in cls.get_column_names():
-            query_filters["is_invalid_structure"] = False
+            query_excludes |= Q(is_invalid_structure=True)
         if filters:
             query_filters.update(filters)
-        ids_to_update = (
-            cls.objects.filter(**query_filters).values_list("id", flat=True).all()
+        ids_to_update = list(
+            cls.objects.filter(**query_filters)
+            .exclude(query_excludes)
+            .order_by("id")
+            .values_list("id", flat=True)
         )
 
         logging.info(
             f"Updating '{column_name}' column using '{workflow_name}' "
             f"for {len(ids_to_update)} entries"
         )
-        for ids_chunk in chunk_list(ids_to_update, batch_size):
-            try:
-
-                # grab the next set of objects to update
-                objs_to_update = cls.objects.filter(id__in=ids_chunk).all()
-
-                # First check for a user-defined method.
-                predefined_method = f"_format_inputs_for__{column_name}"
-                if hasattr(cls, predefined_method):
-                    # method = getattr(cls, predefined_method)
-                    # method(workflow, objs_to_update)
-                    raise NotImplementedError("This feature is still being developed")
-                else:
-                    # BUG: see comment at start of for-loop where I say I assume
-                    # a 'molecules' input
-                    results = workflow.run(
-                        molecules=objs_to_update.to_toolkit(),
-                        compress_output=True,
-                    )
-                    logging.info("Saving results to db")
-                    if columns_mapping:
-                        # Multi-column workflow: results is a dict keyed
-                        # by result_key, each value is a list of values
-                        for db_col, result_key in columns_mapping.items():
-                            for entry, val in zip(objs_to_update, results[result_key]):
-                                setattr(entry, db_col, val)
-                        cls.objects.bulk_update(
-                            objs_to_update,
-                            list(columns_mapping.keys()),
-                        )
-                    else:
-                        for entry, entry_result in zip(objs_to_update, results):
-                            setattr(entry, column_name, entry_result)
-                        cls.objects.bulk_update(objs_to_update, [column_name])
-            except:
-                logging.warning("BATCH FAILED")
-                continue
+        return [(column_name, ids) for ids in chunk_list(ids_to_update, batch_size)]
 
     @classmethod
-    def populate_workflow_columns(cls, batch_size: int = 500):
+    def _run_workflow_column_chunks(
+        cls,
+        chunks: list[tuple[str, list]],
+        parallel: bool | str = False,
+        max_workers: int = None,
+    ) -> int:
+        if not chunks:
+            return 0
+
+        if parallel is True or parallel == "core":
+            # forked processes can't share database connections, so we close
+            # ours and let each process open its own
+            connections.close_all()
+
+        results = dispatch(
+            chunks,
+            cls._populate_workflow_chunk,
+            parallel=parallel,
+            batch_size=1,
+            max_workers=max_workers,
+        )
+
+        if parallel == "job":
+            # wait for all workers so that later stages see these results
+            results = [work_item.result() for work_item in results]
+
+        return sum(results)
+
+    @classmethod
+    def _populate_workflow_chunk(cls, chunk: tuple[str, list]) -> int:
         """
-        Uses the `workflow_columns` property to fill columns with data.
+        Runs the workflow for a single batch of ids and saves the results.
+        Returns the number of rows updated.
         """
-        for column_name in cls.workflow_columns.keys():
-            cls.populate_workflow_column(column_name, batch_size=batch_size)
+        column_name, ids_chunk = chunk
+
+        # local import to avoid circular dependency
+        from simmate.workflows.utils import get_workflow
+
+        column_config = cls._get_workflow_column_config(column_name)
+        columns_mapping = column_config["columns_mapping"]
+        workflow = get_workflow(column_config["workflow_name"])
+
+        try:
+            # grab the next set of objects to update
+            objs_to_update = cls.objects.filter(id__in=ids_chunk).order_by("id")
+
+            # First check for a user-defined method.
+            predefined_method = f"_format_inputs_for__{column_name}"
+            if hasattr(cls, predefined_method):
+                # method = getattr(cls, predefined_method)
+                # method(workflow, objs_to_update)
+                raise NotImplementedError("This feature is still being developed")
+
+            # BUG: see comment in `_get_workflow_column_chunks` where I say I
+            # assume a 'molecules' input
+            results = workflow.run(
+                molecules=objs_to_update.to_toolkit(),
+                compress_output=True,
+            )
+            logging.info("Saving results to db")
+            if columns_mapping:
+                # Multi-column workflow: results is a dict keyed
+                # by result_key, each value is a list of values
+                for db_col, result_key in columns_mapping.items():
+                    for entry, val in zip(objs_to_update, results[result_key]):
+                        setattr(entry, db_col, val)
+                cls.objects.bulk_update(
+                    objs_to_update,
+                    list(columns_mapping.keys()),
+                )
+            else:
+                for entry, entry_result in zip(objs_to_update, results):
+                    setattr(entry, column_name, entry_result)
+                cls.objects.bulk_update(objs_to_update, [column_name])
+        except:
+            logging.warning("BATCH FAILED")
+            return 0
+
+        return len(objs_to_update)
@@ -5,12 +5,15 @@ import shutil
 import subprocess
 import urllib
 import zipfile
+from copy import deepcopy
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
 
 from django.apps import apps
 from django.core.management import call_command
+from django.core.signals import setting_changed
+from django.db.models.signals import class_prepared
 from django.db.utils import DatabaseError
 
 from simmate.config import settings
@@ -22,11 +25,55 @@ from simmate.utils import get_directory
 APPS_TO_MIGRATE = list(apps.app_configs.keys())
 
 
+# Registry of table metadata (column names, docs, filters, etc.) that is
+# introspected from model classes, stored as {(table, method, args): value}
+_TABLE_METADATA = {}
+
+
+def cache_table_metadata(method):
+    """
+    Decorator for `DatabaseTable` classmethods that introspect the table class
+    (e.g. `get_column_names`). Results are computed once per table and process,
+    and a deep copy is returned so callers can't change the cached value (or
+    any of the lists and dicts nested in it).
+
+    The registry is cleared whenever a model class is created or the installed
+    apps are changed, because new models can add (reverse) relations to
+    existing tables.
+    """
+
+    @wraps(method)
+    def wrapper(cls, *args, **kwargs):
+        key = (cls, method.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in _TABLE_METADATA:
+            _TABLE_METADATA[key] = method(cls, *args, **kwargs)
+        return deepcopy(_TABLE_METADATA[key])
+
+    return wrapper
+
+
+def clear_table_metadata(*args, **kwargs):
+    """
+    Empties the cache used by `cache_table_metadata`
+    """
+    _TABLE_METADATA.clear()
+
+
+def _clear_table_metadata_on_reload(setting: str, **kwargs):
+    if setting == "INSTALLED_APPS":
+        clear_table_metadata()
+
+
+class_prepared.connect(clear_table_metadata, weak=False)
+setting_changed.connect(_clear_table_metadata_on_reload, weak=False)
+
+
 def batch_bulk_create(
     batch_size: int = 1000,
     update_conflicts: bool = False,
     unique_fields: list[str] = None,
     update_fields: list[str] = None,
+    method: str = "insert",
 ):
     """
     Decorator for the `load_source_data` classmethod on DatabaseTables.
@@ -35,8 +82,15 @@ def batch_bulk_create(
 
     By default, conflicts are ignored (insert-only). To enable upsert behavior,
     set `update_conflicts=True` and provide `unique_fields` and `update_fields`.
+
+    For large PostgreSQL loads, set `method="copy"` to send each batch with
+    `COPY` rather than `INSERT` (see `SearchResults.bulk_copy`). This can't
+    be combined with `update_conflicts`.
     """
 
+    if update_conflicts and method == "copy":
+        raise ValueError("update_conflicts is not supported when method='copy'")
+
     if update_conflicts:
         bulk_create_kwargs = dict(
             update_conflicts=True,
@@ -45,6 +99,7 @@ def batch_bulk_create(
         )
     else:
         bulk_create_kwargs = dict(ignore_conflicts=True)
+    bulk_create_kwargs["method"] = method
 
     def decorator(func):
         @wraps(func)
@@ -360,6 +415,83 @@ def get_table(table_name: str):  # returns subclass of DatabaseTable
     return DatabaseTable.get_table(table_name=table_name)
 
 
+def convert_structure_formats(table_name: str = None) -> dict:
+    """
+    Converts structures that are stored as POSCAR or CIF strings to the compact
+    binary format (see `Structure.convert_structure_format`).
+
+    By default, all tables with structures are converted. Returns the number
+    of rows converted for each table.
+    """
+    # local import is required to prevent circular dep
+    from simmate.database.mixins import Structure
+
+    tables = (
+        [get_table(table_name)]
+        if table_name
+        else [m for m in apps.get_models() if issubclass(m, Structure)]
+    )
+    results = {}
+    for table in tables:
+        logging.info(f"Converting structures for '{table.table_name}'")
+        results[table.table_name] = table.convert_structure_format()
+    return results
+
+
+def update_spacegroups(
+    table_name: str = None,
+    parallel: bool = False,
+    max_workers: int = None,
+) -> dict:
+    """
+    Determines the spacegroup of structures that were loaded with
+    `defer_spacegroup=True` (see `Structure.update_spacegroups`).
+
+    By default, all tables with structures are updated. Returns the number
+    of rows updated for each table.
+    """
+    # local import is required to prevent circular dep
+    from simmate.database.mixins import Structure
+
+    tables = (
+        [get_table(table_name)]
+        if table_name
+        else [m for m in apps.get_models() if issubclass(m, Structure)]
+    )
+    results = {}
+    for table in tables:
+        logging.info(f"Updating spacegroups for '{table.table_name}'")
+        results[table.table_name] = table.update_spacegroups(
+            parallel=parallel,
+            max_workers=max_workers,
+        )
+    return results
+
+
+def update_element_bits(table_name: str = None) -> dict:
+    """
+    Fills in the element bit columns of structures saved before these columns
+    existed (see `Structure.update_element_bits`), which are needed for
+    subsystem and supersystem searches.
+
+    By default, all tables with structures are updated. Returns the number
+    of rows updated for each table.
+    """
+    # local import is required to prevent circular dep
+    from simmate.database.mixins import Structure
+
+    tables = (
+        [get_table(table_name)]
+        if table_name
+        else [m for m in apps.get_models() if issubclass(m, Structure)]
+    )
+    results = {}
+    for table in tables:
+        logging.info(f"Updating element bits for '{table.table_name}'")
+        results[table.table_name] = table.update_element_bits()
+    return results
+
+
 # BUG: This function isn't working as intended
 # def graph_database(filename="database_graph.png"):
 #     # using django-extensions, we want to make an image of all the available
@@ -4,12 +4,14 @@ from simmate.database.mixins import (
     BandStructureCalc,
     DensityofStatesCalc,
     DiffusionAnalysis,
+    DistinctPathSearch,
     Dynamics,
     DynamicsIonicStep,
     IonicStep,
     MigrationHop,
     MigrationImage,
     PopulationAnalysis,
+    PopulationAnalysisSite,
     Relaxation,
     StagedRelaxStatic,
     StagedWorkflow,
@@ -7,6 +7,7 @@ It is a very basic extension PyMatGen's core Structure class, as it only adds
 a few extra methods and does not change any other usage.
 """
 
+import hashlib
 import itertools
 import json
 from pathlib import Path
@@ -81,6 +82,36 @@ class Structure(PymatgenStructure):
         # return back the sanitized structure
         return structure_sanitized
 
+    def get_hash_key(self, decimals: int = 4) -> str:
+        """
+        Gives an MD5 hash key that is identical for any two structures with
+        the same lattice and sites, regardless of the order that sites are
+        listed in.
+
+        Lattice vectors (in Angstroms) and fractional coordinates (wrapped into
+        the unit cell) are rounded to the given number of decimals before
+        hashing, so tiny numerical noise does not change the key. No symmetry
+        analysis or reduction is done, so two different cells of the same
+        crystal will still give different keys.
+        """
+
+        # wrap coordinates into the cell both before and after rounding so
+        # that values like -0.00001 and 0.99999 both become 0
+        frac_coords = numpy.round(self.frac_coords % 1, decimals) % 1
+        lattice = numpy.round(self.lattice.matrix, decimals) + 0.0  # no "-0.0"
+
+        sites = sorted(
+            [str(site.species)] + [f"{c:.{decimals}f}" for c in coords]
+            for site, coords in zip(self, frac_coords)
+        )
+        data = dict(
+            lattice=[f"{v:.{decimals}f}" for v in lattice.flatten()],
+            sites=sites,
+            charge=self.charge,
+        )
+
+        return hashlib.md5(json.dumps(data).encode("utf-8")).hexdigest()
+
     @classmethod
     def from_dynamic(cls, structure):
         """
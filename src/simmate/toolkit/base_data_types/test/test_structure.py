@@ -3,3 +3,15 @@
 
 def test_sanitze(structure):
     structure.get_sanitized_structure()
+
+
+def test_hash_key(structure):
+    # the same structure with its sites shuffled should give the same key
+    shuffled = structure.copy()
+    shuffled.translate_sites(range(len(shuffled)), [1, 0, 0], to_unit_cell=False)
+    shuffled = shuffled.get_sorted_structure(key=lambda site: -site.frac_coords[2])
+    assert shuffled.get_hash_key() == structure.get_hash_key()
+
+    perturbed = structure.copy()
+    perturbed.translate_sites([0], [0.01, 0, 0])
+    assert perturbed.get_hash_key() != structure.get_hash_key()
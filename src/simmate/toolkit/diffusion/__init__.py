@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from .distinct_path_finder import DistinctPathFinder
+from .distinct_path_finder import DistinctPathFinder, write_migration_hops
 from .migration_hop import MigrationHop
 from .migration_images import MigrationImages
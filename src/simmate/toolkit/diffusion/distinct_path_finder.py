@@ -3,18 +3,53 @@
 from pathlib import Path
 
 from pymatgen.analysis.diffusion.neb.pathfinder import DistinctPathFinder as PymatgenDPF
+from pymatgen.analysis.diffusion.neb.pathfinder import (
+    MigrationHop as PymatgenMigrationHop,
+)
+from pymatgen.core.sites import PeriodicSite
+
+from simmate.toolkit import Structure
 
 
 class DistinctPathFinder(PymatgenDPF):
     def write_all_migration_hops(self, directory: Path):
-        # We write all the path files so users can visualized them if needed
-        filename = directory / "all_migration_hops.cif"
-        self.write_all_paths(str(filename), nimages=10)
-        migration_hops = self.get_paths()
-        for i, migration_hop in enumerate(migration_hops):
-            number = str(i).zfill(2)  # converts numbers like 2 to "02"
-            # the files names here will be like "migration_hop_02.cif"
-            migration_hop.write_path(
-                str(directory / f"migration_hop_{number}.cif"),
-                nimages=10,  # this is just for visualization
-            )
+        write_migration_hops(self.get_paths(), directory)
+
+
+def write_migration_hops(
+    migration_hops: list[PymatgenMigrationHop],
+    directory: Path,
+    nimages: int = 10,  # this is just for visualization
+):
+    """
+    Writes the migration hops found by `DistinctPathFinder.get_paths` to
+    files so users can visualize them if needed. Each hop is written to
+    "migration_hop_*.cif" and all hops are written together (with H as a
+    placeholder for the images) to "all_migration_hops.cif".
+
+    Unlike `DistinctPathFinder.write_all_paths`, this takes the hops directly,
+    so the (slow) path search is not repeated.
+    """
+    sites = []
+    for i, migration_hop in enumerate(migration_hops):
+        structures = migration_hop.get_structures(
+            nimages=nimages,
+            species=[migration_hop.isite.specie],
+        )
+        sites.append(structures[0][0])
+        sites.append(structures[-1][0])
+        for structure in structures[1:-1]:
+            sites.append(PeriodicSite("H", structure[0].frac_coords, structure.lattice))
+
+        number = str(i).zfill(2)  # converts numbers like 2 to "02"
+        # the files names here will be like "migration_hop_02.cif"
+        migration_hop.write_path(
+            str(directory / f"migration_hop_{number}.cif"),
+            nimages=nimages,
+        )
+
+    if migration_hops:
+        sites.extend(structures[0].sites[1:])
+        Structure.from_sites(sites).to(
+            filename=str(directory / "all_migration_hops.cif")
+        )
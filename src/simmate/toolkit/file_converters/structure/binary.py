@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a compact binary format for structures, which is what
+the `structure` column of `simmate.database.mixins.Structure` tables uses.
+Compared to the POSCAR and CIF formats, it skips all repeated text (headers,
+element lists, etc.) and can be read back without parsing any text.
+
+You typically won't use this module directly, but here is an example:
+
+``` python
+from simmate.toolkit import Structure
+from simmate.toolkit.file_converters.structure.binary import BinaryStructureAdapter
+
+structure = Structure.from_file("example.cif")
+
+# as raw bytes
+data = BinaryStructureAdapter.to_bytes(structure)
+structure_new = BinaryStructureAdapter.from_bytes(data)
+
+# as a (base64) string that can be stored in a text column
+string = BinaryStructureAdapter.to_str(structure)
+structure_new = BinaryStructureAdapter.from_str(string)
+```
+
+The binary layout is (all little-endian):
+
+- header: magic `b"SMS"`, version (uint8), flags (uint8), number of sites
+  (uint32), and number of unique species (uint16)
+- species table: for each species, the length of its symbol (uint8) and then
+  its symbol (utf-8), such as `Fe` or `Fe2+`
+- lattice matrix (9 x float64)
+- fractional coordinates (nsites x 3 x float64)
+- for ordered structures: the species index of each site (nsites x uint16)
+- for disordered structures (flag bit 0): the number of species on each site
+  (nsites x uint8), followed by the species index (uint16) and the occupancy
+  (float64) of every species on every site
+
+Site properties (e.g. magnetic moments) are not stored, same as with POSCARs.
+"""
+
+import base64
+import struct
+
+import numpy
+from pymatgen.core.composition import Composition
+from pymatgen.core.periodic_table import get_el_sp
+
+from simmate.toolkit import Structure as ToolkitStructure
+
+MAGIC = b"SMS"
+VERSION = 1
+TEXT_PREFIX = "@"
+
+_HEADER = struct.Struct("<3sBBIH")
+_FLAG_DISORDERED = 1
+
+
+class BinaryStructureAdapter:
+    """
+    Converts between Simmate toolkit structures and the compact binary format
+    described in this module's docs.
+    """
+
+    @staticmethod
+    def to_bytes(structure: ToolkitStructure) -> bytes:
+        """
+        Encodes a structure into the binary format
+        """
+        species_table = {}  # symbol --> index
+
+        def get_index(species) -> int:
+            return species_table.setdefault(str(species), len(species_table))
+
+        nsites = len(structure)
+        is_ordered = structure.is_ordered
+        if is_ordered:
+            site_data = numpy.array(
+                [get_index(site.specie) for site in structure],
+                dtype="<u2",
+            ).tobytes()
+        else:
+            counts, indices, occupancies = [], [], []
+            for site in structure:
+                species = site.species
+                counts.append(len(species))
+                for specie, occupancy in species.items():
+                    indices.append(get_index(specie))
+                    occupancies.append(occupancy)
+            site_data = b"".join(
+                [
+                    numpy.array(counts, dtype="u1").tobytes(),
+                    numpy.array(indices, dtype="<u2").tobytes(),
+                    numpy.array(occupancies, dtype="<f8").tobytes(),
+                ]
+            )
+
+        symbols = [symbol.encode() for symbol in species_table]
+        return b"".join(
+            [
+                _HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    0 if is_ordered else _FLAG_DISORDERED,
+                    nsites,
+                    len(symbols),
+                ),
+                *[bytes([len(symbol)]) + symbol for symbol in symbols],
+                numpy.asarray(structure.lattice.matrix, dtype="<f8").tobytes(),
+                numpy.asarray(structure.frac_coords, dtype="<f8").tobytes(),
+                site_data,
+            ]
+        )
+
+    @staticmethod
+    def from_bytes(data: bytes) -> ToolkitStructure:
+        """
+        Decodes a structure from the binary format
+        """
+        magic, version, flags, nsites, nspecies = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("This is not a binary structure")
+        if version > VERSION:
+            raise ValueError(
+                f"This structure uses version {version} of the binary format, "
+                f"but only up to version {VERSION} is supported. "
+                "Try updating Simmate."
+            )
+
+        # species table
+        offset = _HEADER.size
+        species_table = []
+        for _ in range(nspecies):
+            length = data[offset]
+            symbol = data[offset + 1 : offset + 1 + length].decode()
+            species_table.append(get_el_sp(symbol))
+            offset += 1 + length
+
+        def read_array(dtype: str, count: int) -> numpy.ndarray:
+            nonlocal offset
+            array = numpy.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        lattice = read_array("<f8", 9).reshape(3, 3)
+        frac_coords = read_array("<f8", nsites * 3).reshape(nsites, 3)
+
+        # OPTIMIZE: building a Composition for every site is the slowest step
+        # of making a structure, so we make one per unique species (or unique
+        # mix of species) and share it between sites.
+        if not flags & _FLAG_DISORDERED:
+            compositions = [Composition({specie: 1}) for specie in species_table]
+            species = [compositions[i] for i in read_array("<u2", nsites).tolist()]
+        else:
+            counts = read_array("u1", nsites).tolist()
+            total = sum(counts)
+            indices = read_array("<u2", total).tolist()
+            occupancies = read_array("<f8", total).tolist()
+            compositions = {}
+            species = []
+            start = 0
+            for count in counts:
+                end = start + count
+                key = (tuple(indices[start:end]), tuple(occupancies[start:end]))
+                if key not in compositions:
+                    compositions[key] = Composition(
+                        {species_table[i]: occupancy for i, occupancy in zip(*key)}
+                    )
+                species.append(compositions[key])
+                start = end
+
+        return ToolkitStructure(lattice, species, frac_coords)
+
+    @classmethod
+    def to_str(cls, structure: ToolkitStructure) -> str:
+        """
+        Encodes a structure into the binary format, and then into a base64
+        string that can be stored in a text column
+        """
+        return TEXT_PREFIX + base64.b64encode(cls.to_bytes(structure)).decode()
+
+    @classmethod
+    def from_str(cls, string: str) -> ToolkitStructure:
+        """
+        Decodes a structure from a string made by `to_str`
+        """
+        if not cls.is_binary_str(string):
+            raise ValueError("This is not a binary structure string")
+        return cls.from_bytes(base64.b64decode(string[len(TEXT_PREFIX) :]))
+
+    @classmethod
+    def to_text(cls, string: str) -> str:
+        """
+        Converts a string made by `to_str` to a POSCAR (or a CIF for disordered
+        structures), which is the human-readable format that older versions of
+        Simmate stored. Other strings are given back unchanged.
+        """
+        if not cls.is_binary_str(string):
+            return string
+        structure = cls.from_str(string)
+        return structure.to(fmt="poscar" if structure.is_ordered else "cif")
+
+    @staticmethod
+    def is_binary_str(string: str) -> bool:
+        """
+        Whether a string was made by `to_str`, rather than being a POSCAR or
+        CIF string
+        """
+        return string.startswith(TEXT_PREFIX)
@@ -57,6 +57,8 @@ from simmate.database import connect
 from simmate.database.mixins import Structure as DatabaseStructure
 from simmate.toolkit import Structure as ToolkitStructure
 
+from .binary import BinaryStructureAdapter
+
 
 class DatabaseAdapter:
     """
@@ -143,11 +145,12 @@ class DatabaseAdapter:
         if not structure_string:
             return None
 
+        # New rows use our binary format, but older rows may still be stored
+        # as a "CIF" or "POSCAR". If the string starts with "#", then I know
+        # that I stored it as a "CIF".
+        if BinaryStructureAdapter.is_binary_str(structure_string):
+            return BinaryStructureAdapter.from_str(structure_string)
         storage_format = "CIF" if (structure_string[0] == "#") else "POSCAR"
-        # OPTIMIZE: see my comment on storing strings in the from_toolkit method above.
-        # For now, I need to figure out if I used "CIF" or "POSCAR" and read the structure
-        # accordingly. In the future, I can just assume my new format.
-        # If the string starts with "#", then I know that I stored it as a "CIF".
 
         # convert the string to pymatgen Structure object
         if storage_format == "POSCAR":
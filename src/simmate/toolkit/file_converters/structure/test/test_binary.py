@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from simmate.conftest import run_benchmark
+from simmate.toolkit import Structure
+from simmate.toolkit.file_converters.structure.binary import (
+    MAGIC,
+    VERSION,
+    BinaryStructureAdapter,
+)
+
+
+def test_binary_roundtrip(structure):
+    data = BinaryStructureAdapter.to_bytes(structure)
+    assert data.startswith(MAGIC)
+    structure_new = BinaryStructureAdapter.from_bytes(data)
+    assert structure_new == structure
+    assert (structure_new.frac_coords == structure.frac_coords).all()
+
+    string = BinaryStructureAdapter.to_str(structure)
+    assert BinaryStructureAdapter.is_binary_str(string)
+    assert Structure.from_database_string(string) == structure
+
+
+def test_binary_disordered_and_oxidation_states():
+    structure = Structure(
+        lattice=[[3, 0, 0], [0, 3, 0], [0, 0, 3]],
+        species=[{"Fe2+": 0.5, "Co3+": 0.25}, "O2-", "O2-"],
+        coords=[[0, 0, 0], [0.5, 0.5, 0.5], [0.25, 0.25, 0.25]],
+    )
+    structure_new = BinaryStructureAdapter.from_str(
+        BinaryStructureAdapter.to_str(structure)
+    )
+    assert structure_new == structure
+    assert structure_new[0].species == structure[0].species
+
+
+def test_binary_invalid(structure):
+    data = BinaryStructureAdapter.to_bytes(structure)
+
+    with pytest.raises(ValueError, match="not a binary structure"):
+        BinaryStructureAdapter.from_bytes(b"XYZ" + data[3:])
+
+    # files written by newer versions of the format should give a clear error
+    future = bytearray(data)
+    struct.pack_into("<B", future, len(MAGIC), VERSION + 1)
+    with pytest.raises(ValueError, match="Try updating"):
+        BinaryStructureAdapter.from_bytes(bytes(future))
+
+    with pytest.raises(ValueError):
+        BinaryStructureAdapter.from_str(structure.to(fmt="POSCAR"))
+
+    # legacy POSCAR strings are still read by the database adapter
+    poscar = structure.to(fmt="POSCAR")
+    assert not BinaryStructureAdapter.is_binary_str(poscar)
+    assert Structure.from_database_string(poscar) == structure
+
+
+@pytest.mark.benchmark
+def test_binary_benchmark(sample_structures):
+    structures = list(sample_structures.values()) * 50
+    nitems = len(structures)
+
+    def write_poscars():
+        return [s.to(fmt="POSCAR") for s in structures]
+
+    def write_binaries():
+        return [BinaryStructureAdapter.to_str(s) for s in structures]
+
+    poscars = write_poscars()
+    binaries = write_binaries()
+    run_benchmark("write POSCAR", write_poscars, nrepeats=3, nitems=nitems)
+    run_benchmark("write binary", write_binaries, nrepeats=3, nitems=nitems)
+    run_benchmark(
+        "read POSCAR",
+        lambda: [Structure.from_str(s, fmt="POSCAR") for s in poscars],
+        nrepeats=3,
+        nitems=nitems,
+    )
+    run_benchmark(
+        "read binary",
+        lambda: [BinaryStructureAdapter.from_str(s) for s in binaries],
+        nrepeats=3,
+        nitems=nitems,
+    )
+    size_poscar = sum(len(s) for s in poscars) / nitems
+    size_binary = sum(len(s) for s in binaries) / nitems
+    print(
+        f"BENCHMARK average size: {size_poscar:.0f} (POSCAR) vs {size_binary:.0f} (binary)"
+    )
+    assert size_binary < size_poscar
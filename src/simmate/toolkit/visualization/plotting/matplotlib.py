@@ -38,6 +38,7 @@ class MatplotlibFigure(Figure):
         # that points back to this image.
 
         figdata = BytesIO()
+        figure = getattr(figure, "figure", figure)  # in case it is axes obj
         figure.savefig(figdata, format="png")
         figdata.seek(0)
         data = figdata.getvalue()
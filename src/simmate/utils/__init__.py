@@ -2,13 +2,19 @@
 
 from .dataframes import filter_pandas_df, filter_polars_df
 from .files import (
+    ARCHIVE_FORMATS,
     chunk_read,
     copy_directory,
     copy_files_from_directory,
     download_file,
     empty_directory,
+    find_archive,
     get_directory,
+    link_or_copy,
     make_archive,
+    unpack_archive,
+    write_archive,
+    write_yaml,
 )
 from .other import (
     bypass_nones,
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import os
 import shutil
 import time
+from fnmatch import fnmatch
 from pathlib import Path
 from tempfile import mkdtemp
 
 import requests
+import yaml
 from rich.progress import track
 
 
@@ -62,10 +65,35 @@ def get_directory(directory: Path | str = None) -> Path:
     return directory_cleaned.absolute()
 
 
+def link_or_copy(source: Path, destination: Path) -> Path:
+    """
+    Creates a hardlink to the source file at the destination, which avoids
+    copying any data. If hardlinks aren't possible (e.g. the two paths are on
+    different file systems), the file is copied instead.
+
+    Only use this for files that will never be edited in place, as changes to
+    one file will show up in the other.
+
+    #### Parameters
+
+    - `source`:
+        Path to the file to link or copy
+
+    - `destination`:
+        Path of the new file
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+    return destination
+
+
 def copy_files_from_directory(
     files_to_copy: list[Path],
     directory_old: Path,
     directory_new: Path = None,
+    link_files: bool = False,
 ) -> Path:
     """
     Given an old directory, copies all of the files listed over to a new one.
@@ -83,6 +111,12 @@ def copy_files_from_directory(
         Name of the new directory (optional). This will be passed to the
         `get_directory` utility.
 
+    - `link_files`:
+        Whether to hardlink files rather than copy them (see `link_or_copy`).
+        Linking is much faster and uses no extra disk space, but it is only
+        safe when the new files are never edited in place. Defaults to False.
+        Files unpacked from an archive are always copied.
+
     #### Returns
 
     - `directory`:
@@ -107,10 +141,10 @@ def copy_files_from_directory(
     if directory_old.exists():
         # everything is good to go
         delete_temp = False
-    elif directory_old.with_suffix(".zip").exists():
+    elif find_archive(directory_old):
         # unpack the old archive
-        shutil.unpack_archive(
-            filename=directory_old.with_suffix(".zip"),
+        unpack_archive(
+            filename=find_archive(directory_old),
             extract_dir=directory_old.parent,
         )
         delete_temp = True
@@ -133,7 +167,10 @@ def copy_files_from_directory(
                 "past directory is located on the same file system. File that "
                 f"couldn't be found was... {source_file}"
             )
-        shutil.copy(source_file, destination)
+        if link_files and not delete_temp:
+            link_or_copy(source_file, destination)
+        else:
+            shutil.copy(source_file, destination)
 
     # Then remove the unpacked archive now that we copied it.
     # This leaves the original archive behind and unaltered too.
@@ -147,6 +184,7 @@ def copy_directory(
     directory_old: Path,
     directory_new: Path = None,
     ignore_simmate_files: bool = False,
+    link_files: bool = False,
 ) -> Path:
     """
     Given an old directory, copies all of it's contents over to a new one.
@@ -165,6 +203,12 @@ def copy_directory(
     - `ignore_simmate_files`:
         Whether to ignore simmate_* files when copying over. Defaults to False.
 
+    - `link_files`:
+        Whether to hardlink files rather than copy them (see `link_or_copy`).
+        Linking is much faster and uses no extra disk space, but it is only
+        safe when the new files are never edited in place. Defaults to False.
+        Files unpacked from an archive are always copied.
+
     #### Returns
 
     - `directory`:
@@ -194,12 +238,13 @@ def copy_directory(
             ignore=(
                 shutil.ignore_patterns("simmate_*") if ignore_simmate_files else None
             ),
+            copy_function=link_or_copy if link_files else shutil.copy2,
             dirs_exist_ok=True,
         )
-    elif directory_old.with_suffix(".zip").exists():
+    elif find_archive(directory_old):
         # unpack the old archive
-        shutil.unpack_archive(
-            filename=directory_old.with_suffix(".zip"),
+        unpack_archive(
+            filename=find_archive(directory_old),
             extract_dir=directory_old.parent,
         )
         # copy the old directory to the new one
@@ -227,42 +272,242 @@ def copy_directory(
     return directory_new_cleaned
 
 
-def make_archive(directory: Path, files_to_exclude: list[str] = []):
+ARCHIVE_FORMATS = {
+    "zip": ".zip",
+    "zstd": ".tar.zst",
+}
+"""
+Archive formats supported by `make_archive`, mapped to the file suffix that
+each produces. `zip` is the long-standing default and is readable everywhere,
+while `zstd` (a tar stream compressed with zstandard) is much faster to both
+write and read for large calculation folders.
+"""
+
+
+def find_archive(directory: Path) -> Path:
+    """
+    Given the path to a directory that may have been archived, this returns
+    the path to the archive (e.g. `my_folder.zip` or `my_folder.tar.zst`).
+    None is returned if no archive exists.
+
+    #### Parameters
+
+    - `directory`:
+        Path to the folder that may have been archived
+    """
+    directory = Path(directory)
+    for suffix in ARCHIVE_FORMATS.values():
+        archive_filename = directory.parent / f"{directory.name}{suffix}"
+        if archive_filename.exists():
+            return archive_filename
+    return None
+
+
+def unpack_archive(filename: Path, extract_dir: Path):
+    """
+    Unpacks any archive written by `make_archive`. This wraps
+    `shutil.unpack_archive` but also supports the `.tar.zst` format, which is
+    decompressed as a stream (i.e. without writing a temporary tar file).
+
+    #### Parameters
+
+    - `filename`:
+        Path to the archive that should be unpacked
+
+    - `extract_dir`:
+        Directory to unpack the archive into
+    """
+    filename = Path(filename)
+
+    if filename.name.endswith(ARCHIVE_FORMATS["zstd"]):
+        import tarfile
+
+        import zstandard
+
+        with filename.open("rb") as file:
+            reader = zstandard.ZstdDecompressor().stream_reader(file)
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                tar.extractall(path=extract_dir, filter="data")
+    else:
+        shutil.unpack_archive(filename=filename, extract_dir=extract_dir)
+
+
+def write_archive(
+    directory: Path,
+    archive_filename: Path,
+    format: str = "zip",
+    compression_level: int = None,
+    ignore_patterns: list[str] = [],
+    root_name: str = None,
+) -> Path:
+    """
+    Streams the contents of a directory into a new archive file. Files are
+    read and compressed one at a time, so no temporary copy of the directory
+    is ever made. The original directory is left untouched.
+
+    #### Parameters
+
+    - `directory`:
+        Path to the folder that should be archived
+
+    - `archive_filename`:
+        Path of the archive to write
+
+    - `format`:
+        One of the keys in `ARCHIVE_FORMATS`. Defaults to "zip".
+
+    - `compression_level`:
+        Compression level passed to the codec. Defaults to the codec's own
+        default (6 for zip and 3 for zstd).
+
+    - `ignore_patterns`:
+        Glob-style patterns of file/folder names to leave out of the archive.
+        For example, `["simmate_*"]`.
+
+    - `root_name`:
+        Name of the top-level folder within the archive. Defaults to the name
+        of the directory being archived.
+
+    #### Returns
+
+    - `archive_filename`:
+        The path to the newly written archive
+    """
+
+    if format not in ARCHIVE_FORMATS:
+        raise Exception(
+            f"Unknown archive format: {format}. "
+            f"Options are {list(ARCHIVE_FORMATS.keys())}"
+        )
+
+    directory = Path(directory).absolute()
+    archive_filename = Path(archive_filename)
+    root_name = root_name or directory.name
+
+    # gather all paths up front (sorted so that archives are reproducible)
+    # and drop any that match the ignore patterns
+    paths = [
+        path
+        for path in sorted(directory.rglob("*"))
+        if not any(
+            fnmatch(part, pattern)
+            for part in path.relative_to(directory).parts
+            for pattern in ignore_patterns
+        )
+    ]
+
+    if format == "zip":
+        import zipfile
+
+        with zipfile.ZipFile(
+            archive_filename,
+            mode="w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=compression_level,
+        ) as archive:
+            archive.write(directory, arcname=root_name)
+            for path in paths:
+                archive.write(
+                    path,
+                    arcname=Path(root_name) / path.relative_to(directory),
+                )
+
+    elif format == "zstd":
+        import tarfile
+
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(
+            level=compression_level or 3,
+            threads=-1,  # uses all cores for a single stream
+        )
+        with archive_filename.open("wb") as file:
+            with compressor.stream_writer(file) as writer:
+                with tarfile.open(fileobj=writer, mode="w|") as archive:
+                    archive.add(directory, arcname=root_name, recursive=False)
+                    for path in paths:
+                        archive.add(
+                            path,
+                            arcname=str(Path(root_name) / path.relative_to(directory)),
+                            recursive=False,
+                        )
+
+    return archive_filename
+
+
+def make_archive(
+    directory: Path,
+    files_to_exclude: list[str] = [],
+    format: str = "zip",
+    compression_level: int = None,
+) -> Path:
     """
-    Compresses the directory to a zip file of the same name. After compressing,
-    it then deletes the original directory.
+    Compresses the directory to an archive of the same name (e.g. a zip file).
+    After compressing, it then deletes the original directory.
 
     #### Parameters
 
     - `directory`:
         Path to the folder that should be archived
+
+    - `files_to_exclude`:
+        Glob patterns of files that should be deleted before archiving. For
+        example, POTCAR files of VASP calculations.
+
+    - `format`:
+        One of the keys in `ARCHIVE_FORMATS`. Defaults to "zip".
+
+    - `compression_level`:
+        Compression level passed to the codec. Defaults to the codec's own
+        default.
+
+    #### Returns
+
+    - `archive_filename`:
+        The path to the newly written archive
     """
 
-    directory_full = directory.absolute()
+    directory_full = Path(directory).absolute()
 
     # Remove any files that were requested to be deleted. For example, POTCAR
     # files of VASP calculations.
     for file_to_remove in files_to_exclude:
-        for file_found in directory.rglob(file_to_remove):
+        for file_found in directory_full.rglob(file_to_remove):
             file_found.unlink()
 
-    # This wraps shutil.make_archive to change the default parameters. Normally,
-    # it writes the archive in the working directory, but we update it to use the
-    # the same directory as the folder being archived. The format is also set
-    # to zip.
-    shutil.make_archive(
-        # By default I choose within the current directory and save
-        # it as the same name of the directory (+ zip ending)
-        base_name=directory_full,
-        # format to use switch to gztar after testing
-        format="zip",
-        # full path to up tp directory that will be archived
-        root_dir=directory_full.parent,
-        # directory within root_directory to archive
-        base_dir=directory_full.name,
+    # Write the archive next to the folder being archived, using the same name
+    # as the folder (+ the format's ending)
+    archive_filename = write_archive(
+        directory=directory_full,
+        archive_filename=directory_full.parent
+        / f"{directory_full.name}{ARCHIVE_FORMATS.get(format, '')}",
+        format=format,
+        compression_level=compression_level,
     )
+
     # now remove the directory we just archived
-    shutil.rmtree(directory)
+    shutil.rmtree(directory_full)
+
+    return archive_filename
+
+
+def write_yaml(data: any, filename: Path | str):
+    """
+    Writes data to a yaml file. This gives the same output as `yaml.dump`, but
+    uses pyyaml's C emitter (libyaml) when it is available, which is several
+    times faster. This matters for the summary files that are written on every
+    workflow run.
+
+    #### Parameters
+
+    - `data`:
+        The python object (typically a dictionary) to write
+    - `filename`:
+        The yaml file to write to. Any existing file is overwritten.
+    """
+    dumper = getattr(yaml, "CDumper", yaml.Dumper)
+    with Path(filename).open("w") as file:
+        yaml.dump(data, file, Dumper=dumper)
 
 
 def empty_directory(directory: Path, files_to_keep: list[Path] = []):
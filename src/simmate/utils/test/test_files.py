@@ -46,3 +46,43 @@ def test_make_archive(tmp_path):
     make_archive(folder)
     assert (tmp_path / "simmate-task-1.zip").exists()
     assert not folder.exists()
+
+
+def test_make_archive_zstd(tmp_path):
+    from simmate.utils.files import copy_directory, find_archive, make_archive
+
+    copy_test_files(
+        tmp_path,
+        test_directory=__file__,
+        test_folder="to_archive",
+    )
+    folder = tmp_path / "simmate-task-1"
+    files_orig = sorted(f.relative_to(folder) for f in folder.rglob("*"))
+
+    make_archive(folder, format="zstd")
+    assert (tmp_path / "simmate-task-1.tar.zst").exists()
+    assert find_archive(folder) == tmp_path / "simmate-task-1.tar.zst"
+    assert not folder.exists()
+
+    # existing loaders should be able to read the new format
+    new_folder = copy_directory(folder, tmp_path / "copied")
+    assert sorted(f.relative_to(new_folder) for f in new_folder.rglob("*")) == (
+        files_orig
+    )
+    assert not folder.exists()  # the temporary unpack is removed
+
+
+def test_copy_directory_links(tmp_path):
+    from simmate.utils.files import copy_directory
+
+    copy_test_files(
+        tmp_path,
+        test_directory=__file__,
+        test_folder="to_archive",
+    )
+    folder = tmp_path / "simmate-task-1"
+    new_folder = copy_directory(folder, tmp_path / "linked", link_files=True)
+    for file in folder.rglob("*"):
+        if file.is_file():
+            new_file = new_folder / file.relative_to(folder)
+            assert new_file.samefile(file)
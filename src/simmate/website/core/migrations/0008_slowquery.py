@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:47
+
+from django.db import migrations, models
+
+import simmate.database.core.archive
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_feedback"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+                ),
+                ("table_name", models.CharField(db_index=True, max_length=100)),
+                ("filter_signature", models.TextField(db_index=True)),
+                ("filters", models.JSONField(blank=True, null=True)),
+                ("sql", models.TextField()),
+                ("duration", models.FloatField()),
+                ("nrows", models.IntegerField(blank=True, null=True)),
+                ("query_plan", models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "django_slow_queries",
+            },
+            bases=(models.Model, simmate.database.core.archive.ArchiveMixin),
+        ),
+    ]
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from django.contrib.postgres.operations import CreateExtension
+from django.db import migrations
+
+from simmate.config import settings
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_slowquery"),
+    ]
+    operations = (
+        [CreateExtension("vector")] if settings.postgres_pgvector_extension else []
+    )
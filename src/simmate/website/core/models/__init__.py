@@ -5,4 +5,5 @@ from simmate.database.mixins import Fingerprint, FingerprintPool, Spacegroup
 from .api_token import ApiToken
 from .feedback import Feedback
 from .notification import Notification
+from .slow_query import SlowQuery
 from .website_page_visits import WebsitePageVisit
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+import pandas
+from django.db import DatabaseError, connections
+from django.db.models import Avg, Count, Max
+
+from simmate.config import settings
+from simmate.database.core import DatabaseTable, table_column
+
+
+class SlowQuery(DatabaseTable):
+    """
+    Records database queries that took longer than the
+    `website.query_profiling.threshold` setting, so that filter combinations
+    that give poor query plans (e.g. sequential scans on large tables) can be
+    found and indexed.
+
+    Profiling is opt-in and enabled with the `website.query_profiling.enabled`
+    setting. Queries are then recorded for all data explorer and REST API
+    searches, and you can profile your own code with:
+
+    ``` python
+    from simmate.website.core.models import SlowQuery
+
+    with SlowQuery.profile(table_name="MatprojStructure", filters=filters):
+        ...
+    ```
+
+    Recorded queries can be viewed with `simmate database slow-queries`. They
+    are left out of the data explorer on purpose, because the SQL and its
+    parameters can include user filter values (e.g. emails).
+    """
+
+    class Meta:
+        db_table = "django_slow_queries"
+
+    updated_at = None
+
+    table_name = table_column.CharField(max_length=100, db_index=True)
+    """
+    The name of the table that was being searched (e.g. "MatprojStructure")
+    """
+
+    filter_signature = table_column.TextField(db_index=True)
+    """
+    The filters and ordering used, without their values. Queries with the same
+    signature typically share a query plan, so this is used to group them.
+
+    For example, `{"spacegroup__number": 229, "nsites__lte": 10}` ordered by
+    "-id" gives "nsites__lte,spacegroup__number|order_by=-id"
+    """
+
+    filters = table_column.JSONField(blank=True, null=True)
+    """
+    The full filters (with values) that were used
+    """
+
+    sql = table_column.TextField()
+    """
+    The SQL that was run, with its parameters filled in
+    """
+
+    duration = table_column.FloatField()
+    """
+    How long the query took to run (in seconds)
+    """
+
+    nrows = table_column.IntegerField(blank=True, null=True)
+    """
+    The number of rows returned or changed by the query, if the database
+    reports it
+    """
+
+    query_plan = table_column.JSONField(blank=True, null=True)
+    """
+    The query plan given by `EXPLAIN` (on PostgreSQL) or `EXPLAIN QUERY PLAN`
+    (on SQLite). The query is not run again, so this is the planner's estimate.
+    """
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def get_filter_signature(filters: dict, order_by: str | list[str] = None) -> str:
+        """
+        Gives the signature used to group queries (see `filter_signature`)
+        """
+        signature = ",".join(sorted(filters or {}))
+        if order_by:
+            if isinstance(order_by, str):
+                order_by = [order_by]
+            signature += f"|order_by={','.join(order_by)}"
+        return signature
+
+    @classmethod
+    @contextmanager
+    def profile(
+        cls,
+        table_name: str,
+        filters: dict = None,
+        order_by: str | list[str] = None,
+        threshold: float = None,
+        explain: bool = None,
+        using: str = "default",
+    ):
+        """
+        Records all queries run within this context that take longer than
+        `threshold` seconds. Defaults come from the `website.query_profiling`
+        settings, and nothing is recorded if profiling is disabled there
+        (unless a threshold is given directly).
+
+        The list of recorded queries is given by the context manager.
+        """
+        config = settings.website.query_profiling
+        if threshold is None:
+            threshold = config.threshold if config.enabled else None
+        if explain is None:
+            explain = config.explain
+
+        records = []
+        if threshold is None:
+            yield records
+            return
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= threshold and not many:
+                    rowcount = getattr(context["cursor"], "rowcount", -1)
+                    records.append(
+                        dict(
+                            sql=sql,
+                            params=params,
+                            duration=duration,
+                            nrows=rowcount if rowcount >= 0 else None,
+                        )
+                    )
+
+        connection = connections[using]
+        with connection.execute_wrapper(record_query):
+            yield records
+
+        # we save outside of the wrapper so that these queries aren't recorded
+        try:
+            cls._save_records(
+                records,
+                table_name=table_name,
+                filters=filters,
+                order_by=order_by,
+                explain=explain,
+                using=using,
+            )
+        except DatabaseError as error:
+            # profiling should never break the search itself
+            logging.warning(f"Failed to record slow queries: {error}")
+
+    @classmethod
+    def _save_records(
+        cls,
+        records: list[dict],
+        table_name: str,
+        filters: dict,
+        order_by: str | list[str],
+        explain: bool,
+        using: str,
+    ):
+        if not records:
+            return
+
+        connection = connections[using]
+        signature = cls.get_filter_signature(filters, order_by)
+        slow_queries = []
+        for record in records:
+            with connection.cursor() as cursor:
+                # psycopg can fill in the parameters for us
+                if hasattr(cursor, "mogrify"):
+                    sql = cursor.mogrify(record["sql"], record["params"])
+                    sql = sql.decode() if isinstance(sql, bytes) else sql
+                else:
+                    sql = f"{record['sql']} -- params: {record['params']}"
+                query_plan = (
+                    cls._explain(cursor, connection.vendor, record) if explain else None
+                )
+            slow_queries.append(
+                cls(
+                    table_name=table_name,
+                    filter_signature=signature,
+                    filters=filters,
+                    sql=sql,
+                    duration=record["duration"],
+                    nrows=record["nrows"],
+                    query_plan=query_plan,
+                )
+            )
+        cls.objects.using(using).bulk_create(slow_queries)
+
+    @staticmethod
+    def _explain(cursor, vendor: str, record: dict):
+        if not record["sql"].lstrip().upper().startswith("SELECT"):
+            return None
+        if vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {record['sql']}", record["params"])
+            plan = cursor.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+        elif vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {record['sql']}", record["params"])
+            return [row[-1] for row in cursor.fetchall()]
+        return None
+
+    @classmethod
+    def get_summary(cls, limit: int = 25) -> pandas.DataFrame:
+        """
+        Groups the recorded queries by table and filter signature, giving the
+        number of slow queries and their mean/max duration, with the slowest
+        signatures first.
+        """
+        summary = (
+            cls.objects.values("table_name", "filter_signature")
+            .annotate(
+                nqueries=Count("id"),
+                mean_duration=Avg("duration"),
+                max_duration=Max("duration"),
+            )
+            .order_by("-max_duration")[:limit]
+        )
+        return pandas.DataFrame.from_records(
+            list(summary),
+            columns=[
+                "table_name",
+                "filter_signature",
+                "nqueries",
+                "mean_duration",
+                "max_duration",
+            ],
+        )
@@ -7,6 +7,7 @@ class EntriesMixin:
     pagination_urls = None
     report = None
     total = None
+    total_is_exact = True
     entries = None
 
     @property
@@ -19,6 +20,7 @@ class EntriesMixin:
             self.pagination_urls = self.initial_context.get("pagination_urls")
             self.report = self.initial_context.get("report")
             self.total = self.initial_context.get("total")
+            self.total_is_exact = self.initial_context.get("total_is_exact", True)
             self.entries = self.initial_context.get("entries")
 
             # if entries isn't explicitly provided, we fallback to the
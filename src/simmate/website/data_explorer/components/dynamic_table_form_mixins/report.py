@@ -17,6 +17,8 @@ class ReportMixin:
             data_source = cls.table.objects  # use full table by default
         elif hasattr(data_source, "paginator"):  # checks if it's a Page object
             data_source = data_source.paginator.object_list
+        elif hasattr(data_source, "all_results"):  # checks if it's a CursorPage
+            data_source = data_source.all_results
 
         columns = cls.report_df_columns
         df = data_source.to_dataframe(columns)
@@ -39,6 +39,13 @@ def test_table_views(client, table_name):
     assert response.status_code == 200
     assertTemplateUsed(response, "data_explorer/dashboard.html")
 
+    # json api with keyset pagination
+    response = client.get(url, {"format": "json", "cursor": ""})
+    assert response.status_code == 200
+    assert response.json()["next"] is None
+    response = client.get(url, {"format": "json", "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
     # detail view
     url = reverse(
         "data_explorer:table-entry",
@@ -51,3 +58,54 @@ def test_table_views(client, table_name):
     response = client.get(url)
     assert response.status_code == 404
     # assertTemplateUsed(response, "data_explorer/entry.html")
+
+
+@pytest.mark.django_db
+def test_table_view_cursor(client, sample_structures):
+    from simmate.apps.materials_project.models import MatprojStructure
+
+    for i, structure in enumerate(sample_structures.values()):
+        MatprojStructure.from_toolkit(id=f"mp-{i}", structure=structure).save()
+
+    url = reverse("data_explorer:table", kwargs={"table_name": "MatprojStructure"})
+
+    # the web ui also supports keyset pagination
+    response = client.get(url, {"cursor": "", "page_size": 2})
+    assert response.status_code == 200
+    assertTemplateUsed(response, "data_explorer/dashboard.html")
+    assert response.context["total"] == len(sample_structures)
+    assert "cursor=" in response.context["pagination_urls"]["next"]
+    assert b"Showing <b>2</b> of" in response.content
+
+    response = client.get(url, {"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_query_profiling(client, monkeypatch):
+    from simmate.config import settings
+    from simmate.website.core.models import SlowQuery
+
+    profiling = settings.final_settings["website"]["query_profiling"]
+    monkeypatch.setitem(profiling, "enabled", True)
+    monkeypatch.setitem(profiling, "threshold", 0)  # record every query
+
+    url = reverse("data_explorer:table", kwargs={"table_name": "MatprojStructure"})
+    response = client.get(url, {"format": "json", "nsites__lte": 4, "order_by": "-id"})
+    assert response.status_code == 200
+
+    queries = SlowQuery.objects.filter(table_name="MatprojStructure")
+    assert queries.exists()
+    query = queries.first()
+    assert query.filter_signature == "nsites__lte|order_by=-id"
+    assert query.filters == {"nsites__lte": 4}
+    assert query.query_plan  # from "EXPLAIN QUERY PLAN" on sqlite
+
+    summary = SlowQuery.get_summary()
+    assert summary.filter_signature.tolist() == ["nsites__lte|order_by=-id"]
+
+    # recorded queries can hold user filter values, so they are never served
+    # by the data explorer
+    from simmate.website.data_explorer.views import _SAFE_COMPONENTS
+
+    assert SlowQuery.table_name not in _SAFE_COMPONENTS
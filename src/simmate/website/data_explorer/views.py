@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, render
 
 from simmate.config import settings
 from simmate.database.core import DatabaseTable
+from simmate.database.core.search_results import CursorPage, InvalidCursorError
+from simmate.toolkit.file_converters.structure.binary import BinaryStructureAdapter
+from simmate.website.core.models import SlowQuery
 from simmate.website.htmx.utils import get_component
-from simmate.website.utils import get_pagination_urls
+from simmate.website.utils import get_pagination_urls, parse_request_get
 
 # -----------------------------------------------------------------------------
 
@@ -118,6 +121,17 @@ def table_about(request, table_name):
 
 
 def table_entries(request, table_name):
+    # slow queries are only recorded when profiling is enabled in settings
+    filter_config = parse_request_get(request, include_format=False, group_filters=True)
+    with SlowQuery.profile(
+        table_name=table_name,
+        filters=filter_config["filters"],
+        order_by=filter_config.get("order_by", None),
+    ):
+        return _table_entries(request, table_name, filter_config)
+
+
+def _table_entries(request, table_name, filter_config: dict):
 
     component_class = _SAFE_COMPONENTS[table_name]
     component = component_class(component_type="dashboard", request=request)
@@ -128,15 +142,29 @@ def table_entries(request, table_name):
     # check whether this is a web ui, API, or download request
     view_format = request.GET.get("format", "html")
 
+    # bad pagination cursors (e.g. edited by hand or from an old link) come
+    # from the user, so these are reported as a bad request
+    if view_format in ("html", "json"):
+        try:
+            page = table.filter_from_config(**filter_config, use_web_queryset=True)
+        except InvalidCursorError:
+            if view_format == "json":
+                return JsonResponse({"error": "Invalid cursor."}, status=400)
+            return HttpResponseBadRequest("Invalid pagination cursor")
+
+    # keyset pages (from a "cursor" GET arg) don't have a paginator
+    if view_format in ("html", "json"):
+        counter = page if isinstance(page, CursorPage) else page.paginator
+
     if view_format == "html":
-        page = table.filter_from_request(request)
         pagination_urls = get_pagination_urls(request, page)
         context = {
             "component": component,
             "table": table,
             "page": page,
             "pagination_urls": pagination_urls,
-            "total": page.paginator.count,  # often limited to 10k
+            "total": counter.count,  # often limited to 10k
+            "total_is_exact": counter.count_is_exact,
             "report": component.get_report(page),
             # "paginator": page.paginator,
             # "entries": page.object_list,  # page.paginator.object_list gives ALL results
@@ -150,19 +178,28 @@ def table_entries(request, table_name):
         return render(request, template, context)
 
     elif view_format == "json":
-        page = table.filter_from_request(request)
         pagination_urls = get_pagination_urls(request, page)
         return page.object_list.to_json_response(
             next_url=pagination_urls["next"],
             previous_url=pagination_urls["previous"],
+            count=counter.count,
+            count_is_exact=counter.count_is_exact,
         )
 
     elif view_format == "csv":
-        objects = table.filter_from_request(request, paginate=False)
+        objects = table.filter_from_config(
+            **filter_config,
+            paginate=False,
+            use_web_queryset=True,
+        )
         return objects.to_csv_response(mode="api")
 
     elif view_format == "curated-csv":
-        objects = table.filter_from_request(request, paginate=False)
+        objects = table.filter_from_config(
+            **filter_config,
+            paginate=False,
+            use_web_queryset=True,
+        )
         return objects.to_csv_response(mode="curated")
 
     # TODO: add support for CIF, SDF, and other mol/crystal formats
@@ -214,7 +251,9 @@ def table_entry(request, table_name, table_entry_id):
         return response
 
     elif view_format == "input":
-        content = table_entry.structure
+        # binary structures aren't human-readable, so we give the format
+        # that older versions of Simmate stored
+        content = BinaryStructureAdapter.to_text(table_entry.structure)
         response = HttpResponse(content, content_type="text/plain")
         response["Content-Disposition"] = (
             f'attachment; filename="{table_entry_id}_input.txt"'
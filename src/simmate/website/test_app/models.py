@@ -6,6 +6,7 @@ from simmate.database.mixins import (
     Forces,
     Structure,
     Thermodynamics,
+    WorkflowPopulator,
 )
 
 
@@ -19,7 +20,8 @@ class TestDatabaseTable(DatabaseTable):
         app_label = "test_app"
 
 
-class TestStructure(Structure):
+# WorkflowPopulator adds no columns, so we include it here to test it
+class TestStructure(Structure, WorkflowPopulator):
     pass
 
 
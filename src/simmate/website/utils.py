@@ -147,6 +147,25 @@ def remove_query_param(url: str, key: str) -> str:
 
 
 def get_pagination_urls(request, current_page) -> dict:
+    from simmate.database.core.search_results import CursorPage
+
+    # keyset pagination gives cursors rather than page numbers
+    if isinstance(current_page, CursorPage):
+        current_url = request.get_full_path()
+        return {
+            "previous": (
+                replace_query_param(current_url, "cursor", current_page.previous_cursor)
+                if current_page.has_previous()
+                else None
+            ),
+            "next": (
+                replace_query_param(current_url, "cursor", current_page.next_cursor)
+                if current_page.has_next()
+                else None
+            ),
+            "elided_pages": [],
+        }
+
     # OPTIMIZE: not sure if there is a better way to do this...
 
     # Clean up current URL to ensure we have the page GET arg present
@@ -227,7 +246,7 @@ def parse_request_get(
     # the defaults set elsewhere
     extra_kwargs = {
         key: url_get_args.pop(key)
-        for key in ["order_by", "limit", "page", "page_size"]
+        for key in ["order_by", "limit", "page", "page_size", "cursor"]
         if key in url_get_args.keys()
     }
 
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workflow_explorer", "0013_remove_workitem_command_not_found_failures"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bandstructurecalc",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="chemicalsystemsearch",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="densityofstatescalc",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="diffusionanalysis",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="dynamics",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="fixedcompositionsearch",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="migrationhop",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="relaxation",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="stagedrelaxstatic",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="staticenergy",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="variablensitescompositionsearch",
+            name="input_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import simmate.database.core.archive
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workflow_explorer", "0014_bandstructurecalc_input_hash_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PopulationAnalysisSite",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, db_index=True, null=True),
+                ),
+                ("number", models.IntegerField()),
+                ("element", models.CharField(db_index=True, max_length=5)),
+                (
+                    "oxidation_state",
+                    models.FloatField(blank=True, db_index=True, null=True),
+                ),
+                ("charge", models.FloatField(blank=True, db_index=True, null=True)),
+                ("min_dist", models.FloatField(blank=True, null=True)),
+                (
+                    "atomic_volume",
+                    models.FloatField(blank=True, db_index=True, null=True),
+                ),
+                (
+                    "population_analysis",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sites",
+                        to="workflow_explorer.populationanalysis",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "workflows_populationanalysissite",
+            },
+            bases=(models.Model, simmate.database.core.archive.ArchiveMixin),
+        ),
+    ]
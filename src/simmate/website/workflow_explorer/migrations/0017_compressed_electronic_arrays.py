@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workflow_explorer", "0016_element_bits"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bandstructurecalc",
+            name="band_structure_arrays",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="densityofstatescalc",
+            name="density_of_states_arrays",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+import simmate.database.core.archive
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workflow_explorer", "0017_compressed_electronic_arrays"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DistinctPathSearch",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, db_index=True, null=True),
+                ),
+                ("structure_hash", models.CharField(db_index=True, max_length=40)),
+                ("migrating_specie", models.CharField(max_length=10)),
+                ("max_path_length", models.FloatField(blank=True, null=True)),
+                ("symprec", models.FloatField()),
+                ("percolation_mode", models.CharField(max_length=10)),
+                ("migration_hops", models.JSONField(default=list)),
+            ],
+            options={
+                "db_table": "workflows_distinctpathsearch",
+            },
+            bases=(models.Model, simmate.database.core.archive.ArchiveMixin),
+        ),
+    ]
@@ -32,6 +32,38 @@ class StagedWorkflow(Workflow):
 
     files_to_copy = []  # Files that should be copied from one run to the next
 
+    subworkflow_dependencies: dict[str, list[str]] = None
+    """
+    Optional mapping of a subworkflow name to the names of the subworkflows
+    that must finish before it can start. A stage is given the structure and
+    directory of its first dependency, and stages with no dependencies start
+    from the input structure.
+
+    For example, a static energy and a density of states calculation that both
+    start from the same relaxation can be declared as independent:
+    ``` python
+    subworkflow_dependencies = {
+        "static-energy.vasp.matproj": ["relaxation.vasp.matproj"],
+        "electronic-structure.vasp.matproj-density-of-states": [
+            "relaxation.vasp.matproj"
+        ],
+    }
+    ```
+
+    When not set, stages run as a linear chain in the order of
+    `subworkflow_names` (i.e. each stage depends on the one before it).
+    """
+
+    parallel_subworkflows: bool | str = False
+    """
+    How independent stages (see `subworkflow_dependencies`) are run:
+
+    - `False` (or "single"): one stage at a time, in order
+    - `True` (or "thread"): concurrently within this process
+    - "job": concurrently, with each stage submitted using `run_cloud` and
+      picked up by workers
+    """
+
     use_database = False
 
     @classmethod
@@ -44,30 +76,23 @@ class StagedWorkflow(Workflow):
         **kwargs,
     ):
         subworkflow_kwargs = subworkflow_kwargs or {}
-        subworkflow_runs = []
-        result = None
-
-        for i, current_task in enumerate(cls.subworkflows):
-            new_directory = directory / current_task.name_full
-            if i == 0:
-                result = current_task.run(
-                    structure=structure,
-                    directory=new_directory,
-                    **subworkflow_kwargs,
-                )
-            else:
-                result = current_task.run(
-                    structure=result,  # this is the result of the last run
-                    directory=new_directory,
-                    previous_directory=result.directory,
-                    **subworkflow_kwargs,
-                )
+        results = cls._run_subworkflows(
+            structure=structure,
+            directory=directory,
+            subworkflow_kwargs=subworkflow_kwargs,
+        )
 
-            if hasattr(result, "id") and hasattr(result, "_meta"):
+        # the final stage is always the one listed last in subworkflow_names
+        result = results[cls.subworkflows[-1].name_full]
+
+        subworkflow_runs = []
+        for current_task in cls.subworkflows:
+            stage_result = results[current_task.name_full]
+            if hasattr(stage_result, "id") and hasattr(stage_result, "_meta"):
                 subworkflow_runs.append(
                     {
-                        "table_name": result._meta.db_table,
-                        "id": result.id,
+                        "table_name": stage_result._meta.db_table,
+                        "id": stage_result.id,
                     }
                 )
 
@@ -82,6 +107,139 @@ class StagedWorkflow(Workflow):
             "lattice_stress": getattr(result, "lattice_stress", None),
         }
 
+    @classmethod
+    def _run_subworkflows(
+        cls,
+        structure: Structure,
+        directory: Path,
+        subworkflow_kwargs: dict,
+    ) -> dict:
+        """
+        Runs every stage once all of its dependencies have finished, and
+        returns a dictionary of subworkflow names mapped to their results.
+        """
+
+        if cls.parallel_subworkflows not in [False, True, "single", "thread", "job"]:
+            raise Exception(
+                f"Unknown parallel mode for subworkflows: {cls.parallel_subworkflows}"
+            )
+
+        dependencies = cls.stage_dependencies
+        subworkflows = {s.name_full: s for s in cls.subworkflows}
+
+        def run_stage(name: str, upstream_result: any = None):
+            current_task = subworkflows[name]
+            stage_kwargs = dict(
+                structure=structure if upstream_result is None else upstream_result,
+                directory=directory / name,
+                **subworkflow_kwargs,
+            )
+            if getattr(upstream_result, "directory", None):
+                stage_kwargs["previous_directory"] = upstream_result.directory
+
+            if cls.parallel_subworkflows == "job":
+                return current_task.run_cloud(**stage_kwargs).result()
+
+            try:
+                return current_task.run(**stage_kwargs)
+            finally:
+                if cls.parallel_subworkflows not in [False, "single"]:
+                    # each thread opens its own database connection, which we
+                    # close once the stage is done (even if it failed)
+                    from django.db import connection
+
+                    connection.close()
+
+        def get_upstream_result(name: str):
+            if not dependencies[name]:
+                return None
+            upstream_name = dependencies[name][0]
+            upstream_result = results[upstream_name]
+            if upstream_result is None:
+                raise Exception(
+                    f"The '{upstream_name}' stage did not give a result, so the "
+                    f"'{name}' stage that depends on it cannot be started."
+                )
+            return upstream_result
+
+        results = {}
+
+        # Run stages one at a time in an order that respects dependencies.
+        # Without custom dependencies, this is simply the listed order.
+        if cls.parallel_subworkflows in [False, "single"]:
+            for name in cls._get_stage_order(dependencies):
+                results[name] = run_stage(name, get_upstream_result(name))
+            return results
+
+        # Otherwise, launch every stage as soon as its dependencies are met
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        pending = list(dependencies.keys())
+        running = {}
+        with ThreadPoolExecutor(max_workers=len(dependencies)) as executor:
+            while pending or running:
+                for name in [
+                    n for n in pending if all(dep in results for dep in dependencies[n])
+                ]:
+                    pending.remove(name)
+                    future = executor.submit(run_stage, name, get_upstream_result(name))
+                    running[future] = name
+                finished, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # raises the error of the failed stage (if there was one)
+                    results[running.pop(future)] = future.result()
+
+        return results
+
+    @classmethod
+    @property
+    def stage_dependencies(cls) -> dict[str, list[str]]:
+        """
+        Gives a dictionary of every subworkflow name mapped to the names of
+        the subworkflows it depends on. See `subworkflow_dependencies`.
+        """
+        names = [s.name_full for s in cls.subworkflows]
+
+        if cls.subworkflow_dependencies is None:
+            return {
+                name: [names[i - 1]] if i > 0 else [] for i, name in enumerate(names)
+            }
+
+        dependencies = {
+            name: list(cls.subworkflow_dependencies.get(name, [])) for name in names
+        }
+        for name, upstream_names in dependencies.items():
+            for upstream_name in upstream_names:
+                if upstream_name not in dependencies:
+                    raise Exception(
+                        f"The stage '{name}' depends on '{upstream_name}', which "
+                        "is not one of the subworkflows."
+                    )
+        # this also checks that there are no circular dependencies
+        cls._get_stage_order(dependencies)
+
+        return dependencies
+
+    @staticmethod
+    def _get_stage_order(dependencies: dict[str, list[str]]) -> list[str]:
+        """
+        Sorts stages so that every stage comes after all of its dependencies,
+        keeping the listed order wherever possible.
+        """
+        order = []
+        remaining = list(dependencies.keys())
+        while remaining:
+            ready = [
+                n for n in remaining if all(dep in order for dep in dependencies[n])
+            ]
+            if not ready:
+                raise Exception(
+                    f"Circular dependency found between the stages: {remaining}"
+                )
+            order.append(ready[0])
+            remaining.remove(ready[0])
+        return order
+
     @classmethod
     @property
     @cache
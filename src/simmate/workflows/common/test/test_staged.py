@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from simmate.workflows import Workflow
+from simmate.workflows.common import StagedWorkflow
+
+# Used to check that independent stages are running at the same time. If the
+# two stages were ran one after the other, the first would time out waiting.
+BARRIER = threading.Barrier(2, timeout=10)
+
+
+class Dummy__Stage__Relax(Workflow):
+    use_database = False
+
+    @staticmethod
+    def run_config(structure, **kwargs):
+        return structure
+
+
+class Dummy__Stage__Static(Workflow):
+    use_database = False
+
+    @staticmethod
+    def run_config(structure, **kwargs):
+        BARRIER.wait()
+        return structure
+
+
+class Dummy__Stage__Dos(Workflow):
+    use_database = False
+
+    @staticmethod
+    def run_config(structure, **kwargs):
+        BARRIER.wait()
+        return structure
+
+
+class Dummy__Stage__Empty(Workflow):
+    use_database = False
+
+    @staticmethod
+    def run_config(**kwargs):
+        return None
+
+
+class Dummy__Stage__Chain(StagedWorkflow):
+    subworkflow_names = [Dummy__Stage__Relax, Dummy__Stage__Static]
+
+
+class Dummy__Stage__Branched(StagedWorkflow):
+    subworkflow_names = [
+        Dummy__Stage__Relax,
+        Dummy__Stage__Static,
+        Dummy__Stage__Dos,
+    ]
+    subworkflow_dependencies = {
+        "dummy.stage.static": ["dummy.stage.relax"],
+        "dummy.stage.dos": ["dummy.stage.relax"],
+    }
+    parallel_subworkflows = "thread"
+
+
+class Dummy__Stage__Broken(StagedWorkflow):
+    subworkflow_names = [Dummy__Stage__Empty, Dummy__Stage__Relax]
+
+
+def test_stage_dependencies():
+    assert Dummy__Stage__Chain.stage_dependencies == {
+        "dummy.stage.relax": [],
+        "dummy.stage.static": ["dummy.stage.relax"],
+    }
+    assert Dummy__Stage__Branched.stage_dependencies == {
+        "dummy.stage.relax": [],
+        "dummy.stage.static": ["dummy.stage.relax"],
+        "dummy.stage.dos": ["dummy.stage.relax"],
+    }
+
+    # circular dependencies are caught
+    order = StagedWorkflow._get_stage_order({"a": [], "b": ["c"], "c": ["a"]})
+    assert order == ["a", "c", "b"]
+    with pytest.raises(Exception):
+        StagedWorkflow._get_stage_order({"a": ["b"], "b": ["a"]})
+
+
+def test_staged_workflow_concurrent(sample_structures, tmp_path):
+    structure = sample_structures["C_mp-48_primitive"]
+    result = Dummy__Stage__Branched.run(structure=structure, directory=tmp_path)
+    assert result == structure
+    for name in ["relax", "static", "dos"]:
+        assert (tmp_path / f"dummy.stage.{name}").exists()
+
+
+def test_staged_workflow_missing_result(sample_structures, tmp_path):
+    # a stage must not silently fall back to the input structure when the
+    # stage it depends on gave no result
+    structure = sample_structures["C_mp-48_primitive"]
+    with pytest.raises(Exception, match="did not give a result"):
+        Dummy__Stage__Broken.run(structure=structure, directory=tmp_path)
+    assert not (tmp_path / "dummy.stage.relax").exists()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module defines the RuntimeModel, which learns how long a workflow takes
+to run from its past completed runs.
+"""
+
+import logging
+from datetime import timedelta
+
+import numpy
+from django.db import DatabaseError
+from django.utils import timezone
+
+
+class RuntimeModel:
+    """
+    Predicts the real and CPU time of a workflow run using the completed runs
+    stored in the workflow's database table.
+
+    For each workflow, we fit a power law of the form...
+
+    `time = c * nsites^a * nelements^b * ...`
+
+    ...which is a linear least-squares fit in log space. Only the feature
+    columns that the table actually has are used (see `feature_columns`), and
+    when there are too few past runs to fit, we fall back to the median time.
+
+    The fit only needs running sums (X^T X and X^T y), so new runs are added
+    incrementally when the model is refreshed rather than reloading the
+    entire table.
+
+    Models are cached per workflow, so you should use `get` rather than
+    creating a new model directly:
+
+    ``` python
+    from simmate.workflows.core.runtime_model import RuntimeModel
+
+    model = RuntimeModel.get(my_workflow)
+    model.median_real_time
+    model.predict(structure=my_structure, mode="cpu")
+    ```
+    """
+
+    feature_columns: list[str] = ["nsites", "nelements", "nkpoints"]
+    """
+    Columns that are used as features when they are present in the table.
+    """
+
+    refresh_interval: timedelta = timedelta(hours=1)
+    """
+    How long a cached model is used before checking the database for new runs.
+    """
+
+    min_runs_to_fit: int = 10
+    """
+    The minimum number of past runs required before fitting. With fewer runs,
+    predictions are the median time.
+    """
+
+    _models: dict = {}  # cache of {workflow_name: RuntimeModel}
+
+    def __init__(self, workflow):  # workflow: Workflow
+        self.workflow = workflow
+        self.features = self._get_features()
+
+        # running sums for the least squares fit in log space
+        nterms = len(self.features) + 1  # +1 for the intercept
+        self._xtx = {
+            "real": numpy.zeros((nterms, nterms)),
+            "cpu": numpy.zeros((nterms, nterms)),
+        }
+        self._xty = {
+            "real": numpy.zeros(nterms),
+            "cpu": numpy.zeros(nterms),
+        }
+        self._times = {"real": [], "cpu": []}
+        self._nfitted = {"real": 0, "cpu": 0}
+
+        self._last_finished_at = None
+        self._last_refreshed_at = None
+
+    @classmethod
+    def get(cls, workflow):  # -> RuntimeModel
+        """
+        Gives the cached model for a workflow, refreshing it with any new
+        runs if it is older than `refresh_interval`.
+        """
+        model = cls._models.get(workflow.name_full, None)
+        if not model:
+            model = cls(workflow)
+            cls._models[workflow.name_full] = model
+
+        if (
+            not model._last_refreshed_at
+            or timezone.now() - model._last_refreshed_at > cls.refresh_interval
+        ):
+            model.refresh()
+
+        return model
+
+    def _get_features(self) -> list[str]:
+        if not self.workflow.use_database:
+            return []
+        try:
+            columns = self.workflow.database_table.get_column_names()
+        except NotImplementedError:
+            return []  # the workflow has no table
+        return [c for c in self.feature_columns if c in columns]
+
+    # -------------------------------------------------------------------------
+
+    def refresh(self):
+        """
+        Adds any runs that completed since the last refresh to the model.
+        """
+        self._last_refreshed_at = timezone.now()
+
+        if not self.workflow.use_database:
+            return
+
+        try:
+            new_runs = self.workflow.all_results.filter(
+                status="Completed",
+                total_time__isnull=False,
+                finished_at__isnull=False,
+            )
+            if self._last_finished_at:
+                new_runs = new_runs.filter(finished_at__gt=self._last_finished_at)
+            rows = list(
+                new_runs.order_by("finished_at").values_list(
+                    "run_id",
+                    "finished_at",
+                    "total_time",
+                    *self.features,
+                )
+            )
+        except (DatabaseError, NotImplementedError) as error:
+            logging.warning(
+                f"Unable to load past runs of {self.workflow.name_full}: {error}"
+            )
+            return
+
+        if not rows:
+            return
+        self._last_finished_at = rows[-1][1]
+
+        # CPU time is the real time multiplied by the number of cores that the
+        # worker had. Runs that were not done by a worker are assumed to use
+        # a single core.
+        ncores_map = self._get_ncores([row[0] for row in rows])
+
+        for run_id, _, total_time, *features in rows:
+            ncores = ncores_map.get(str(run_id), None) or 1
+            for mode, time in [("real", total_time), ("cpu", total_time * ncores)]:
+                self._times[mode].append(time)
+                # only positive values can be used in log space
+                if time <= 0 or any(not f or f <= 0 for f in features):
+                    continue
+                x = numpy.array([1, *numpy.log(features)])  # 1 is the intercept
+                self._xtx[mode] += numpy.outer(x, x)
+                self._xty[mode] += x * numpy.log(time)
+                self._nfitted[mode] += 1
+
+    @staticmethod
+    def _get_ncores(run_ids: list[str]) -> dict:
+        from simmate.compute.work_item import WorkItem
+
+        run_ids = [r for r in run_ids if r]
+        return {
+            str(workitem_id): ncores
+            for workitem_id, ncores in WorkItem.objects.filter(
+                id__in=run_ids
+            ).values_list("id", "worker__ncores")
+        }
+
+    # -------------------------------------------------------------------------
+
+    @property
+    def nruns(self) -> int:
+        """
+        The number of past runs that the model was built from.
+        """
+        return len(self._times["real"])
+
+    @property
+    def median_real_time(self) -> float:
+        """
+        The median real time (in seconds) of all past runs.
+        """
+        times = self._times["real"]
+        return float(numpy.median(times)) if times else None
+
+    @property
+    def median_cpu_time(self) -> float:
+        """
+        The median CPU time (in seconds) of all past runs.
+        """
+        times = self._times["cpu"]
+        return float(numpy.median(times)) if times else None
+
+    def get_coefficients(self, mode: str = "real") -> numpy.ndarray:
+        """
+        Gives the fitted coefficients in log space, where the first value is
+        the intercept and the rest follow the order of `features`. None is
+        returned if there are too few runs to fit.
+        """
+        if self._nfitted[mode] < max(self.min_runs_to_fit, len(self.features) + 2):
+            return None
+        # lstsq handles the case where a feature never changes (singular matrix)
+        coefficients, *_ = numpy.linalg.lstsq(
+            self._xtx[mode],
+            self._xty[mode],
+            rcond=None,
+        )
+        return coefficients
+
+    def get_feature_values(self, **kwargs) -> list[float]:
+        """
+        Given the inputs of a workflow run, this gives the value of each
+        feature. None is returned if any feature can't be determined.
+        """
+        structure = kwargs.get("structure", None)
+        if structure is None:
+            return None
+
+        from simmate.toolkit import Structure
+
+        structure = Structure.from_dynamic(structure)
+        values = {
+            "nsites": structure.num_sites,
+            "nelements": len(structure.composition),
+        }
+        if any(f not in values for f in self.features):
+            return None
+        return [values[f] for f in self.features]
+
+    def predict(self, mode: str = "real", **kwargs) -> float:
+        """
+        Predicts the time (in seconds) of a workflow run given the inputs that
+        would be passed to `run` (such as structure). Mode can be "real" or
+        "cpu". If there are no past runs, None is returned.
+        """
+        median = self.median_real_time if mode == "real" else self.median_cpu_time
+        coefficients = self.get_coefficients(mode)
+        if coefficients is None or not self.features:
+            return median
+
+        values = self.get_feature_values(**kwargs)
+        if not values:
+            return median
+
+        x = numpy.array([1, *numpy.log(values)])
+        return float(numpy.exp(x @ coefficients))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from django.utils import timezone
+
+from simmate.database.workflow_results import StaticEnergy
+from simmate.workflows import Workflow
+from simmate.workflows.core.runtime_model import RuntimeModel
+
+
+class StaticEnergy__DummyCaclulator__Timed(Workflow):
+    database_table = StaticEnergy
+
+
+@pytest.mark.django_db
+def test_runtime_model(sample_structures):
+    flow = StaticEnergy__DummyCaclulator__Timed
+    RuntimeModel._models.pop(flow.name_full, None)  # clear cache
+
+    # no past runs
+    assert flow.median_real_time is None
+    assert (
+        flow.predict_cpu_time(structure=sample_structures["C_mp-48_primitive"]) is None
+    )
+
+    # add past runs where time = 5 * nsites^2
+    structure = sample_structures["C_mp-48_primitive"]
+    for n in range(1, 13):
+        supercell = structure.copy()
+        supercell.make_supercell([n, 1, 1])
+        StaticEnergy.from_toolkit(
+            structure=supercell,
+            workflow_name=flow.name_full,
+            status="Completed",
+            started_at=timezone.now(),
+            finished_at=timezone.now(),
+            total_time=5 * supercell.num_sites**2,
+        ).save()
+
+    model = RuntimeModel.get(flow)
+    assert model.nruns == 0  # cached until the next refresh
+    model.refresh()
+    assert model.nruns == 12
+    assert model.features == ["nsites", "nelements"]
+
+    # runs were not done by a worker, so they count as 1 core
+    assert flow.median_real_time == flow.median_cpu_time
+
+    supercell = structure.copy()
+    supercell.make_supercell([20, 1, 1])
+    assert flow.predict_real_time(structure=supercell) == pytest.approx(
+        5 * supercell.num_sites**2
+    )
+
+    # refreshes only add new runs
+    model.refresh()
+    assert model.nruns == 12
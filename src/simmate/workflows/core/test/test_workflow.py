@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import datetime
+
 import pytest
+from django.utils import timezone
 
+from simmate.conftest import run_benchmark
 from simmate.website.test_app.models import TestCalculation
 from simmate.workflows import Workflow
 
@@ -120,3 +124,142 @@ def test_deserialize_parameters(mocker):
     }
 
     Workflow._deserialize_parameters(**example_parameters)
+
+
+@pytest.mark.django_db
+def test_workflow_result_cache(sample_structures, tmp_path):
+    run_count = []
+
+    class DummyProject__DummyCaclulator__Cached(Workflow):
+        use_database = True
+        use_result_cache = True
+        database_table = TestCalculation
+
+        @staticmethod
+        def run_config(structure, **kwargs):
+            run_count.append(1)
+            return {}
+
+    flow = DummyProject__DummyCaclulator__Cached
+    structure = sample_structures["C_mp-48_primitive"]
+
+    # site order should not change the hash
+    structure_reordered = structure.copy()
+    structure_reordered.reverse()
+    assert flow.get_input_hash(structure=structure) == flow.get_input_hash(
+        structure=structure_reordered, directory=tmp_path / "ignored"
+    )
+
+    result1 = flow.run(structure=structure, directory=tmp_path / "run1")
+    result2 = flow.run(structure=structure_reordered, directory=tmp_path / "run2")
+    assert result1.id == result2.id
+    assert len(run_count) == 1
+    assert not (tmp_path / "run2").exists()
+
+    # cloud submissions attach to the completed run, without adding a
+    # finished job to the queue
+    from simmate.compute.work_item import WorkItem
+
+    state = flow.run_cloud(structure=structure)
+    assert state.result().id == result1.id
+    assert TestCalculation.objects.count() == 1
+    assert not WorkItem.objects.exists()
+
+    # queued runs whose job ended without finishing are not waited on
+    structure_stale = sample_structures["Si_mp-149_primitive"]
+    stale_run = flow.run(structure=structure_stale, directory=tmp_path / "run3")
+    TestCalculation.objects.filter(id=stale_run.id).update(status="Running")
+    WorkItem.objects.create(id=stale_run.run_id, fxn=b"", status="E")
+    result3 = flow.run(structure=structure_stale, directory=tmp_path / "run4")
+    assert result3.id != stale_run.id
+    assert len(run_count) == 3
+
+    # long-running runs are still waited on, no matter when they were updated
+    TestCalculation.objects.filter(id=result3.id).update(
+        status="Running",
+        updated_at=timezone.now() - datetime.timedelta(days=2),
+    )
+    result3.refresh_from_db()
+    assert flow._is_calculation_alive(result3)
+    assert not flow._is_calculation_alive(stale_run)
+
+    # a different input gives a new run
+    flow.run(structure=sample_structures["Fe_mp-13_primitive"], directory=tmp_path)
+    assert len(run_count) == 4
+
+
+def test_workflow_result_cache_previous_directory(sample_structures, tmp_path):
+    class DummyProject__DummyCaclulator__FromPrevious(Workflow):
+        use_database = True
+        use_result_cache = True
+        use_previous_directory = True
+        database_table = TestCalculation
+
+    flow = DummyProject__DummyCaclulator__FromPrevious
+    structure = sample_structures["C_mp-48_primitive"]
+
+    # the same structure from different past calculations gives new runs
+    hash1 = flow.get_input_hash(structure=structure, previous_directory=tmp_path / "a")
+    hash2 = flow.get_input_hash(structure=structure, previous_directory=tmp_path / "b")
+    assert hash1 != hash2
+    assert hash1 == flow.get_input_hash(
+        structure=structure, previous_directory=tmp_path / "a"
+    )
+
+
+class DummyProject__DummyCaclulator__Registered(Workflow):
+    use_database = True
+    database_table = TestCalculation
+
+    @staticmethod
+    def run_config(structure, **kwargs):
+        return {}
+
+
+@pytest.mark.django_db
+def test_workflow_registration(
+    sample_structures,
+    tmp_path,
+    django_assert_max_num_queries,
+):
+    flow = DummyProject__DummyCaclulator__Registered
+    structure = sample_structures["C_mp-48_primitive"]
+
+    # registration and saving results should only need a handful of queries
+    # (load + insert, then load + update + results)
+    with django_assert_max_num_queries(5):
+        result = flow.run(structure=structure, directory=tmp_path / "run1")
+    assert result.status == "Completed"
+    assert result.queue_time == 0
+    assert result.total_time >= 0
+    assert (tmp_path / "run1" / "simmate_metadata_01.yaml").exists()
+    assert (tmp_path / "run1" / "simmate_summary.yaml").exists()
+
+    # summary files can be turned off for very short runs
+    flow.write_summary_files = False
+    try:
+        result = flow.run(structure=structure, directory=tmp_path / "run2")
+    finally:
+        flow.write_summary_files = True
+    assert result.status == "Completed"
+    assert not any((tmp_path / "run2").iterdir())
+    assert TestCalculation.objects.count() == 2
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_workflow_overhead_benchmark(sample_structures, tmp_path):
+    flow = DummyProject__DummyCaclulator__Registered
+    structure = sample_structures["C_mp-48_primitive"]
+
+    def run_many(nruns: int = 50):
+        for _ in range(nruns):
+            flow.run(structure=structure, directory=tmp_path)
+
+    run_benchmark("workflow run overhead", run_many, nitems=50)
+
+    flow.write_summary_files = False
+    try:
+        run_benchmark("workflow run overhead (no summary files)", run_many, nitems=50)
+    finally:
+        flow.write_summary_files = True
@@ -6,8 +6,10 @@ import json
 import logging
 import platform
 import re
+import time
 import uuid
-from functools import wraps
+from concurrent.futures import Future
+from functools import cache, wraps
 from pathlib import Path
 
 import cloudpickle
@@ -23,9 +25,13 @@ from simmate.utils import (
     copy_directory,
     copy_files_from_directory,
     get_directory,
+    get_hash_key,
     make_archive,
+    write_yaml,
 )
 
+from .runtime_model import RuntimeModel
+
 
 class Workflow:
     """
@@ -81,6 +87,58 @@ class Workflow:
     For example, VASP calculations remove all POTCAR files from archives.
     """
 
+    write_summary_files: bool = True
+    """
+    Whether to write the `simmate_metadata_*.yaml` and `simmate_summary.yaml`
+    files to the run's directory.
+    
+    These files let users (and `load_completed_calc`) see the inputs and
+    outputs of a run without the database. For workflows that take under a
+    second and run thousands of times (e.g. featurizers), writing them can
+    take longer than the work itself, so they can be turned off here.
+    """
+
+    use_result_cache: bool = False
+    """
+    Whether to skip runs that exactly match a past run of this workflow.
+    
+    When set to True, a hash of the workflow name, version, and input
+    parameters is stored with every run (see `get_input_hash`). If a new
+    run has the same hash as a completed one, the existing database entry is
+    returned immediately. If the matching run is still pending or running,
+    we wait on it instead of starting a duplicate.
+    
+    This requires `use_database=True`. Failed and canceled runs are never
+    reused.
+    """
+
+    result_cache_timeout: float = None
+    """
+    (only used with `use_result_cache=True`) The maximum time in seconds to
+    wait on a matching run that is still pending or running. Once reached, a
+    new run is started instead. The default of None waits for as long as the
+    matching run is alive.
+    
+    Runs submitted with `run_cloud` are never waited on once their WorkItem
+    has finished or their worker has stopped, because these runs can no
+    longer complete (e.g. their job was killed).
+    """
+
+    _input_hash_ignored_parameters: list[str] = [
+        "compress_output",
+        "directory",
+        "previous_directory",  # replaced by its source calculation in the hash
+        "run_id",
+        "source",
+        "started_at",
+        "status",
+        "submitted_by_id",
+    ]
+    """
+    Parameters that never change the result of a run and are therefore left
+    out of the input hash.
+    """
+
     # -------------------------------------------------------------------------
     # Helper attributes and methods for workflows that have prerequisites and/or
     # required files from previous calculations
@@ -141,9 +199,27 @@ class Workflow:
     order to give users helpful error messages.
     """
 
+    link_previous_directory: bool = False
+    """
+    Whether files brought in by `use_previous_directory` should be hardlinked
+    rather than copied. Linking is nearly instant and uses no extra disk space,
+    which helps when handing large files (e.g. CHGCAR) from one stage of a
+    workflow to the next.
+    
+    Only set this to True if the workflow never edits those files in place
+    (e.g. an analysis that only reads a charge density), because any change
+    would also show up in the previous calculation's folder.
+    """
+
     # TODO: add `primary_input` as a class attribute that users can set! Right
     # now I just check from a list of potential inputs (see below)
     # primary_input: str = None
+    _primary_input_parameters: list[str] = [
+        "structure",
+        "molecule",
+        "migration_hop",
+        "supercell_start",
+    ]
 
     # -------------------------------------------------------------------------
     # Core methods that handle how and what a workflow run does
@@ -197,6 +273,23 @@ class Workflow:
 
         """
 
+        input_hash = None
+        if cls.use_database and cls.use_result_cache:
+            input_hash = cls.get_input_hash(source=source, **kwargs)
+            cached_entry = cls._get_cached_calculation(input_hash, run_id=run_id)
+            if cached_entry:
+                logging.info(
+                    f"Found a past run of '{cls.name_full}' with identical "
+                    f"inputs (run_id={cached_entry.run_id})"
+                )
+                cached_entry = cls._wait_for_calculation(
+                    cached_entry,
+                    timeout=cls.result_cache_timeout,
+                )
+                if cached_entry and cached_entry.status == "Completed":
+                    return cached_entry
+                logging.info("The past run did not complete. Starting a new run.")
+
         logging.info(f"Starting '{cls.name_full}'")
         kwargs_cleaned, database_entry = cls._load_input_and_register(
             run_id=run_id,
@@ -205,6 +298,7 @@ class Workflow:
             source=source,
             started_at=timezone.now(),
             status="Running",
+            input_hash=input_hash,
             **kwargs,
         )
 
@@ -279,6 +373,18 @@ class Workflow:
             workflow.
         """
 
+        input_hash = None
+        if cls.use_database and cls.use_result_cache:
+            input_hash = cls.get_input_hash(**kwargs)
+            cached_entry = cls._get_cached_calculation(input_hash)
+            cached_state = cls._get_cached_state(cached_entry) if cached_entry else None
+            if cached_state:
+                logging.info(
+                    f"Found a past run of '{cls.name_full}' with identical "
+                    f"inputs (run_id={cached_entry.run_id})"
+                )
+                return cached_state
+
         logging.info(f"Submitting new run of `{cls.name_full}` to cloud")
 
         # To help with tracking the flow in cloud, we load all of the inputs up
@@ -291,6 +397,7 @@ class Workflow:
             setup_directory=False,
             write_metadata=False,
             status="Pending",
+            input_hash=input_hash,
             **kwargs,
         )
 
@@ -509,8 +616,8 @@ class Workflow:
             )
 
         # write the output summary to file
-        calculation.write_output_summary(directory)
-        # TODO: consider making this optional to improve speedup
+        if cls.write_summary_files:
+            calculation.write_output_summary(directory)
 
         return calculation
 
@@ -628,9 +735,12 @@ class Workflow:
 
     @classmethod
     @property
+    @cache
     def parameter_names(cls) -> list[str]:
         """
         Gives a list of all the parameter names for this workflow.
+
+        The signatures of a workflow class never change, so this is cached.
         """
         # Iterate through and grab the parameters for the core methods. We also
         # sort parameters alphabetically for consistent results.
@@ -645,6 +755,7 @@ class Workflow:
 
     @classmethod
     @property
+    @cache
     def parameter_names_required(cls) -> list[str]:
         """
         Gives a list of all the required parameter names for this workflow.
@@ -685,11 +796,12 @@ class Workflow:
         Inspect the run_config and other methods to see what the default
         value for an input parameter is.
         """
+        parameter_names = cls.parameter_names
         defaults = {}
         for method in cls._parameter_methods:
             sig = inspect.signature(getattr(cls, method))
             for parameter_name in sig.parameters.keys():
-                if parameter_name in cls.parameter_names:
+                if parameter_name in parameter_names:
                     value = sig.parameters[parameter_name]
                     if value.default == value.empty:
                         continue  # dont save if the value is none
@@ -700,7 +812,7 @@ class Workflow:
         # if the parameter is set in our kwargs dictionary and check if the
         # value is set to "None". If it is, then we change to the value set as
         # the class attribute.
-        for parameter_name in cls.parameter_names:
+        for parameter_name in parameter_names:
             if hasattr(cls, parameter_name):
                 defaults[parameter_name] = getattr(cls, parameter_name)
 
@@ -751,6 +863,7 @@ class Workflow:
         setup_directory: bool = True,
         write_metadata: bool = True,
         status: str = None,
+        input_hash: str = None,
         **parameters: any,
     ) -> dict:
         """
@@ -798,12 +911,7 @@ class Workflow:
         # the primary input. I go through each one at a time until I find one
         # that was provided -- then I exit with that parameter's value.
         primary_input = None
-        for primary_input_key in [
-            "structure",
-            "molecule",
-            "migration_hop",
-            "supercell_start",
-        ]:
+        for primary_input_key in cls._primary_input_parameters:
             if primary_input_key in parameters_cleaned.keys():
                 # note we grab the deserialized input
                 primary_input = parameters_cleaned.get(primary_input_key, None)
@@ -893,6 +1001,7 @@ class Workflow:
                         directory_old=previous_directory,
                         directory_new=directory_cleaned,
                         ignore_simmate_files=True,
+                        link_files=cls.link_previous_directory,
                     )
                 # alternatively users can give a list of filenames to copy
                 elif isinstance(cls.use_previous_directory, list):
@@ -900,6 +1009,7 @@ class Workflow:
                         files_to_copy=cls.use_previous_directory,
                         directory_old=previous_directory,
                         directory_new=directory_cleaned,
+                        link_files=cls.link_previous_directory,
                     )
                 else:
                     raise Exception(
@@ -925,7 +1035,11 @@ class Workflow:
         )
 
         calculation = (
-            cls._register_calculation(status=status, **parameters_cleaned)
+            cls._register_calculation(
+                status=status,
+                input_hash=input_hash,
+                **parameters_cleaned,
+            )
             if cls.use_database
             else None
         )
@@ -934,7 +1048,7 @@ class Workflow:
 
         # STEP 5: Write metadata file for user reference
 
-        if write_metadata:
+        if write_metadata and cls.write_summary_files:
             # convert back to json format. We convert back rather than use the original
             # to ensure the input data is all present. For example, we want to store
             # structure data instead of a filename in the metadata.
@@ -973,9 +1087,7 @@ class Workflow:
             input_summary_file = (
                 directory_cleaned / f"simmate_metadata_{count_str}.yaml"
             )
-            with input_summary_file.open("w") as file:
-                content = yaml.dump(input_summary)
-                file.write(content)
+            write_yaml(input_summary, input_summary_file)
 
         # ---------------------------------------------------------------------
 
@@ -998,6 +1110,7 @@ class Workflow:
 
     @classmethod
     @property
+    @cache
     def _parameters_to_register(cls) -> list[str]:
         """
         A list of input parameters that should be used to register the calculation.
@@ -1030,7 +1143,7 @@ class Workflow:
         return parameters_to_register
 
     @classmethod
-    def _register_calculation(cls, **kwargs) -> Calculation:
+    def _register_calculation(cls, input_hash: str = None, **kwargs) -> Calculation:
         """
         If the workflow is linked to a calculation table in the Simmate database,
         this adds the flow run to the database.
@@ -1054,6 +1167,10 @@ class Workflow:
         if "started_at" in kwargs.keys():
             register_kwargs_cleaned["started_at"] = kwargs["started_at"]
 
+        # the input hash is only given when the result cache is in use
+        if input_hash:
+            register_kwargs_cleaned["input_hash"] = input_hash
+
         # SPECIAL CASE: The exception to the above is with SOURCE, which needs
         # to be in a JSON-serialized form for the database
         if "source" in register_kwargs_cleaned:
@@ -1081,6 +1198,183 @@ class Workflow:
 
         return calculation
 
+    # -------------------------------------------------------------------------
+    # Methods that let us reuse results from past runs with identical inputs
+    # (see `use_result_cache`)
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def get_input_hash(cls, **parameters) -> str:
+        """
+        Gives an MD5 hash of this workflow's name, version, and the input
+        parameters given. Parameters that don't affect the result (such as
+        `directory` or `run_id`) are ignored, default values are filled in,
+        and structures are hashed by their lattice and sites (see
+        `Structure.get_hash_key`) so that equivalent inputs give the same key.
+
+        For workflows with `use_previous_directory`, the past calculation that
+        files are copied from is also part of the hash (see
+        `_get_previous_calculation_key`).
+        """
+        from simmate.toolkit import Structure
+
+        parameters_cleaned = cls._deserialize_parameters(**parameters)
+
+        parameters_to_hash = {}
+        for key, value in parameters_cleaned.items():
+            if key in cls._input_hash_ignored_parameters:
+                continue
+            elif isinstance(value, Structure):
+                parameters_to_hash[key] = value.get_hash_key()
+            else:
+                parameters_to_hash.update(cls._serialize_parameters(**{key: value}))
+
+        if cls.use_previous_directory:
+            parameters_to_hash["previous_calculation"] = (
+                cls._get_previous_calculation_key(parameters_cleaned)
+            )
+
+        data = dict(
+            workflow_name=cls.name_full,
+            workflow_version=cls.version,
+            parameters=parameters_to_hash,
+        )
+        return get_hash_key(json.dumps(data, sort_keys=True, default=str))
+
+    @classmethod
+    def _get_previous_calculation_key(cls, parameters_cleaned: dict) -> str:
+        """
+        Gives a key for the past calculation that `use_previous_directory`
+        pulls files from. This is the table and id of the primary input's
+        database entry, or the full path when a `previous_directory` is given
+        directly (which takes priority, just like when the run is set up).
+        None is returned if neither is available.
+        """
+        previous_directory = parameters_cleaned.get("previous_directory", None)
+        if previous_directory:
+            return str(Path(previous_directory).absolute())
+
+        for key in cls._primary_input_parameters:
+            database_object = getattr(
+                parameters_cleaned.get(key, None), "database_object", None
+            )
+            if database_object:
+                return f"{database_object.table_name}:{database_object.id}"
+
+        return None
+
+    @classmethod
+    def _get_cached_calculation(
+        cls,
+        input_hash: str,
+        run_id: str = None,
+    ) -> Calculation:
+        """
+        Finds a past run of this workflow that has the same input hash. Completed
+        runs are preferred, followed by the oldest run that is still pending or
+        running. None is returned if there is no match.
+
+        The run_id of the current run (if known) is excluded from the search.
+        """
+        matches = cls.all_results.filter(
+            input_hash=input_hash,
+            status__in=["Completed", "Running", "Pending"],
+        )
+        if run_id:
+            matches = matches.exclude(run_id=run_id)
+
+        return (
+            matches.filter(status="Completed").order_by("-finished_at").first()
+            or matches.order_by("created_at").first()
+        )
+
+    @staticmethod
+    def _wait_for_calculation(
+        calculation: Calculation,
+        sleep_step: float = 5,
+        timeout: float = None,
+    ) -> Calculation:
+        """
+        Waits until a pending or running calculation has finished (with any
+        status) and then returns the refreshed database entry.
+
+        None is returned if the calculation can no longer finish (see
+        `_is_calculation_alive`) or if it is still running after `timeout`
+        seconds.
+        """
+        start_time = time.time()
+        while calculation.status in ["Pending", "Running"]:
+            if not Workflow._is_calculation_alive(calculation):
+                logging.warning(
+                    f"The past run (run_id={calculation.run_id}) was stopped "
+                    "before it could finish."
+                )
+                return None
+            if timeout is not None and time.time() - start_time > timeout:
+                logging.warning(
+                    f"The past run (run_id={calculation.run_id}) did not finish "
+                    f"within {timeout} seconds."
+                )
+                return None
+            time.sleep(sleep_step)
+            calculation.refresh_from_db()
+        return calculation
+
+    @staticmethod
+    def _is_calculation_alive(calculation: Calculation) -> bool:
+        """
+        Checks whether a pending or running calculation can still finish.
+
+        For runs submitted with `run_cloud`, this uses the run's WorkItem: the
+        run is dead if its WorkItem has already ended (e.g. the job errored
+        before updating the calculation) or if the worker that picked it up has
+        stopped. Runs started outside of the queue have no such signal, so
+        they are always treated as alive.
+        """
+        from simmate.compute.work_item import WorkItem
+
+        workitem = (
+            WorkItem.objects.filter(id=calculation.run_id)
+            .select_related("worker")
+            .only("status", "worker__status")
+            .first()
+        )
+        if not workitem:
+            return True
+        # the calculation can be saved just before its WorkItem is marked as
+        # finished, so we check the calculation once more in that case
+        if workitem.status in ["F", "E", "C"]:
+            calculation.refresh_from_db()
+            return calculation.status not in ["Pending", "Running"]
+        if workitem.status == "R" and workitem.worker:
+            return workitem.worker.status not in [
+                "Stopped",
+                "Stale Heartbeat",
+                "Crashed",
+            ]
+        return True
+
+    @staticmethod
+    def _get_cached_state(calculation: Calculation):  # -> WorkItem | Future
+        """
+        Gives a future-like object for a past run so that `run_cloud` can
+        return it in place of submitting a duplicate.
+
+        If the past run was submitted with `run_cloud`, its original WorkItem
+        is returned (even if it is still pending). If it completed outside
+        of the queue, a finished `concurrent.futures.Future` is given with the
+        past database entry as its result. Otherwise, None is returned.
+        """
+        from simmate.compute.work_item import WorkItem
+
+        state = WorkItem.objects.filter(id=calculation.run_id).first()
+        if not state and calculation.status == "Completed":
+            state = Future()
+            state.set_result(calculation)
+        if state:
+            state.results_db_entry = calculation
+        return state
+
     # -------------------------------------------------------------------------
     # Methods that hanlde serialization and deserialization of input parameters.
     # -------------------------------------------------------------------------
@@ -1285,9 +1579,10 @@ class Workflow:
         Gives the median real time in seconds for all past workflow runs. This
         will be less than the median CPU when the calculation is parallelized.
 
-        The web ui uses this regularly, so it is cached on a monthly-basis
+        The web ui uses this regularly, so it is cached and only refreshed
+        with new runs periodically (see `RuntimeModel.refresh_interval`).
         """
-        return None  # TODO
+        return cls.runtime_model.median_real_time
 
     @classmethod
     @property
@@ -1295,9 +1590,10 @@ class Workflow:
         """
         Gives the median CPU time in seconds for all past workflow runs.
 
-        The web ui uses this regularly, so it is cached on a monthly-basis
+        The web ui uses this regularly, so it is cached and only refreshed
+        with new runs periodically (see `RuntimeModel.refresh_interval`).
         """
-        return None  # TODO
+        return cls.runtime_model.median_cpu_time
 
     # -------------------------------------------------------------------------
     # Config settings for predicting CPU time and USDC pricing based on
@@ -1314,13 +1610,14 @@ class Workflow:
     with a high core count, more RAM, or generated a lot more data to store.
     """
 
-    # cpu_time_predict_method: str = None
-    # TODO: add in some default methods like...
-    #   - fixed value
-    #   - median of past runs
-    #   - structure-based
-    #   - composition-based
-    #   - other (e.g. combo of structure-based and past runs data)
+    @classmethod
+    @property
+    def runtime_model(cls):  # -> RuntimeModel
+        """
+        The (cached) model of past run times for this workflow, which is used
+        to give median times and predictions.
+        """
+        return RuntimeModel.get(cls)
 
     @classmethod
     def predict_cpu_time(cls, **kwargs) -> float:
@@ -1329,9 +1626,16 @@ class Workflow:
         it will predict the CPU time (in seconds)
         """
         # accepts all kwargs that run_config would (such as structure)
+        return cls.runtime_model.predict(mode="cpu", **kwargs)
 
-        # TODO: use cpu_time_predict_method to build in default calc methods
-        return None
+    @classmethod
+    def predict_real_time(cls, **kwargs) -> float:
+        """
+        Given all kwargs that will be passed to `run_config` (such as structure),
+        it will predict the real time (in seconds). This is useful for setting
+        walltimes when submitting to a cluster.
+        """
+        return cls.runtime_model.predict(mode="real", **kwargs)
 
     @classmethod
     def get_usdc_price(cls, **kwargs):
@@ -311,6 +311,23 @@ def test_archive_old_runs(tmp_path):
     assert (tmp_path / "simmate-task-2.zip").exists()
 
 
+def test_archive_old_runs_parallel(tmp_path):
+    from pathlib import Path
+
+    from simmate.workflows.utils import archive_old_runs
+
+    copy_test_files(
+        tmp_path,
+        test_directory=Path(__file__).parents[2] / "utils" / "test" / "test_files.py",
+        test_folder="to_archive",
+    )
+
+    archive_old_runs(tmp_path, time_cutoff=0, format="zstd", parallel=True)
+    assert (tmp_path / "simmate-task-1.tar.zst").exists()
+    assert (tmp_path / "simmate-task-2.tar.zst").exists()
+    assert not (tmp_path / "simmate-task-1").exists()
+
+
 def test_make_error_archive(tmp_path):
     from pathlib import Path
 
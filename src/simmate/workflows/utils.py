@@ -8,7 +8,6 @@ a workflow using its name.
 
 import importlib
 import logging
-import shutil
 import sys
 import time
 from inspect import getmembers, isclass
@@ -17,7 +16,15 @@ from pathlib import Path
 import yaml
 
 from simmate.config import settings
-from simmate.utils import get_app_submodule, get_directory, make_archive
+from simmate.utils import (
+    ARCHIVE_FORMATS,
+    dispatch,
+    get_app_submodule,
+    get_directory,
+    make_archive,
+    unpack_archive,
+    write_archive,
+)
 
 from .core import Workflow
 
@@ -339,14 +346,18 @@ def load_results_from_directories(base_directory: Path | str = "."):
         # We don't want those to prevent others from being loaded so we put
         # everything in a try/except.
         try:
-            # If we have a zip file, we need to unpack it before we can read results
+            # If we have an archive, we need to unpack it before we can read results
             if not foldername.is_dir():
-                shutil.unpack_archive(
+                unpack_archive(
                     filename=foldername,
                     extract_dir=directory,
                 )
-                # remove the ".zip" ending for our folder
-                foldername = foldername.removesuffix(".zip")
+                # remove the archive ending (e.g. ".zip") for our folder
+                for suffix in ARCHIVE_FORMATS.values():
+                    if foldername.name.endswith(suffix):
+                        foldername = foldername.with_name(
+                            foldername.name.removesuffix(suffix)
+                        )
 
             # Grab the metadata file which tells us key information
             filename = foldername / "simmate_metadata_01.yaml"
@@ -450,9 +461,9 @@ def parse_multi_command(command: str, commands_out: list[int]) -> dict:
     return {key: command for key, command in zip(commands_out, command_list)}
 
 
-def make_error_archive(directory: Path):
+def make_error_archive(directory: Path, format: str = "zip"):
     """
-    Compresses the directory to a zip file and stores the new archive within the
+    Compresses the directory to an archive and stores the new archive within the
     original. This utility is meant for creating archives within the directory
     of a failed calculation, so the new archive will be named something like
     `simmate_attempt_01.zip`, where the number is automatically determined. When
@@ -463,40 +474,46 @@ def make_error_archive(directory: Path):
 
     - `directory`:
         Path to the folder that should be archived
+
+    - `format`:
+        One of the formats in `simmate.utils.ARCHIVE_FORMATS`. Defaults to "zip".
     """
 
     full_path = directory.absolute()
 
-    # check the directory and see how many other "simmate_attempt_*.zip" files
+    # check the directory and see how many other "simmate_attempt_*" archives
     # already exist. Our archive number will be based off of this.
     count = (
         len([f for f in full_path.iterdir() if f.name.startswith("simmate_attempt_")])
         + 1
     )
     count_str = str(count).zfill(2)
-    base_name = full_path / f"simmate_attempt_{count_str}"
-
-    # Before we make the archive, we want to avoid also storing other simmate
-    # archives and files within this new archive. We therefore copy all files
-    # that do NOT start with "simmate_" over into a folder and then archive it.
-    shutil.copytree(
-        src=full_path,
-        dst=base_name,
-        ignore=shutil.ignore_patterns("simmate_*"),
+    base_name = f"simmate_attempt_{count_str}"
+
+    # We want to avoid also storing other simmate archives and files within this
+    # new archive, so all "simmate_*" files are skipped. Files are streamed
+    # straight into the archive, so no temporary copy of the folder is needed.
+    write_archive(
+        directory=full_path,
+        archive_filename=full_path / f"{base_name}{ARCHIVE_FORMATS[format]}",
+        format=format,
+        ignore_patterns=["simmate_*"],
+        root_name=base_name,
     )
 
-    # now convert the copied files to a new archive
-    make_archive(base_name)
-
 
 def archive_old_runs(
     directory: Path = None,
     time_cutoff: float = 3 * 7 * 24 * 60 * 60,  # equal to 3 weeks
+    format: str = "zip",
+    compression_level: int = None,
+    parallel: bool = False,
+    max_workers: int = None,
 ):
     """
     Goes through a given directory and finds all "simmate-task-" folders that
     are older than a given time cutoff. Each of these folders is then compressed
-    to a zip file and then the original folder is removed.
+    to an archive and then the original folder is removed.
 
     #### Parameters
 
@@ -507,6 +524,16 @@ def archive_old_runs(
         The time (in seconds) required to determine whether a folder is old or not.
         If the folder is considered old, then it will be archived and then deleted.
         The default is 3 weeks.
+    - `format`:
+        One of the formats in `simmate.utils.ARCHIVE_FORMATS`. Defaults to "zip".
+    - `compression_level`:
+        Compression level passed to the codec. Defaults to the codec's default.
+    - `parallel`:
+        Whether to archive many folders at once, with one folder per process.
+        Defaults to False.
+    - `max_workers`:
+        The number of processes to use when `parallel=True`. Defaults to the
+        number of cores available.
 
     """
     if not directory:
@@ -530,5 +557,15 @@ def archive_old_runs(
         ):
             foldernames.append(foldername_full)
 
-    # now go through this list and archive the folders that met the criteria
-    [make_archive(f) for f in foldernames]
+    # now go through this list and archive the folders that met the criteria.
+    # Each folder is its own task (batch_size=1) so that one very large folder
+    # doesn't hold up an entire batch of smaller ones.
+    dispatch(
+        items=foldernames,
+        fn=make_archive,
+        parallel="core" if parallel else False,
+        batch_size=1,
+        max_workers=max_workers,
+        format=format,
+        compression_level=compression_level,
+    )